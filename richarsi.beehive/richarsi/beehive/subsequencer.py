@@ -21,29 +21,210 @@ Mathematically, the sum of permutations for a list of n distinct characters from
     
     Total permutations = ∑ (n! / (n-k)!) for k=1 to n
 
-Below is the summary table for quick reference:
-| Number of Characters | Total Permutations (Including Subsets) |
-|----------------------|----------------------------------------|
-| 1                    | 1                                      |
-| 2                    | 3                                      |
-| 3                    | 15                                     |
-| 4                    | 64                                     |
-| 5                    | 325                                    |
-| 6                    | 1,956                                  |
-| 7                    | 13,699                                 |
-| 8                    | 109,601                                |
+Enumerating every ordering is only practical for 'all_possible_subsequences', which is capped
+at 8 characters (109,601 orderings).  The word searches never enumerate orderings: a sequence is
+only extended while the dictionary holds a word starting with it, so the work is bounded by the
+number of live dictionary prefixes that can be spelled from the letters.  That lets the word
+searches accept up to 16 characters.
+
+Below is the summary table for quick reference.  It was measured with 'all_possible_words' against
+etc/anagram_dictionary.txt (89,059 words) for 20 random draws per length from a Scrabble letter
+bag, answering lookups from a local dictionary.  The remote column assumes a 1 ms wordchecker round
+trip per lookup; a breadth first search needs at most one round trip per letter instead.
+| Number of Characters | Lookups (median) | Lookups (worst) | Local Latency (median) | Remote Latency at 1 ms (median) |
+|----------------------|------------------|-----------------|------------------------|---------------------------------|
+| 4                    | 26               | 52              | 0.1 ms                 | 0.03 s                          |
+| 6                    | 242              | 382             | 1.1 ms                 | 0.24 s                          |
+| 8                    | 726              | 1,584           | 3.3 ms                 | 0.73 s                          |
+| 10                   | 1,573            | 7,709           | 7.5 ms                 | 1.6 s                           |
+| 12                   | 4,208            | 16,911          | 18 ms                  | 4.2 s                           |
+| 13                   | 8,357            | 19,441          | 37 ms                  | 8.4 s                           |
+| 14                   | 12,662           | 52,404          | 41 ms                  | 12.7 s                          |
+| 15                   | 17,893           | 45,434          | 57 ms                  | 17.9 s                          |
+| 16                   | 18,213           | 93,766          | 92 ms                  | 18.2 s                          |
 
 Note:
-- The rapid growth in permutations is due to both combinatorial selection of subsets and their internal arrangements.
+- The lookups grow with the letters that can continue a real word, not with n! / (n-k)!.
+- Setting WORDCHECKER_DICTIONARY to a word list answers lookups in-process instead of over REST.
 """ 
 
 import requests
 import os
+import threading
+from bisect import bisect_left
+from collections import Counter, deque
+from fractions import Fraction
+from math import factorial
 
 wordchecker_url = None
 wordchecker_host = os.getenv('WORDCHECKER_HOST', 'wordseach')
 wordchecker_port = os.getenv('WORDCHECKER_PORT', '8000')
 wordchecker_url = f"http://{wordchecker_host}:{wordchecker_port}/firstword"
+wordchecker_batch_url = f"http://{wordchecker_host}:{wordchecker_port}/firstwords"
+wordchecker_counts_url = f"http://{wordchecker_host}:{wordchecker_port}/prefixcounts"
+
+# The maximum number of live sequences a breadth first search holds between levels
+MAX_FRONTIER = int(os.getenv('SUBSEQUENCER_MAX_FRONTIER', '20000'))
+
+# The maximum number of letters a word search accepts
+MAX_WORD_LETTERS = 16
+
+class LocalDictionary:
+    """
+    A sorted in-memory word list that answers the same lookups as the wordchecker service.
+    """
+
+    def __init__(self, words):
+        """
+        Initializes the dictionary from an iterable of words.
+        """
+        self.words = sorted(set(words))
+
+    @classmethod
+    def from_file(cls, file_path):
+        """
+        Builds a dictionary from a file holding one word per line.
+        """
+        with open(file_path, 'r') as file:
+            return cls(line.strip() for line in file if line.strip())
+
+    def first_word_starting_with(self, prefix: str) -> str:
+        """
+        Return the alphabetically first word starting with 'prefix', or an empty string if there is none.
+        """
+        index = bisect_left(self.words, prefix)
+        if index < len(self.words) and self.words[index].startswith(prefix):
+            return self.words[index]
+        return ""
+
+    def count_words_starting_with(self, prefix: str, max_length: int = None) -> int:
+        """
+        Return the number of words starting with 'prefix', only counting words no longer than 'max_length'.
+        """
+        start = bisect_left(self.words, prefix)
+        end = bisect_left(self.words, prefix + chr(0x10FFFF), start)
+        if max_length is None:
+            return end - start
+        return sum(1 for word in self.words[start:end] if len(word) <= max_length)
+
+class SearchProgress:
+    """
+    Counts the work done by a word search while it runs.
+
+    Every sequence checked adds one to 'prefixes_explored' and every word yielded adds one
+    to 'words_found'.  'fraction_done' estimates how much of the search is finished by
+    sharing each sequence's fraction equally between the sequences one letter longer,
+    and adding a sequence's share once nothing is left to search beneath it.
+
+    A depth first search also records the sequence it is about to check in 'position'.
+    Every sequence before it has been checked and its word yielded, so the search can be
+    resumed from 'cursor()' without losing or repeating any words.
+
+    Another thread can ask a depth first search to give up part of its work with
+    'request_split()'.  At the next sequence it checks, the search removes the later half
+    of the sequences it has not started beneath the shortest sequence that still has any,
+    and 'take_split()' returns them to be searched elsewhere.  A search outside this module
+    that keeps its own 'frames' answers by calling 'poll_split()'.  Sequences named in
+    'skip', as letters after the search's prefix, are not searched at all.
+    """
+
+    def __init__(self):
+        self.prefixes_explored = 0
+        self.words_found = 0
+        self.fraction_done = 0.0
+        self.position = None
+        self.base = 0
+        self.skip = set()
+        # (pending sequences, share of each) for every sequence on the current path, shortest first
+        self.frames = []
+        # Requesting, giving up, taking and withdrawing a split happen under '_split_lock'
+        self._split_lock = threading.Lock()
+        self._split_requested = threading.Event()
+        self._split_ready = threading.Event()
+        self._split_off = []
+
+    def cursor(self):
+        """
+        Return the letters of 'position' after the search's prefix, or None before the search starts.
+        """
+        position = self.position
+        if position is None:
+            return None
+        return ''.join(element[0] for element in position[self.base:])
+
+    def snapshot(self):
+        """
+        Return the counters as a dictionary, with 'fraction_done' capped at 1.
+        """
+        return {
+            'prefixes_explored': self.prefixes_explored,
+            'words_found': self.words_found,
+            'fraction_done': min(1.0, self.fraction_done)
+        }
+
+    def path(self, sequence):
+        """
+        Return the letters of 'sequence' after the search's prefix.
+        """
+        return ''.join(element[0] for element in sequence[self.base:])
+
+    def request_split(self):
+        """
+        Ask the search to give up part of the work it has not started.
+        """
+        with self._split_lock:
+            # Work given up for an earlier request is still waiting to be taken
+            if self._split_ready.is_set():
+                return
+            self._split_off = []
+            self._split_requested.set()
+
+    def take_split(self, timeout=None):
+        """
+        Wait for the search to answer 'request_split()' and return the work it gave up.
+
+        Returns a list of (current_sequence, remaining_elements) pairs, which is empty if
+        the search had nothing left to give up or did not answer within 'timeout' seconds.
+        A request that times out is withdrawn, so the search cannot give up work afterwards
+        that nobody takes.
+        """
+        self._split_ready.wait(timeout)
+        with self._split_lock:
+            if not self._split_ready.is_set():
+                self._split_requested.clear()
+                return []
+            self._split_ready.clear()
+            split_off, self._split_off = self._split_off, []
+            return split_off
+
+    def poll_split(self):
+        """
+        Answer 'request_split()', if it is waiting, from the sequences in 'frames'.  Called by a
+        search that keeps its own frames, between the pieces of work it can give up.
+        """
+        if self._split_requested.is_set():
+            self._split()
+
+    def _split(self):
+        # Give up the later half of the unstarted sequences beneath the shortest sequence that has any
+        with self._split_lock:
+            # The request was withdrawn after the search saw it
+            if not self._split_requested.is_set():
+                return
+            split_off = []
+            for pending, share in self.frames:
+                if pending:
+                    count = (len(pending) + 1) // 2
+                    split_off = [pending.pop() for _ in range(count)][::-1]
+                    self.fraction_done += share * count
+                    break
+            self._split_off = split_off
+            self._split_requested.clear()
+            self._split_ready.set()
+
+# Answer lookups in-process when a word list is configured, otherwise call the wordchecker
+wordchecker_dictionary = os.getenv('WORDCHECKER_DICTIONARY')
+local_dictionary = LocalDictionary.from_file(wordchecker_dictionary) if wordchecker_dictionary else None
 
 def all_possible_subsequences(letters: list, max_length: int = 8, min_length: int = 0):
     """
@@ -108,6 +289,9 @@ def get_first_word_starting_with(sequence: list):
     
     if not current_string:
         return False
+
+    if local_dictionary:
+        return local_dictionary.first_word_starting_with(current_string)
     
     # Replace the URL and any required query parameters as necessary
     response = requests.get(f'{wordchecker_url}/{current_string}')
@@ -119,62 +303,375 @@ def get_first_word_starting_with(sequence: list):
     else:
         raise Exception(f"API request failed with status code {response.status_code}")
 
-def all_possible_words(letters: list, max_length: int = 8, min_length: int = 0):
+def get_first_words_starting_with(sequences: list):
+    """
+    Make a single REST API call to find the first word starting with each of several sequences.
+
+    :param sequences: The sequences for which to check word beginnings.
+    :return: A list aligned with 'sequences' holding the first word starting with each
+             sequence, or a falsy value where no word starts with it.
+    """
+    # Convert each list of characters into a string
+    current_strings = [''.join([element[0] for element in sequence]) for sequence in sequences]
+
+    if not current_strings:
+        return []
+
+    if local_dictionary:
+        return [local_dictionary.first_word_starting_with(current_string) for current_string in current_strings]
+
+    response = requests.post(wordchecker_batch_url, json={'prefixes': current_strings})
+
+    # API returns a JSON object with a key 'first_words' aligned with the prefixes sent
+    if response.status_code == 200:
+        data = response.json()
+        return data.get('first_words', [])
+    else:
+        raise Exception(f"API request failed with status code {response.status_code}")
+
+def count_words_starting_with(sequences: list, max_length: int = None):
+    """
+    Make a single REST API call to count the words starting with each of several sequences.
+
+    :param sequences: The sequences for which to count word beginnings.
+    :param max_length: Only count words no longer than this, or None to count every word.
+    :return: A list of counts aligned with 'sequences'.
+    """
+    # Convert each list of characters into a string
+    current_strings = [''.join([element[0] for element in sequence]) for sequence in sequences]
+
+    if not current_strings:
+        return []
+
+    if local_dictionary:
+        return [local_dictionary.count_words_starting_with(current_string, max_length) for current_string in current_strings]
+
+    response = requests.post(wordchecker_counts_url, json={'prefixes': current_strings, 'max_length': max_length})
+
+    # API returns a JSON object with a key 'counts' aligned with the prefixes sent
+    if response.status_code == 200:
+        data = response.json()
+        return data.get('counts', [])
+    else:
+        raise Exception(f"API request failed with status code {response.status_code}")
+
+def arrangement_count(letters: list) -> int:
+    """
+    Count the distinct non-empty sequences that can be made from 'letters', repeated letters included.
+
+    This is the number of sequences a search would visit with no dictionary to prune it, and
+    reduces to the sum of n! / (n-k)! in the module docstring when every letter is distinct.
+
+    :param letters: A list of letters or strings.
+    :return: The number of distinct sequences.
+    """
+    # Multiply the exponential generating functions of each letter's multiplicity
+    coefficients = [Fraction(1)]
+    for multiplicity in Counter(letters).values():
+        product = [Fraction(0)] * (len(coefficients) + multiplicity)
+        for i, coefficient in enumerate(coefficients):
+            for j in range(multiplicity + 1):
+                product[i + j] += coefficient / factorial(j)
+        coefficients = product
+
+    # The number of sequences of length k is k! times the coefficient of x^k
+    return int(sum(coefficient * factorial(k) for k, coefficient in enumerate(coefficients) if k > 0))
+
+def next_sequences(current_sequence: list, remaining_elements: list):
+    """
+    Generate every way of extending 'current_sequence' by one of 'remaining_elements'.
+
+    Only the first remaining occurrence of a repeated letter is used so that the same
+    sequence of letters is never produced twice.
+
+    :param current_sequence: List of (letter, index) tuples that make up the sequence so far.
+    :param remaining_elements: List of (letter, index) tuples still available.
+    :return: Yields (current_sequence, remaining_elements) pairs one letter deeper.
+    """
+    # Iterate over the elements in 'remaining_elements'
+    for i in range(len(remaining_elements)):
+        # Create shallow copies to preserve the current state during recursion
+        cs_copy = current_sequence.copy()
+        re_copy = remaining_elements.copy()
+
+        # Check if the order of letters is preserved
+        for element in re_copy:
+            if re_copy[i][0] == element[0] and re_copy[i][1] > element[1]:  # Order hasn't been preserved
+                break
+        else:
+            # Append the current letter to 'cs_copy' and remove it from 're_copy'
+            cs_copy.append(re_copy.pop(i))
+            yield cs_copy, re_copy
+
+def _all_possible_words(current_sequence, remaining_elements, min_length, progress=None, share=1.0):
+    """
+    Recursive helper function that searches depth first for words.
+
+    :param current_sequence: List that holds the sequences formed so far.
+    :param remaining_elements: List containing the remaining letters to be processed.
+    :param min_length: The minimum length of word to yield.
+    :param progress: Optional SearchProgress updated as the search runs.
+    :param share: The fraction of the whole search beneath 'current_sequence'.
+    """
+    # Check with the API whether any words start with 'current_sequence'
+    # Convert the list of characters into a string
+    current_string = ''.join([element[0] for element in current_sequence])
+
+    # Everything before this sequence has been searched
+    if progress:
+        progress.position = current_sequence
+
+    # Skip check if 'current_sequence' is empty because that will always return None
+    first_word = get_first_word_starting_with(current_sequence)
+    if progress:
+        progress.prefixes_explored += 1
+    if current_sequence and not first_word:
+        if progress:
+            progress.fraction_done += share
+        return
+
+    # If the current sequence in 'current_sequence' is valid (meets min_length) and is a word then yield it
+    if current_sequence and len(current_sequence) > min_length - 1 and current_string == first_word:
+        if progress:
+            progress.words_found += 1
+        yield first_word
+
+    # Recursively search every sequence one letter deeper
+    children = list(next_sequences(current_sequence, remaining_elements))
+    if not progress:
+        for cs_copy, re_copy in children:
+            yield from _all_possible_words(cs_copy, re_copy, min_length)
+        return
+    if not children:
+        progress.fraction_done += share
+        return
+    yield from _search_children(children, min_length, progress, share / len(children))
+
+def _search_children(children, min_length, progress, share):
+    """
+    Search each of 'children' depth first, in order, while letting 'progress' split off those not yet started.
+
+    :param children: (current_sequence, remaining_elements) pairs one letter deeper than their parent.
+    :param min_length: The minimum length of word to yield.
+    :param progress: SearchProgress updated as the search runs.
+    :param share: The fraction of the whole search beneath each of 'children'.
+    """
+    pending = deque(children)
+    progress.frames.append((pending, share))
+    try:
+        while pending:
+            if progress._split_requested.is_set():
+                progress._split()
+                if not pending:
+                    break
+            cs_copy, re_copy = pending.popleft()
+            if progress.skip and progress.path(cs_copy) in progress.skip:
+                # Searched elsewhere
+                progress.fraction_done += share
+                continue
+            yield from _all_possible_words(cs_copy, re_copy, min_length, progress, share)
+    finally:
+        progress.frames.pop()
+
+def _resume_words(current_sequence, remaining_elements, min_length, cursor, progress=None, share=1.0):
+    """
+    Recursive helper function that resumes a depth first search at 'cursor'.
+
+    'current_sequence' has already been checked, as have the sequences beneath it that
+    come before the one 'cursor' leads to, so only the rest of the search is repeated.
+
+    :param current_sequence: List that holds the sequences formed so far.
+    :param remaining_elements: List containing the remaining letters to be processed.
+    :param min_length: The minimum length of word to yield.
+    :param cursor: The letters leading from 'current_sequence' to the sequence to resume at.
+    :param progress: Optional SearchProgress updated as the search runs.
+    :param share: The fraction of the whole search beneath 'current_sequence'.
+    """
+    children = list(next_sequences(current_sequence, remaining_elements))
+    letters = [cs_copy[-1][0] for cs_copy, _ in children]
+    if cursor[0] not in letters:
+        raise ValueError(f"Cursor letter '{cursor[0]}' cannot follow the sequence.")
+
+    resume_at = letters.index(cursor[0])
+    child_share = share / len(children)
+    if progress:
+        # Already searched
+        progress.fraction_done += child_share * resume_at
+    if len(cursor) > 1:
+        cs_copy, re_copy = children[resume_at]
+        yield from _resume_words(cs_copy, re_copy, min_length, cursor[1:], progress, child_share)
+        resume_at += 1
+    if progress:
+        yield from _search_children(children[resume_at:], min_length, progress, child_share)
+    else:
+        for cs_copy, re_copy in children[resume_at:]:
+            yield from _all_possible_words(cs_copy, re_copy, min_length)
+
+def _prefix_lengths(prefix: str, prefix_from: int, min_length: int):
+    """
+    Return the lengths of the parts of 'prefix', shorter than the prefix itself, to check as words.
+
+    :param prefix: Letters already placed before the search starts.
+    :param prefix_from: The shortest part of 'prefix' to check, or None to check none of them.
+    :param min_length: The minimum length of word to yield.
+    """
+    if prefix_from is None:
+        return range(0)
+    return range(max(prefix_from, min_length, 1), len(prefix))
+
+def all_possible_words(letters: list, max_length: int = MAX_WORD_LETTERS, min_length: int = 0,
+                       prefix: str = '', prefix_from: int = None, progress: SearchProgress = None,
+                       cursor: str = None):
     """
     Generate all possible subsequences of 'letters' that maintain the original order,
     have a length greater than or equal to 'min_length', and are validated by a REST API.
 
     Parameters:
     - letters (list): A list of letters or strings
-    - max_length (int, optional): The maximum length of the sequence. Default is 8.
+    - max_length (int, optional): The maximum length of the sequence. Default is 16.
     - min_length (int, optional): The minimum length of the sequence. Default is 0.
-    """    
-
-    def _all_possible_words(current_sequence, remaining_elements):
-        """
-        Recursive helper function to generate subsequences.
+    - prefix (str, optional): Letters already placed; only words starting with them are searched. Default is ''.
+    - prefix_from (int, optional): The shortest part of 'prefix' that is also checked as a word.
+      Default is None, which only checks 'prefix' itself.
+    - progress (SearchProgress, optional): Updated with the work done as the search runs.
+    - cursor (str, optional): Resume a search at the sequence 'prefix' + 'cursor', as recorded
+      by 'progress.cursor()'.  Default is None, which searches from the start.
 
-        :param current_sequence: List that holds the sequences formed so far.
-        :param remaining_elements: List containing the remaining letters to be processed.
-        """
-        # Check with the API whether any words start with 'current_sequence'
-        # Convert the list of characters into a string
-        current_string = ''.join([element[0] for element in current_sequence])
-        
-        # Skip check if 'current_sequence' is empty because that will always return None
-        first_word = get_first_word_starting_with(current_sequence)
-        if current_sequence and not first_word:
-            return
-        
-        # If the current sequence in 'current_sequence' is valid (meets min_length) and is a word then yield it
-        if current_sequence and len(current_sequence) > min_length - 1 and current_string == first_word:
-            yield first_word
-        
-        # Iterate over the elements in 'remaining_elements'
-        for i in range(len(remaining_elements)):
-            # Create shallow copies to preserve the current state during recursion
-            cs_copy = current_sequence.copy()
-            re_copy = remaining_elements.copy()
-            
-            # Check if the order of letters is preserved
-            for element in re_copy:
-                if re_copy[i][0] == element[0] and re_copy[i][1] > element[1]:  # Order hasn't been preserved
-                    break
-            else:
-                # Append the current letter to 'cs_copy' and remove it from 're_copy'
-                cs_copy.append(re_copy.pop(i))
-                # Recursively call _all_possible_subsequences with updated 'cs_copy' and 're_copy'
-                yield from _all_possible_words(cs_copy, re_copy)
+    The sequences named in 'progress.skip' are left out of the search, and the search gives
+    up part of its work whenever 'progress.request_split()' is called.
+    """    
 
     # Check if the input exceeds the allowed maximum length
-    if len(letters) > max_length:
+    if len(prefix) + len(letters) > max_length:
         print(f"Input exceeded {max_length} characters and was truncated.")
         raise ValueError(f"Input exceeded {max_length} characters.")
     
-    # Initialise empty list 'current_sequence' and 'remaining_elements' with tuples of (letter, original index)
-    current_sequence = list()
+    # Initialise 'current_sequence' from the prefix and 'remaining_elements' with tuples of (letter, original index)
+    current_sequence = [(letter, None) for letter in prefix]
     remaining_elements = [(letter, index) for index, letter in enumerate(letters)]
+    if progress:
+        progress.base = len(prefix)
+
+    # Everything up to the cursor, including the prefix and the parts of it, has been searched
+    if cursor:
+        yield from _resume_words(current_sequence, remaining_elements, min_length, cursor, progress)
+        return
+
+    # Check the shorter parts of the prefix that this search is responsible for
+    for length in _prefix_lengths(prefix, prefix_from, min_length):
+        first_word = get_first_word_starting_with(current_sequence[:length])
+        if progress:
+            progress.prefixes_explored += 1
+        if first_word == prefix[:length]:
+            if progress:
+                progress.words_found += 1
+            yield prefix[:length]
     
-    # Start the recursive process by calling '_all_possible_subsequences'
-    yield from _all_possible_words(current_sequence, remaining_elements)
+    # Start the recursive process by calling '_all_possible_words'
+    yield from _all_possible_words(current_sequence, remaining_elements, min_length, progress)
 
+def all_possible_words_breadth_first(letters: list, max_length: int = MAX_WORD_LETTERS, min_length: int = 0,
+                                     max_frontier: int = MAX_FRONTIER, prefix: str = '', prefix_from: int = None,
+                                     progress: SearchProgress = None):
+    """
+    Generate the same words as 'all_possible_words' but search one level at a time.
+
+    Every live sequence of length k is extended by one letter and the extended sequences
+    are checked with batched REST API calls of up to 'max_frontier' sequences before
+    moving on to length k+1, so a search makes one round trip per chunk of a level rather
+    than one per sequence.  Words are therefore yielded shortest first.
+
+    Parameters:
+    - letters (list): A list of letters or strings
+    - max_length (int, optional): The maximum length of the sequence. Default is 16.
+    - min_length (int, optional): The minimum length of the sequence. Default is 0.
+    - max_frontier (int, optional): The maximum number of live sequences held between levels,
+      and roughly the most sequences checked by one call.  When a level leaves more than this
+      the remainder of the search falls back to depth first.
+    - prefix (str, optional): Letters already placed; only words starting with them are searched. Default is ''.
+    - prefix_from (int, optional): The shortest part of 'prefix' that is also checked as a word.
+      Default is None, which only checks 'prefix' itself.
+    - progress (SearchProgress, optional): Updated with the work done as the search runs.
+    """
+
+    # Check if the input exceeds the allowed maximum length
+    if len(prefix) + len(letters) > max_length:
+        print(f"Input exceeded {max_length} characters and was truncated.")
+        raise ValueError(f"Input exceeded {max_length} characters.")
+
+    current_sequence = [(letter, None) for letter in prefix]
+
+    # Check the prefix, and the shorter parts of it this search is responsible for, in one call
+    if prefix:
+        lengths = list(_prefix_lengths(prefix, prefix_from, min_length)) + [len(prefix)]
+        first_words = get_first_words_starting_with([current_sequence[:length] for length in lengths])
+        if progress:
+            progress.prefixes_explored += len(lengths)
+        for length, first_word in zip(lengths, first_words):
+            if first_word == prefix[:length] and length > min_length - 1:
+                if progress:
+                    progress.words_found += 1
+                yield first_word
+
+        # Stop if no word starts with the prefix
+        if not first_words[-1]:
+            if progress:
+                progress.fraction_done += 1.0
+            return
+
+    # The frontier holds (current_sequence, remaining_elements, share) for sequences that still have
+    # words ahead of them, where 'share' is the fraction of the whole search beneath the sequence
+    frontier = deque([(current_sequence, [(letter, index) for index, letter in enumerate(letters)], 1.0)])
+
+    while frontier:
+        next_frontier = []
+        while frontier:
+            # Bound the memory held between levels by finishing each live sequence depth first
+            if len(frontier) + len(next_frontier) > max_frontier:
+                yield from _finish_depth_first(next_frontier + list(frontier), min_length, progress)
+                return
+
+            # Extend live sequences by one letter until a chunk is ready, and check the chunk in one call
+            candidates = []
+            while frontier and len(candidates) < max_frontier:
+                current_sequence, remaining_elements, share = frontier.popleft()
+                children = list(next_sequences(current_sequence, remaining_elements))
+                if progress and not children:
+                    progress.fraction_done += share
+                candidates.extend((cs_copy, re_copy, share / len(children)) for cs_copy, re_copy in children)
+            if not candidates:
+                continue
+            first_words = get_first_words_starting_with([current_sequence for current_sequence, _, _ in candidates])
+            if progress:
+                progress.prefixes_explored += len(candidates)
+
+            for (current_sequence, remaining_elements, share), first_word in zip(candidates, first_words):
+                # Drop sequences that no word starts with
+                if not first_word:
+                    if progress:
+                        progress.fraction_done += share
+                    continue
+
+                current_string = ''.join([element[0] for element in current_sequence])
+                if len(current_sequence) > min_length - 1 and current_string == first_word:
+                    if progress:
+                        progress.words_found += 1
+                    yield first_word
+
+                next_frontier.append((current_sequence, remaining_elements, share))
+        frontier = deque(next_frontier)
+
+def _finish_depth_first(entries, min_length, progress):
+    """
+    Search beneath each of the checked sequences in 'entries' depth first.
+
+    :param entries: (current_sequence, remaining_elements, share) for sequences that have been checked.
+    :param min_length: The minimum length of word to yield.
+    :param progress: Optional SearchProgress updated as the search runs.
+    """
+    for current_sequence, remaining_elements, share in entries:
+        children = list(next_sequences(current_sequence, remaining_elements))
+        if progress and not children:
+            progress.fraction_done += share
+        for cs_copy, re_copy in children:
+            yield from _all_possible_words(cs_copy, re_copy, min_length, progress, share / len(children))
@@ -1,26 +1,291 @@
 import os
 import sys
-from datetime import datetime, timezone
 import requests
 import time
-from richarsi.beehive.subsequencer import all_possible_words
+import math
+import multiprocessing
+import signal
+import socket
+import threading
+import queue
+from collections import deque, namedtuple
+from functools import partial
+from richarsi.beehive import subsequencer
+from richarsi.beehive.subsequencer import SearchProgress, LocalDictionary, next_sequences, arrangement_count, all_possible_words, all_possible_words_breadth_first
+
+# Either 'depth' to check one sequence per wordchecker call or 'breadth' to check a whole level per call
+WORKCONSUMER_SEARCH_MODE = os.getenv('WORKCONSUMER_SEARCH_MODE', 'depth').lower()
+# Either 'once' to process a single workitem and exit or 'daemon' to keep processing workitems
+WORKCONSUMER_MODE = os.getenv('WORKCONSUMER_MODE', 'once').lower()
+# Worker processes run by the daemon, 0 to run one per CPU
+WORKCONSUMER_WORKERS = int(os.getenv('WORKCONSUMER_WORKERS', '0'))
+# Processes searching the branches of a workitem, 0 to share the CPUs between the daemon's workers
+WORKCONSUMER_SEARCH_PROCESSES = int(os.getenv('WORKCONSUMER_SEARCH_PROCESSES', '0'))
+# Search pools start fresh interpreters, since forking a process that runs the sender, checkpoint,
+# lease and reporting threads can leave the children stuck on locks those threads held
+search_pool_context = multiprocessing.get_context('spawn')
+# Seconds a pooled search waits for its next branch before checking for a split request
+WORKCONSUMER_BRANCH_POLL_SECONDS = float(os.getenv('WORKCONSUMER_BRANCH_POLL_SECONDS', '0.1'))
+# Work items estimated to cost less than this are searched in this process, since handing their
+# branches to the search pool would take longer than searching them
+WORKCONSUMER_POOL_MIN_COST = int(os.getenv('WORKCONSUMER_POOL_MIN_COST', '20000'))
+# Seconds a claimed workitem stays leased to this consumer
+WORKCONSUMER_LEASE_SECONDS = int(os.getenv('WORKCONSUMER_LEASE_SECONDS', '60'))
+# Buffered words are sent once there are this many of them or after this many seconds
+WORKCONSUMER_BATCH_SIZE = int(os.getenv('WORKCONSUMER_BATCH_SIZE', '100'))
+WORKCONSUMER_FLUSH_SECONDS = float(os.getenv('WORKCONSUMER_FLUSH_SECONDS', '2'))
+# Words the search may get ahead of the sender before it waits for the blackboard to catch up
+WORKCONSUMER_QUEUE_SIZE = int(os.getenv('WORKCONSUMER_QUEUE_SIZE', '1000'))
+# Seconds between search cursor checkpoints while a workitem is being processed
+WORKCONSUMER_CHECKPOINT_SECONDS = float(os.getenv('WORKCONSUMER_CHECKPOINT_SECONDS', '30'))
+# Seconds between progress reports while a workitem is being processed
+WORKCONSUMER_PROGRESS_SECONDS = float(os.getenv('WORKCONSUMER_PROGRESS_SECONDS', '5'))
+# Seconds between lease extensions while a workitem is being processed
+WORKCONSUMER_HEARTBEAT_SECONDS = float(os.getenv('WORKCONSUMER_HEARTBEAT_SECONDS', WORKCONSUMER_LEASE_SECONDS / 3))
+# Seconds to wait for the search to give up part of a workitem when an idle consumer wants work
+WORKCONSUMER_SPLIT_SECONDS = float(os.getenv('WORKCONSUMER_SPLIT_SECONDS', '5'))
+
+# Queued behind the words found before it so that they are sent before the cursor is saved
+Checkpoint = namedtuple('Checkpoint', ['cursor'])
+
+def consumer_id():
+    """
+    Identifies this consumer process to the blackboard as the owner of the workitems it claims.
+
+    Returns:
+        str: The host name and process id.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
 
-def fetch_workitems(blackboard_url):
+def claim_workitems(blackboard_url, owner, limit=1, lease_seconds=None, task_id=None):
     """
-    Fetches work items with a status of 'NEW' from the specified base URL.
+    Atomically claims NEW work items, which the blackboard marks RUNNING and leases to 'owner'.
 
     Args:
         blackboard_url (str): The base URL of the API endpoint.
+        owner (str): Identifies the consumer claiming the work items.
+        limit (int, optional): The maximum number of work items to claim. Defaults to 1.
+        lease_seconds (int, optional): How long the claim lasts. Defaults to WORKCONSUMER_LEASE_SECONDS.
+        task_id (str, optional): Only claim work items belonging to this task.
 
     Returns:
-        requests.Response: The response object from the HTTP GET request.
+        requests.Response: The response object from the HTTP POST request.
+    """
+    claim_data = {
+        'owner': owner,
+        'limit': limit,
+        'lease_seconds': WORKCONSUMER_LEASE_SECONDS if lease_seconds is None else lease_seconds
+    }
+    if task_id:
+        claim_data['task_id'] = task_id
+
+    return requests.post(f"{blackboard_url}/workitems/claim", json=claim_data)
+
+def extend_lease(blackboard_url, workitem_id, owner, lease_seconds=None, can_split=False):
     """
+    Extends the lease on a claimed work item so the blackboard does not requeue it.
+
+    Args:
+        blackboard_url (str): The base URL of the API endpoint.
+        workitem_id (str): The unique identifier of the claimed work item.
+        owner (str): The consumer that claimed the work item.
+        lease_seconds (int, optional): How long from now the lease lasts. Defaults to WORKCONSUMER_LEASE_SECONDS.
+        can_split (bool, optional): Whether the blackboard may ask for the work item to be split.
 
-    # Send an HTTP GET request to the '/workitems' endpoint with a query parameter 'status' set to 'NEW'.
-    response = requests.get(f"{blackboard_url}/workitems", params={'status': 'NEW'})
+    Returns:
+        requests.Response: The response object from the HTTP PUT request.
+    """
+    lease_data = {
+        'owner': owner,
+        'lease_seconds': WORKCONSUMER_LEASE_SECONDS if lease_seconds is None else lease_seconds
+    }
+    if can_split:
+        lease_data['can_split'] = True
+    return requests.put(f"{blackboard_url}/workitems/{workitem_id}/lease", json=lease_data)
+
+def keep_lease(blackboard_url, workitem_id, owner, stop_event, lost_event, interval=None, split=None):
+    """
+    Heartbeats the lease on a work item every 'interval' seconds until 'stop_event' is set.
+
+    Sets 'lost_event' and stops if the blackboard reports that the work item is no longer
+    leased to 'owner'.  Failed requests are retried at the next heartbeat.
+
+    Given a 'split' function, the blackboard may reply that another consumer is idle, and
+    'split' is called to give that consumer part of the work item.  If 'split' returns
+    False the work given up may not have reached the blackboard, so 'lost_event' is set
+    and the work item is left to be requeued and resumed from its last checkpoint.
+
+    Args:
+        blackboard_url (str): The base URL of the API endpoint.
+        workitem_id (str): The unique identifier of the claimed work item.
+        owner (str): The consumer that claimed the work item.
+        stop_event (threading.Event): Set when the work item is finished.
+        lost_event (threading.Event): Set by the heartbeat if the lease was lost.
+        interval (float, optional): Seconds between heartbeats. Defaults to WORKCONSUMER_HEARTBEAT_SECONDS.
+        split (callable, optional): Splits the work item, returning False if the split failed.
+    """
+    interval = WORKCONSUMER_HEARTBEAT_SECONDS if interval is None else interval
+
+    while not stop_event.wait(interval):
+        try:
+            response = extend_lease(blackboard_url, workitem_id, owner, can_split=split is not None)
+        except requests.exceptions.RequestException as e:
+            print(f"Failed to extend the lease on workitem {workitem_id}: {str(e)}")
+            continue
+
+        if response.status_code == 409:
+            print(f"Lost the lease on workitem {workitem_id}.")
+            lost_event.set()
+            return
+
+        if response.status_code != 200:
+            print(f"Failed to extend the lease on workitem {workitem_id}. Error: {response.status_code} - {response.text}")
+            continue
 
-    # Return the response received from the GET request.
-    return response
+        if split and _split_requested(response) and split() is False:
+            print(f"Abandoning workitem {workitem_id} because part of it could not be handed over.")
+            lost_event.set()
+            return
+
+def _split_requested(response):
+    """
+    Returns True if a lease extension response asks for the work item to be split.
+    """
+    try:
+        return bool(response.json().get('split'))
+    except (ValueError, AttributeError):
+        return False
+
+def split_workitem(blackboard_url, workitem_id, owner, progress, timeout=None):
+    """
+    Hands part of a running search over to the blackboard as new work items.
+
+    The search gives up the later half of the sequences it has not started beneath the
+    shortest sequence that still has any, which for a pooled search are the branches not
+    yet handed to the pool.  Each becomes a work item of the same task,
+    checking only its own sequence and the words beneath it.
+
+    Args:
+        blackboard_url (str): The base URL of the API endpoint.
+        workitem_id (str): The unique identifier of the claimed work item.
+        owner (str): The consumer that claimed the work item.
+        progress (SearchProgress): The progress of the running search.
+        timeout (float, optional): Seconds to wait for the search. Defaults to WORKCONSUMER_SPLIT_SECONDS.
+
+    Returns:
+        bool: False if work was given up but could not be handed over, otherwise True.
+    """
+    timeout = WORKCONSUMER_SPLIT_SECONDS if timeout is None else timeout
+    progress.request_split()
+    split_off = progress.take_split(timeout)
+    if not split_off:
+        return True
+
+    split_data = {
+        'owner': owner,
+        'workitems': [{
+            'current_sequence': ''.join(element[0] for element in cs_copy),
+            'remaining_elements': ''.join(element[0] for element in re_copy),
+            'prefix_from': len(cs_copy)
+        } for cs_copy, re_copy in split_off],
+        'donated': [progress.path(cs_copy) for cs_copy, _ in split_off]
+    }
+    try:
+        response = requests.post(f"{blackboard_url}/workitems/{workitem_id}/split", json=split_data)
+    except requests.exceptions.RequestException as e:
+        print(f"Failed to split workitem {workitem_id}: {str(e)}")
+        return False
+
+    if response.status_code != 200:
+        print(f"Failed to split workitem {workitem_id}. Error: {response.status_code} - {response.text}")
+        return False
+
+    print(f"Split {len(split_off)} sequences off workitem {workitem_id}.")
+    return True
+
+def report_progress(blackboard_url, workitem_id, progress):
+    """
+    Reports how far the search of a work item has got.
+
+    Args:
+        blackboard_url (str): The base URL of the API endpoint.
+        workitem_id (str): The unique identifier of the work item being searched.
+        progress (SearchProgress): The running totals of the search.
+
+    Returns:
+        requests.Response: The response object from the HTTP PUT request.
+    """
+    return requests.put(f"{blackboard_url}/workitems/{workitem_id}/progress", json=progress.snapshot())
+
+def keep_reporting(blackboard_url, workitem_id, progress, stop_event, interval=None):
+    """
+    Reports the progress of a work item every 'interval' seconds until 'stop_event' is set.
+
+    Reports are only sent when something has changed, and failed reports are not retried
+    because the next report carries the latest totals.
+
+    Args:
+        blackboard_url (str): The base URL of the API endpoint.
+        workitem_id (str): The unique identifier of the work item being searched.
+        progress (SearchProgress): The running totals of the search.
+        stop_event (threading.Event): Set when the work item is finished.
+        interval (float, optional): Seconds between reports. Defaults to WORKCONSUMER_PROGRESS_SECONDS.
+    """
+    interval = WORKCONSUMER_PROGRESS_SECONDS if interval is None else interval
+    reported = None
+
+    while not stop_event.wait(interval):
+        snapshot = progress.snapshot()
+        if snapshot == reported:
+            continue
+        try:
+            response = report_progress(blackboard_url, workitem_id, progress)
+        except requests.exceptions.RequestException as e:
+            print(f"Failed to report the progress of workitem {workitem_id}: {str(e)}")
+            continue
+
+        if response.status_code == 200:
+            reported = snapshot
+        else:
+            print(f"Failed to report the progress of workitem {workitem_id}. Error: {response.status_code} - {response.text}")
+
+def save_checkpoint(blackboard_url, workitem_id, owner, cursor):
+    """
+    Saves the search cursor of a claimed work item so that a requeued work item resumes from it.
+
+    Args:
+        blackboard_url (str): The base URL of the API endpoint.
+        workitem_id (str): The unique identifier of the claimed work item.
+        owner (str): The consumer that claimed the work item.
+        cursor (str): The letters after the work item's 'current_sequence' to resume the search at.
+
+    Returns:
+        requests.Response: The response object from the HTTP PUT request.
+    """
+    return requests.put(f"{blackboard_url}/workitems/{workitem_id}/checkpoint", json={'owner': owner, 'cursor': cursor})
+
+def keep_checkpointing(word_queue, progress, stop_event, interval=None):
+    """
+    Queues a Checkpoint of the search cursor every 'interval' seconds until 'stop_event' is set.
+
+    Every word found before the cursor was recorded is already on 'word_queue', so the
+    sender saves the checkpoint only once those words have been sent.
+
+    Args:
+        word_queue (queue.Queue): The queue the search puts its words on.
+        progress (SearchProgress): Records the cursor of the running search.
+        stop_event (threading.Event): Set when the search is finished.
+        interval (float, optional): Seconds between checkpoints. Defaults to WORKCONSUMER_CHECKPOINT_SECONDS.
+    """
+    interval = WORKCONSUMER_CHECKPOINT_SECONDS if interval is None else interval
+    checkpointed = None
+
+    while not stop_event.wait(interval):
+        cursor = progress.cursor()
+        # An empty cursor is the start of the search
+        if cursor and cursor != checkpointed:
+            word_queue.put(Checkpoint(cursor))
+            checkpointed = cursor
 
 def update_workitem_status(blackboard_url, workitem_id, status):
     """
@@ -72,48 +337,582 @@ def update_task_status(blackboard_url, task_id, status):
     # Return the response received from the PUT request.
     return put_response
 
+def post_words(blackboard_url, task_id, words):
+    """
+    Adds a batch of words to a task with a single request.
+
+    Args:
+        blackboard_url (str): The base URL of the API endpoint.
+        task_id (int or str): The unique identifier of the task the words belong to.
+        words (list of str): The words to add.
+
+    Returns:
+        requests.Response: The response object from the HTTP POST request.
+    """
+    return requests.post(f"{blackboard_url}/tasks/{task_id}/words", json={'words': words})
+
+def send_words(blackboard_url, task_id, word_queue, result, workitem_id=None, owner=None, lost_event=None):
+    """
+    Sends the words put on 'word_queue' to the blackboard in batches until it receives None.
+
+    A batch is sent once it has WORKCONSUMER_BATCH_SIZE words or its first word has waited
+    WORKCONSUMER_FLUSH_SECONDS.  A Checkpoint on the queue sends the words before it and
+    then saves its cursor to the work item.  After a failed request the remaining words
+    are discarded so that the search is never left blocked on a full queue.  So are the
+    words still queued once 'lost_event' is set, since the work item is no longer this
+    consumer's to add words or checkpoints to.
+
+    Args:
+        blackboard_url (str): The base URL of the API endpoint.
+        task_id (int or str): The unique identifier of the task the words belong to.
+        word_queue (queue.Queue): The words and Checkpoints from the search, followed by None.
+        result (dict): Receives the last 'response' and has 'failed' (threading.Event) set on error.
+        workitem_id (str, optional): The work item checkpoints are saved to.
+        owner (str, optional): The consumer that claimed the work item.
+        lost_event (threading.Event, optional): Set if the lease on the work item was lost.
+    """
+    finished = False
+    while not finished:
+        item = word_queue.get()
+        if item is None:
+            break
+
+        # Gather more words until the batch is full, its first word has waited long enough or a checkpoint is due
+        batch = []
+        checkpoint = None
+        deadline = time.monotonic() + WORKCONSUMER_FLUSH_SECONDS
+        while True:
+            if isinstance(item, Checkpoint):
+                checkpoint = item
+                break
+            batch.append(item)
+            if len(batch) >= WORKCONSUMER_BATCH_SIZE:
+                break
+            try:
+                item = word_queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is None:
+                finished = True
+                break
+
+        if result['failed'].is_set() or (lost_event is not None and lost_event.is_set()):
+            continue
+
+        if batch:
+            try:
+                result['response'] = post_words(blackboard_url, task_id, batch)
+            except requests.exceptions.RequestException as e:
+                print(f"Error adding {len(batch)} words to the task {task_id}: {str(e)}")
+                result['error'] = e
+                result['failed'].set()
+                continue
+
+            if result['response'].status_code != 200:
+                print(f"Error adding {len(batch)} words to the task {task_id}: {result['response'].status_code}")
+                result['failed'].set()
+                continue
+
+        if checkpoint and workitem_id:
+            # A lost checkpoint only costs the work since the previous one, so carry on
+            try:
+                checkpoint_response = save_checkpoint(blackboard_url, workitem_id, owner, checkpoint.cursor)
+                if checkpoint_response.status_code != 200:
+                    print(f"Failed to checkpoint workitem {workitem_id}. Error: {checkpoint_response.status_code} - {checkpoint_response.text}")
+            except requests.exceptions.RequestException as e:
+                print(f"Failed to checkpoint workitem {workitem_id}: {str(e)}")
+
+def _search_function():
+    """
+    Returns the word search selected by WORKCONSUMER_SEARCH_MODE.
+    """
+    return all_possible_words_breadth_first if WORKCONSUMER_SEARCH_MODE == 'breadth' else all_possible_words
+
+def _search(current_sequence, remaining_elements, prefix_from, progress, cursor):
+    """
+    Runs the word search selected by WORKCONSUMER_SEARCH_MODE, or a depth first search to resume at
+    'cursor' or to skip the sequences in 'progress.skip'.
+    """
+    search = all_possible_words if cursor or (progress and progress.skip) else _search_function()
+    kwargs = {'cursor': cursor} if cursor else {}
+    return search(letters=remaining_elements, max_length=len(current_sequence) + len(remaining_elements),
+                  prefix=current_sequence, prefix_from=prefix_from, progress=progress, **kwargs)
+
+def _search_branch(branch):
+    """
+    Searches one branch of a work item.  Runs in a search pool process.
+
+    Args:
+        branch (tuple): The branch's (current_sequence, remaining_elements, prefix_from, cursor).
+
+    Returns:
+        tuple: The words found and the SearchProgress snapshot of the branch.
+    """
+    current_sequence, remaining_elements, prefix_from, cursor = branch
+    progress = SearchProgress()
+    words = list(_search(current_sequence, remaining_elements, prefix_from, progress, cursor))
+    return words, progress.snapshot()
+
+def _init_search_process(dictionary_path):
+    """
+    Loads the word list named by WORDCHECKER_DICTIONARY into a search pool process as the pool
+    starts, so that the branches the process searches afterwards do not load it again.
+    """
+    if dictionary_path and subsequencer.local_dictionary is None:
+        subsequencer.local_dictionary = LocalDictionary.from_file(dictionary_path)
+
+# This process's search pool and its size, started by the first work item searched with one
+_search_pool = None
+
+def search_pool(processes):
+    """
+    Returns this process's pool of 'processes' search processes, starting it if need be.
+
+    The pool is kept for every later work item the process searches, so its processes
+    start, and load the dictionary, once rather than once per work item.
+
+    Args:
+        processes (int): The number of search processes.
+
+    Returns:
+        multiprocessing.pool.Pool: The search pool.
+    """
+    global _search_pool
+    if _search_pool is not None and _search_pool[0] != processes:
+        close_search_pool()
+    if _search_pool is None:
+        pool = search_pool_context.Pool(processes, initializer=_init_search_process,
+                                        initargs=(subsequencer.wordchecker_dictionary,))
+        _search_pool = (processes, pool)
+    return _search_pool[1]
+
+def close_search_pool():
+    """
+    Stops this process's search pool, abandoning any branches it is still searching.
+    """
+    global _search_pool
+    if _search_pool is not None:
+        _, pool = _search_pool
+        _search_pool = None
+        pool.terminate()
+        pool.join()
+
+def estimated_cost(workitem):
+    """
+    Returns the cost the scheduler estimated for a work item or, for a work item without an
+    estimate, the number of sequences its search could visit with no dictionary to prune it.
+    """
+    cost = workitem.get('estimated_cost')
+    return cost if cost is not None else arrangement_count(list(workitem['remaining_elements']))
 
-def process_workitem(blackboard_url, task_id, current_sequence, remaining_elements):
+def search_processes():
+    """
+    Returns the number of processes each work item is searched with.
+
+    Defaults to the CPU quota shared between the daemon's worker processes.
+
+    Returns:
+        int: WORKCONSUMER_SEARCH_PROCESSES if set, otherwise the CPUs per worker and never less than 1.
+    """
+    if WORKCONSUMER_SEARCH_PROCESSES:
+        return WORKCONSUMER_SEARCH_PROCESSES
+    workers = (WORKCONSUMER_WORKERS or cpu_quota()) if WORKCONSUMER_MODE == 'daemon' else 1
+    return max(1, cpu_quota() // workers)
+
+def search_workitem(current_sequence, remaining_elements, prefix_from=None, progress=None, processes=1, cursor=None):
+    """
+    Generates the words of a work item, searching its branches in parallel when 'processes' > 1.
+
+    The work item is split into one branch per distinct next letter, in the same way the
+    scheduler splits a task, and the branches are searched by this process's search pool
+    (see search_pool).  The words of each branch are yielded in branch order as soon as it
+    and the branches before it are finished, and 'progress' advances one branch at a time,
+    with its cursor at the start of the next branch.
+
+    Branches are handed to the pool as its processes become free, and while the pool
+    searches, 'progress' can split off the later half of the branches not yet handed to it
+    (see SearchProgress.request_split).
+
+    A search resumed at 'cursor' is always depth first, skipping the branches before it.  So
+    is a search that skips the sequences in 'progress.skip', which were given to other work items.
+
+    Args:
+        current_sequence (str): Letters already placed; the search resumes from this sequence.
+        remaining_elements (str): Letters still to be placed.
+        prefix_from (int, optional): The shortest part of 'current_sequence' also checked as a word.
+        progress (SearchProgress, optional): Updated with the work done as the search runs.
+        processes (int, optional): The number of search processes. Defaults to 1, searching in this process.
+        cursor (str, optional): The letters after 'current_sequence' to resume the search at.
+    """
+    branches = []
+    if processes > 1 and not (progress and progress.skip):
+        parent = ([(letter, None) for letter in current_sequence], [(letter, index) for index, letter in enumerate(remaining_elements)])
+        branches = list(next_sequences(*parent))
+
+    # A single branch gains nothing from a pool
+    if len(branches) < 2:
+        yield from _search(current_sequence, remaining_elements, prefix_from, progress, cursor)
+        return
+
+    # The first branch also checks 'current_sequence' and the parts of it this work item checks
+    first_prefix_from = len(current_sequence) if prefix_from is None else prefix_from
+    first_cursor = None
+
+    # Resume at the branch the cursor leads to, with the rest of the cursor
+    share = 1.0 / len(branches)
+    if cursor:
+        letters = [cs_copy[-1][0] for cs_copy, _ in branches]
+        if cursor[0] not in letters:
+            raise ValueError(f"Cursor letter '{cursor[0]}' cannot follow the sequence.")
+        resume_at = letters.index(cursor[0])
+        branches = branches[resume_at:]
+        if resume_at:
+            first_prefix_from = len(branches[0][0])
+        first_cursor = cursor[1:] or None
+        if progress:
+            progress.fraction_done += share * resume_at
+
+    # The branches not yet handed to the pool, which a split gives up from the end of
+    pending = deque(branches)
+    running = deque()
+    if progress:
+        progress.base = len(current_sequence)
+        progress.frames.append((pending, share))
+
+    pool = search_pool(processes)
+    first = True
+    finished = False
+    try:
+        while pending or running:
+            # Keep every search process busy
+            while pending and sum(not result.ready() for result, _ in running) < processes:
+                cs_copy, re_copy = pending.popleft()
+                if first:
+                    branch_prefix_from, branch_cursor = first_prefix_from, first_cursor
+                    first = False
+                else:
+                    branch_prefix_from, branch_cursor = len(cs_copy), None
+                branch = (''.join(element[0] for element in cs_copy), ''.join(element[0] for element in re_copy),
+                          branch_prefix_from, branch_cursor)
+                running.append((pool.apply_async(_search_branch, (branch,)), cs_copy))
+
+            result, _ = running[0]
+            result.wait(WORKCONSUMER_BRANCH_POLL_SECONDS)
+            if progress:
+                progress.poll_split()
+            if not result.ready():
+                continue
+
+            running.popleft()
+            words, snapshot = result.get()
+            yield from words
+            if progress:
+                progress.prefixes_explored += snapshot['prefixes_explored']
+                progress.words_found += snapshot['words_found']
+                progress.fraction_done += snapshot['fraction_done'] * share
+                # Every branch up to this one has been searched and its words yielded
+                next_branch = running[0][1] if running else (pending[0][0] if pending else None)
+                progress.position = list(next_branch) if next_branch else None
+        finished = True
+    finally:
+        if progress:
+            progress.frames.pop()
+        if not finished:
+            # The branches still being searched would hold up the next work item's
+            close_search_pool()
+
+def process_workitem(blackboard_url, task_id, current_sequence, remaining_elements, prefix_from=None, progress=None,
+                     workitem_id=None, owner=None, cursor=None, lost_event=None, processes=None):
     """
     Processes a task by generating all possible words from provided elements
     and sending them to an API endpoint.
 
+    The search runs in this thread and puts the words it finds on a bounded queue,
+    which a sender thread drains in batches (see send_words), so the search does not
+    wait for the blackboard unless the queue fills up.  Every queued word has been sent
+    by the time this function returns.
+
+    Given a 'workitem_id' and a 'progress', the search cursor is checkpointed to the work
+    item every WORKCONSUMER_CHECKPOINT_SECONDS, after the words found before it are sent.
+
+    Once 'lost_event' is set the work item has been requeued, and may already be running
+    on another consumer, so the search stops and the words not yet sent are discarded.
+
     Args:
         blackboard_url (str): The base URL of the API endpoint.
         task_id (int or str): The unique identifier of the task being processed.
-        current_sequence (Any): Current sequence data relevant for task processing.
+        current_sequence (str): Letters already placed; the search resumes from this sequence.
         remaining_elements (list of str): Elements used to generate possible words.
+        prefix_from (int, optional): The shortest part of 'current_sequence' also checked as a word.
+        progress (SearchProgress, optional): Updated with the work done as the search runs.
+        workitem_id (str, optional): The work item to checkpoint the search cursor to.
+        owner (str, optional): The consumer that claimed the work item.
+        cursor (str, optional): A checkpointed cursor to resume the search at.
+        lost_event (threading.Event, optional): Set if the lease on the work item was lost.
+        processes (int, optional): The number of search processes. Defaults to search_processes().
 
     Returns:
         requests.Response: The response object from the last successful HTTP POST request,
         or the response from the first failed request if any error occurs.
     """
 
-    # Initialize variable to store the response from the POST request.
-    post_response = None
+    processes = search_processes() if processes is None else processes
+    word_queue = queue.Queue(maxsize=WORKCONSUMER_QUEUE_SIZE)
+    result = {'response': None, 'error': None, 'failed': threading.Event()}
+    sender = threading.Thread(target=send_words,
+                              args=(blackboard_url, task_id, word_queue, result, workitem_id, owner, lost_event),
+                              daemon=True)
+    sender.start()
+
+    stop_event = threading.Event()
+    checkpointer = None
+    if workitem_id and progress:
+        checkpointer = threading.Thread(target=keep_checkpointing, args=(word_queue, progress, stop_event), daemon=True)
+        checkpointer.start()
+
+    try:
+        # Iterate over all possible words that start with 'current_sequence' and continue with
+        # 'remaining_elements' where the word length does not exceed the number of elements.
+        for next_word in search_workitem(current_sequence, remaining_elements, prefix_from, progress, processes, cursor):
+            # Stop searching once the blackboard has rejected a batch or the work item is no longer ours
+            if result['failed'].is_set() or (lost_event is not None and lost_event.is_set()):
+                break
+
+            # Blocks while the queue is full, i.e. while the sender is behind
+            word_queue.put(next_word)
+    finally:
+        # Stop checkpointing, then wait for every queued word to be sent
+        stop_event.set()
+        if checkpointer:
+            checkpointer.join()
+        word_queue.put(None)
+        sender.join()
+
+    if result['error'] is not None:
+        raise result['error']
+
+    # Return the response from the last POST request.
+    return result['response']
+
+def consume_workitem(blackboard_url, workitem):
+    """
+    Runs a single claimed work item from start to finish: searches it and marks it COMPLETED.
+
+    The lease on the work item is extended, and its progress reported, in the background
+    while it is searched.  If the lease is lost the blackboard has requeued the work item,
+    so it is not marked COMPLETED.
+
+    A work item estimated to cost less than WORKCONSUMER_POOL_MIN_COST is searched in this
+    process, and a more expensive one by the search pool.
+
+    A depth first search, or a search of the work item's branches by the search pool, gives
+    up part of its work when the blackboard reports an idle consumer (see split_workitem),
+    and a resumed work item skips the sequences it gave up before.
+
+    Args:
+        blackboard_url (str): The base URL of the API endpoint.
+        workitem (dict): The work item as claimed from the blackboard, already RUNNING.
+
+    Returns:
+        bool: True if the work item was completed, False otherwise.
+    """
+    workitem_id = workitem['_id']
+    task_id = workitem['task_id']
+    current_sequence = workitem['current_sequence']
+    remaining_elements = workitem['remaining_elements']
+    prefix_from = workitem.get('prefix_from')
+    owner = workitem.get('owner', consumer_id())
+    # Set when an earlier attempt at the workitem checkpointed its search
+    cursor = workitem.get('cursor')
+
+    if cursor:
+        print(f"Resuming workitem={workitem_id}, task={task_id} at '{current_sequence}{cursor}'")
+    else:
+        print(f"Processing workitem={workitem_id}, task={task_id}")
+
+    # The blackboard set the workitem status to 'RUNNING' when it was claimed.
+    # The watcher updates the task status to 'RUNNING'
+
+    stop_event = threading.Event()
+    lost_event = threading.Event()
+    progress = SearchProgress()
+    progress.skip = set(workitem.get('donated') or [])
+    processes = search_processes() if estimated_cost(workitem) >= WORKCONSUMER_POOL_MIN_COST else 1
+    # A depth first search gives up the sequences it has not started, and a pooled search the branches
+    splittable = processes > 1 or cursor or progress.skip or WORKCONSUMER_SEARCH_MODE != 'breadth'
+    split = partial(split_workitem, blackboard_url, workitem_id, owner, progress) if splittable else None
+    heartbeat = threading.Thread(target=keep_lease,
+                                 args=(blackboard_url, workitem_id, owner, stop_event, lost_event),
+                                 kwargs={'split': split},
+                                 daemon=True)
+    reporter = threading.Thread(target=keep_reporting, args=(blackboard_url, workitem_id, progress, stop_event), daemon=True)
+    heartbeat.start()
+    reporter.start()
+    try:
+        post_response = process_workitem(blackboard_url, task_id, current_sequence, remaining_elements, prefix_from,
+                                         progress=progress, workitem_id=workitem_id, owner=owner, cursor=cursor,
+                                         lost_event=lost_event, processes=processes)
+    finally:
+        stop_event.set()
+        heartbeat.join()
+        reporter.join()
+
+    if lost_event.is_set():
+        print(f"Abandoning workitem {workitem_id} because its lease was lost.")
+        return False
+
+    # A work item that finds no words makes no requests
+    if post_response is not None and post_response.status_code != 200:
+        print(f"Failed to process workitem {workitem_id}. Error: {post_response.status_code} - {post_response.text}")
+        return False
+
+    # The search has finished, so report the final totals before completing the workitem
+    progress.fraction_done = 1.0
+    try:
+        progress_response = report_progress(blackboard_url, workitem_id, progress)
+        if progress_response.status_code != 200:
+            print(f"Failed to report the progress of workitem {workitem_id}. Error: {progress_response.status_code} - {progress_response.text}")
+    except requests.exceptions.RequestException as e:
+        print(f"Failed to report the progress of workitem {workitem_id}: {str(e)}")
+
+    complete_response = update_workitem_status(blackboard_url, workitem_id, 'COMPLETED')
 
-    # Iterate over all possible words generated from 'remaining_elements' where the word length
-    # does not exceed the number of elements.
-    for next_word in all_possible_words(letters=remaining_elements, max_length=len(remaining_elements)):
-        # Create a dictionary containing the task id, generated word, and the current timestamp.
-        word_data = {
-            'task_id': task_id,
-            'word': next_word,
-            'lastUpdated': datetime.now(timezone.utc).isoformat() 
-        }
-        # TODO remove lastUpdated because the blackboard app ignores this.  But we do need to find
-        # a way to update the lastUpdated on the task so that we see progress in the web UI
+    if complete_response.status_code != 200:
+        print(f"Failed to complete workitem {workitem_id}. Error: {complete_response.status_code} - {complete_response.text}")
+        return False
 
-        # Send an HTTP POST request with the word data as JSON to the designated API endpoint.
-        post_response = requests.post(f"{blackboard_url}/tasks/{task_id}/words", json=word_data)
+    return True
 
-        # Check if the POST request was unsuccessful, print an error message and return the response.
-        if post_response.status_code != 200:
-            print(f"Error adding word \'{next_word}\' to the task {task_id}: {post_response.status_code}")
-            return post_response
+def consume_next_workitem(blackboard_url):
+    """
+    Claims the next NEW work item and runs it.
 
-    # Return the response from the last successful POST request.
-    return post_response
+    Args:
+        blackboard_url (str): The base URL of the API endpoint.
+
+    Returns:
+        bool: True if a work item was completed, False if there was nothing to do or it failed.
+    """
+    response = claim_workitems(blackboard_url, consumer_id())
+
+    if response.status_code == 404:
+        return False
+
+    if response.status_code != 200:
+        print(f"Error claiming workitems: {response.status_code} - {response.text}")
+        return False
+
+    workitems = response.json()
+
+    if not workitems:
+        return False
+
+    return consume_workitem(blackboard_url, workitems[0])
+
+def run_worker(blackboard_url, poll_time, stop_event):
+    """
+    Consumes work items one after another until 'stop_event' is set.
+
+    A work item that has started is always finished before the worker checks 'stop_event',
+    and the worker waits 'poll_time' seconds whenever there is nothing to do.  The worker's
+    search pool is kept from one work item to the next and stopped when the worker stops.  A work item
+    that fails is logged and left for its lease to expire, so the blackboard requeues it,
+    rather than stopping the worker.
+
+    Args:
+        blackboard_url (str): The base URL of the API endpoint.
+        poll_time (float): Seconds to wait before polling again when idle.
+        stop_event (multiprocessing.Event): Set to ask the worker to stop.
+    """
+    try:
+        while not stop_event.is_set():
+            try:
+                busy = consume_next_workitem(blackboard_url)
+            except requests.exceptions.RequestException as e:
+                print(f"An error occurred: {str(e)}")
+                busy = False
+            except Exception as e:
+                print(f"Failed to consume a workitem: {type(e).__name__}: {str(e)}")
+                busy = False
+
+            if not busy:
+                stop_event.wait(poll_time)
+    finally:
+        close_search_pool()
+
+def cpu_quota():
+    """
+    Returns the number of CPUs this process may use, honouring any cgroup CPU quota.
+
+    Returns:
+        int: The CPU quota rounded up, and never less than 1.
+    """
+    try:
+        # cgroup v2 publishes "<quota> <period>" or "max <period>"
+        with open('/sys/fs/cgroup/cpu.max') as file:
+            quota, period = file.read().split()
+        if quota != 'max':
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+
+    try:
+        # cgroup v1 publishes the quota and the period separately, with -1 for no quota
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as file:
+            quota = int(file.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as file:
+            period = int(file.read())
+        if quota > 0:
+            return max(1, math.ceil(quota / period))
+    except (OSError, ValueError):
+        pass
+
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+def run_daemon(blackboard_url, workers, poll_time):
+    """
+    Runs 'workers' worker processes until the daemon receives SIGTERM or SIGINT.
+
+    On a signal every worker finishes the work item it is running and then exits.  Until
+    then a worker that exits is replaced, checking every 'poll_time' seconds.
+
+    Args:
+        blackboard_url (str): The base URL of the API endpoint.
+        workers (int): The number of worker processes.
+        poll_time (float): Seconds a worker waits before polling again when idle.
+    """
+    stop_event = multiprocessing.Event()
+
+    def _request_stop(signum, frame):
+        print(f"Received signal {signum}, stopping after the current workitems.")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    def _start_worker(n):
+        process = multiprocessing.Process(target=run_worker, args=(blackboard_url, poll_time, stop_event),
+                                          name=f"workconsumer-{n}")
+        process.start()
+        return process
+
+    print(f"Starting {workers} workconsumer workers.")
+    processes = [_start_worker(n) for n in range(workers)]
+
+    # Replace any worker that died, so the daemon does not quietly run with fewer of them
+    while not stop_event.wait(poll_time):
+        for n, process in enumerate(processes):
+            if not process.is_alive():
+                print(f"Worker {process.name} exited with code {process.exitcode}, restarting it.")
+                processes[n] = _start_worker(n)
+
+    for process in processes:
+        process.join()
+
+    print("All workconsumer workers stopped.")
 
 def main():
     try:
@@ -121,14 +920,21 @@ def main():
         blackboard_port = os.getenv('BLACKBOARD_PORT', '8000')
         blackboard_url = f"http://{blackboard_host}:{blackboard_port}"
 
-        response = fetch_workitems(blackboard_url)
+        # Run continuously as a daemon rather than processing a single workitem
+        if WORKCONSUMER_MODE == 'daemon':
+            workers = WORKCONSUMER_WORKERS or cpu_quota()
+            poll_time = float(os.getenv('WORKCONSUMER_POLLTIME', '5'))
+            run_daemon(blackboard_url, workers, poll_time)
+            sys.exit(0)
+
+        response = claim_workitems(blackboard_url, consumer_id())
 
         if response.status_code == 404:
             print("Nothing to process, exiting.")
             sys.exit(0)
 
         if response.status_code != 200:
-            print(f"Error retrieving workitems: {response.status_code} - {response.text}")
+            print(f"Error claiming workitems: {response.status_code} - {response.text}")
             sys.exit(1)
 
         workitems = response.json()
@@ -137,42 +943,11 @@ def main():
             print("No new workitems found.")
             sys.exit(0)
 
-        workitem = workitems[0]
-        workitem_id = workitem['_id']
-        task_id = workitem['task_id']
-        current_sequence = workitem['current_sequence']
-        remaining_elements = workitem['remaining_elements']
-
-        print(f"Processing workitem={workitem_id}, task={task_id}")
-
-        # Update the workitem status to 'RUNNING'
-        put_response = update_workitem_status(blackboard_url, workitem_id, 'RUNNING')
-
-        if put_response.status_code != 200:
-            print(f"Failed to update workitem {workitem_id}. Error: {put_response.status_code} - {put_response.text}")
-            sys.exit(1)
-
-        # The watcher updates the task status to 'RUNNING'
-        # Update the task status to 'RUNNING'
-        # put_response = update_task_status(blackboard_url, task_id, 'RUNNING')
-
-        # if put_response.status_code != 200:
-        #     print(f"Failed to update task {task_id}. Error: {put_response.status_code} - {put_response.text}")
-        #     sys.exit(1)
-
-        post_response = process_workitem(blackboard_url,task_id,current_sequence,remaining_elements)
-        
-        if post_response.status_code != 200:
-            print(f"Failed to process workitem {workitem_id}. Error: {post_response.status_code} - {post_response.text}")
-            sys.exit(1) 
-
-        complete_response = update_workitem_status(blackboard_url, workitem_id, 'COMPLETED')
-
-        if complete_response.status_code != 200:
-            print(f"Failed to complete workitem {workitem_id}. Error: {complete_response.status_code} - {complete_response.text}")
-            sys.exit(1)
-
-        sys.exit(0)
+        try:
+            completed = consume_workitem(blackboard_url, workitems[0])
+        finally:
+            close_search_pool()
+        sys.exit(0 if completed else 1)
 
     except requests.exceptions.RequestException as e:
         print(f"An error occurred: {str(e)}")
@@ -5,6 +5,8 @@ import time
 from datetime import datetime, timezone
 from threading import Lock
 import logging
+import heapq
+from richarsi.beehive.subsequencer import next_sequences, count_words_starting_with, arrangement_count
 
 WORKSCHEDULER_LOG_LEVEL = os.getenv('WORKSCHEDULER_LOG_LEVEL', 'INFO').upper()
 # Convert the string representation of the log level to a numeric value
@@ -47,6 +49,12 @@ class TaskAgent(metaclass=SingletonMeta):
     BLACKBOARD_HOST = os.getenv('BLACKBOARD_HOST', 'localhost')
     BLACKBOARD_PORT = os.getenv('BLACKBOARD_PORT', '8000')
     BASE_URL = f'http://{BLACKBOARD_HOST}:{BLACKBOARD_PORT}/tasks'
+    # Number of letters placed by the scheduler; each distinct starting sequence becomes one work item
+    SPLIT_DEPTH = int(os.getenv('WORKSCHEDULER_SPLIT_DEPTH', '1'))
+    # Work items estimated to cost more than this are split further
+    MAX_ITEM_COST = int(os.getenv('WORKSCHEDULER_MAX_ITEM_COST', '2000'))
+    # Splitting stops once a task has this many work items
+    MAX_WORKITEMS = int(os.getenv('WORKSCHEDULER_MAX_WORKITEMS', '64'))
 
     def __init__(self):
         """
@@ -61,7 +69,7 @@ class TaskAgent(metaclass=SingletonMeta):
         Returns:
             list: A list of tasks or an empty list if no tasks are found.
         """
-        response = self.session.get(f'{self.BASE_URL}?status=NEW')
+        response = self.session.get(f'{self.BASE_URL}?status=NEW&fields=letters')
 
         if response.status_code == 404:
             logging.info("No tasks to process … just loop")
@@ -98,6 +106,117 @@ class TaskAgent(metaclass=SingletonMeta):
         response = self.session.put(url, json=payload)
         return response.status_code == 200
 
+    def split_task(self, letters, depth=None):
+        """
+        Splits the letters of a task into one work item per distinct starting sequence.
+
+        Each work item searches the words that start with its 'current_sequence'.  The
+        shorter sequences passed on the way down are checked by the first work item
+        beneath them, which is recorded in 'prefix_from'.
+
+        Args:
+            letters (str): Letters associated with the task.
+            depth (int, optional): Length of the starting sequences. Defaults to SPLIT_DEPTH.
+
+        Returns:
+            list: The work items covering every word that can be made from the letters.
+        """
+        depth = self.SPLIT_DEPTH if depth is None else depth
+        workitems = []
+
+        def _split(current_sequence, remaining_elements, prefix_from):
+            if len(current_sequence) >= depth or not remaining_elements:
+                workitems.append({
+                    "current_sequence": ''.join(element[0] for element in current_sequence),
+                    "remaining_elements": ''.join(element[0] for element in remaining_elements),
+                    "prefix_from": prefix_from
+                })
+                return
+
+            for n, (cs_copy, re_copy) in enumerate(next_sequences(current_sequence, remaining_elements)):
+                # The first work item beneath this sequence also checks it and any sequence it inherited
+                _split(cs_copy, re_copy, prefix_from if n == 0 else len(cs_copy))
+
+        _split([], [(letter, index) for index, letter in enumerate(letters)], 0)
+        return workitems
+
+    def estimate_costs(self, nodes):
+        """
+        Estimates the cost of searching beneath each of several starting sequences.
+
+        A search beneath a sequence can visit no more sequences than can be arranged from
+        the remaining letters, and is pruned to roughly the dictionary words beneath the
+        sequence times the letters still to place.  The estimate is the smaller of the two,
+        plus one for the sequence itself.
+
+        Args:
+            nodes (list): (current_sequence, remaining_elements) pairs of (letter, index) tuples.
+
+        Returns:
+            list: The estimated cost of each node, or 0 where no word starts with its sequence.
+        """
+        max_length = max((len(cs) + len(re) for cs, re in nodes), default=0)
+        counts = count_words_starting_with([cs for cs, _ in nodes], max_length)
+
+        costs = []
+        for (current_sequence, remaining_elements), count in zip(nodes, counts):
+            if current_sequence and not count:
+                costs.append(0)
+                continue
+            arrangements = arrangement_count([element[0] for element in remaining_elements])
+            costs.append(1 + min(arrangements, count * len(remaining_elements)))
+        return costs
+
+    def partition_task(self, letters):
+        """
+        Splits the letters of a task into work items of roughly even estimated cost.
+
+        The most expensive work item is repeatedly replaced by one work item per distinct
+        next letter until every work item is estimated to cost no more than MAX_ITEM_COST,
+        or the task has MAX_WORKITEMS work items.  Sequences that no word starts with are
+        dropped.  Each work item records its estimate in 'estimated_cost', which is also its
+        'priority' so that consumers claim the most expensive work items first.
+
+        Args:
+            letters (str): Letters associated with the task.
+
+        Returns:
+            list: The work items covering every word that can be made from the letters.
+        """
+        root = ([], [(letter, index) for index, letter in enumerate(letters)])
+        # Heap of (-estimated_cost, order, current_sequence, remaining_elements, prefix_from)
+        heap = [(-self.estimate_costs([root])[0], 0, root[0], root[1], 0)]
+        order = 1
+
+        while heap and -heap[0][0] > self.MAX_ITEM_COST:
+            cost, _, current_sequence, remaining_elements, prefix_from = heap[0]
+            children = list(next_sequences(current_sequence, remaining_elements))
+            if not children or len(heap) - 1 + len(children) > self.MAX_WORKITEMS:
+                break
+
+            heapq.heappop(heap)
+            live_children = [(child, child_cost) for child, child_cost in zip(children, self.estimate_costs(children)) if child_cost]
+
+            if not live_children:
+                # Keep the sequence itself, and any it inherited, to be checked as words
+                heapq.heappush(heap, (-1, order, current_sequence, [], prefix_from))
+                order += 1
+                continue
+
+            for n, ((cs_copy, re_copy), child_cost) in enumerate(live_children):
+                # The first work item beneath this sequence also checks it and any sequence it inherited
+                heapq.heappush(heap, (-child_cost, order, cs_copy, re_copy, prefix_from if n == 0 else len(cs_copy)))
+                order += 1
+
+        # Return the work items in the order they were created
+        return [{
+            "current_sequence": ''.join(element[0] for element in current_sequence),
+            "remaining_elements": ''.join(element[0] for element in remaining_elements),
+            "prefix_from": prefix_from,
+            "estimated_cost": -cost,
+            "priority": -cost
+        } for cost, _, current_sequence, remaining_elements, prefix_from in sorted(heap, key=lambda item: item[1])]
+
     def send_workitems(self, task_id, letters):
         """
         Sends work items corresponding to a given task ID.
@@ -107,17 +226,19 @@ class TaskAgent(metaclass=SingletonMeta):
             letters (str): Letters associated with the task.
 
         Returns:
-            bool: True if sending work items was successful, False otherwise.
+            int: The number of work items sent, or 0 if sending work items failed.
         """
         url = f'{self.BASE_URL}/{task_id}/workitems'
-        workitems = [{
-            "current_sequence": "",
-            "remaining_elements": letters
-        }]
+        try:
+            workitems = self.partition_task(letters)
+        except Exception as e:
+            # Without dictionary counts fall back to splitting at a fixed depth
+            logging.warning(f"Unable to estimate work item costs, splitting at depth {self.SPLIT_DEPTH}: {str(e)}")
+            workitems = self.split_task(letters)
 
         payload = {"workitems": workitems}
         response = self.session.post(url, json=payload)
-        return response.status_code == 200
+        return len(workitems) if response.status_code == 200 else 0
 
     def process_tasks(self):
         """
@@ -132,13 +253,14 @@ class TaskAgent(metaclass=SingletonMeta):
             if not self.update_task_status(task_id, "SCHEDULING"):
                 continue
 
-            if not self.send_workitems(task_id, letters):
+            scheduled_items_count = self.send_workitems(task_id, letters)
+            if not scheduled_items_count:
                 continue
 
             payload = {
                 "status": "SCHEDULED",
                 "lastUpdated": datetime.now(timezone.utc).isoformat(),
-                "scheduled_items_count": 1
+                "scheduled_items_count": scheduled_items_count
             }
             url = f'{self.BASE_URL}/{task_id}'
             response = self.session.put(url, json=payload)
@@ -37,71 +37,92 @@ class WorkWatcher:
         self.base_url = f"http://{self.blackboard_host}:{self.blackboard_port}"
         self.poll_time = int(os.getenv('WORKWATCHER_POLLTIME', 60))
 
+    def reap_workitems(self):
+        logging.info("Requeueing RUNNING workitems with expired leases.")
+        try:
+            response = requests.post(f"{self.base_url}/workitems/reap")
+
+            if response.status_code == 200:
+                reaped = response.json()
+                if reaped['requeued'] or reaped['parked']:
+                    logging.warning(f"Requeued {reaped['requeued']} and parked {reaped['parked']} workitems with expired leases.")
+            else:
+                logging.error(f"Error reaping workitems: {response.status_code} - {response.text}")
+
+        except requests.exceptions.RequestException as e:
+            logging.error(f"An error occurred: {str(e)}")
+
+    def fetch_task_summaries(self, status):
+        """
+        Fetches the tasks in a state with their work item counts per status, in one request.
+
+        Returns:
+            list: The task summaries, or None if they could not be fetched.
+        """
+        response = requests.get(f"{self.base_url}/tasks/summary", params={'status': status})
+
+        if response.status_code == 404:
+            return []
+        if response.status_code != 200:
+            logging.error(f"Error retrieving {status} task summaries: {response.status_code} - {response.text}")
+            return None
+        return response.json()
+
+    def update_task(self, task_id, update_data):
+        put_response = requests.put(f"{self.base_url}/tasks/{task_id}", json=update_data)
+        if put_response.status_code != 200:
+            logging.error(f"Failed to update task {task_id}. Error: {put_response.text}")
+
     def check_scheduled_tasks(self):
         logging.info("Checking the status of SCHEDULED tasks.")
         try:
-            response = requests.get(f"{self.base_url}/tasks", params={'status': 'SCHEDULED'})
-            
-            if response.status_code in [200, 404]:
-                tasks = response.json() if response.status_code == 200 else []
-                for task in tasks:
-                    task_id = task['_id']
-                    workitems_response = requests.get(f"{self.base_url}/tasks/{task_id}/workitems")
-                    
-                    if workitems_response.status_code in [200, 404]:
-                        workitems = workitems_response.json() if workitems_response.status_code == 200 else []
-                        for workitem in workitems:
-                            if workitem['status'] != 'NEW':
-                                update_data = {
-                                    'status': 'RUNNING',
-                                    'lastupdated': datetime.now().isoformat(),
-                                    'started': datetime.now().isoformat()
-                                }
-                                put_response = requests.put(f"{self.base_url}/tasks/{task_id}", json=update_data)
-                                if put_response.status_code != 200:
-                                    logging.error(f"Failed to update task {task_id}. Error: {put_response.text}")
-                                break
-                    else:
-                        logging.error(f"Error retrieving workitems for task {task_id}: {workitems_response.status_code} - {workitems_response.text}")
-            else:
-                logging.error(f"Error retrieving scheduled tasks: {response.status_code} - {response.text}")
-        
+            for task in self.fetch_task_summaries('SCHEDULED') or []:
+                counts = task.get('workitems', {})
+                # A task is running once any of its workitems has been claimed
+                if sum(count for status, count in counts.items() if status != 'NEW'):
+                    self.update_task(task['_id'], {
+                        'status': 'RUNNING',
+                        'lastupdated': datetime.now().isoformat(),
+                        'started': datetime.now().isoformat()
+                    })
+
         except requests.exceptions.RequestException as e:
             logging.error(f"An error occurred: {str(e)}")
 
     def check_running_tasks(self):
         logging.info("Checking the status of RUNNING tasks.")
         try:
-            response = requests.get(f"{self.base_url}/tasks", params={'status': 'RUNNING'})
-            
-            if response.status_code in [200, 404]:
-                tasks = response.json() if response.status_code == 200 else []
-                for task in tasks:
-                    task_id = task['_id']
-                    workitems_response = requests.get(f"{self.base_url}/tasks/{task_id}/workitems")
-                    
-                    if workitems_response.status_code == 200:
-                        workitems = workitems_response.json()
-                        all_completed = all(workitem['status'] == 'COMPLETED' for workitem in workitems)
-                        
-                        if all_completed:
-                            update_data = {
-                                'status': 'COMPLETED',
-                                'lastupdated': datetime.now().isoformat(),
-                                'completed': datetime.now().isoformat()
-                            }
-                            put_response = requests.put(f"{self.base_url}/tasks/{task_id}", json=update_data)
-                            if put_response.status_code != 200:
-                                logging.error(f"Failed to update task {task_id}. Error: {put_response.text}")
-                    else:
-                        logging.error(f"Error retrieving workitems for task {task_id}: {workitems_response.status_code} - {workitems_response.text}")
-            else:
-                logging.error(f"Error retrieving running tasks: {response.status_code} - {response.text}")
-        
+            for task in self.fetch_task_summaries('RUNNING') or []:
+                task_id = task['_id']
+                counts = task.get('workitems', {})
+                total = sum(counts.values())
+                if not total:
+                    continue
+
+                completed = counts.get('COMPLETED', 0)
+                # Parked workitems are never retried so their task can never complete
+                parked = counts.get('PARKED', 0)
+
+                if completed == total:
+                    self.update_task(task_id, {
+                        'status': 'COMPLETED',
+                        'lastupdated': datetime.now().isoformat(),
+                        'completed': datetime.now().isoformat()
+                    })
+                elif completed + parked == total:
+                    logging.error(f"Task {task_id} has parked workitems, marking it FAILED.")
+                    self.update_task(task_id, {
+                        'status': 'FAILED',
+                        'lastupdated': datetime.now().isoformat()
+                    })
+
         except requests.exceptions.RequestException as e:
             logging.error(f"An error occurred: {str(e)}")
 
     def poll_tasks(self):
+        # The blackboard starts and completes tasks as their workitems change status, so the
+        # checks only catch tasks it could not advance, e.g. ones with parked workitems
+        self.reap_workitems()
         self.check_scheduled_tasks()
         self.check_running_tasks()
 
@@ -1,6 +1,8 @@
 import unittest
+import unittest.mock
 from unittest.mock import patch, Mock
-from richarsi.beehive.subsequencer import all_possible_words, get_first_word_starting_with
+from richarsi.beehive.subsequencer import LocalDictionary, SearchProgress, arrangement_count, all_possible_words, all_possible_words_breadth_first, get_first_word_starting_with, get_first_words_starting_with
+from richarsi.beehive import subsequencer
 
 # Mock response for the API call to simulate successful and unsuccessful scenarios
 def mock_get_one_word_starting_with(sequence):
@@ -15,6 +17,9 @@ def mock_get_first_word_starting_with(sequence):
         return valid_word 
     else:
         None
+
+def mock_get_first_words_starting_with(sequences):
+    return [mock_get_first_word_starting_with(sequence) for sequence in sequences]
  
 class TestAllPossibleWords(unittest.TestCase):
 
@@ -27,10 +32,29 @@ class TestAllPossibleWords(unittest.TestCase):
 
     @patch('richarsi.beehive.subsequencer.get_first_word_starting_with', mock_get_first_word_starting_with)
     def test_max_length_exceeded(self):
-        letters = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i']
+        letters = list('abcdefghijklmnopq')
         with self.assertRaises(ValueError):
             list(all_possible_words(letters))
 
+    @patch('richarsi.beehive.subsequencer.get_first_word_starting_with', mock_get_first_word_starting_with)
+    def test_sixteen_letters_accepted(self):
+        letters = list('cabdefghijklmnop')
+        result = list(all_possible_words(letters))
+        expected = [ 'cab' ]
+        self.assertEqual(result, expected)
+
+    @patch('richarsi.beehive.subsequencer.get_first_word_starting_with', mock_get_first_word_starting_with)
+    def test_resume_from_prefix(self):
+        result = list(all_possible_words(['a', 'b'], prefix='c'))
+        expected = [ 'cab' ]
+        self.assertEqual(result, expected)
+
+    @patch('richarsi.beehive.subsequencer.get_first_word_starting_with', mock_get_first_word_starting_with)
+    def test_resume_from_dead_prefix(self):
+        result = list(all_possible_words(['c', 'b'], prefix='a'))
+        expected = [ ]
+        self.assertEqual(result, expected)
+
     @patch('richarsi.beehive.subsequencer.get_first_word_starting_with', mock_get_first_word_starting_with)
     def test_empty_input(self):
         letters = []
@@ -45,6 +69,265 @@ class TestAllPossibleWords(unittest.TestCase):
         expected = [ ]
         self.assertEqual(result, expected)
 
+class TestAllPossibleWordsBreadthFirst(unittest.TestCase):
+
+    @patch('richarsi.beehive.subsequencer.get_first_words_starting_with', mock_get_first_words_starting_with)
+    def test_basic_functionality(self):
+        letters = ['a', 'b', 'c']
+        result = list(all_possible_words_breadth_first(letters))
+        expected = [ 'cab' ]
+        self.assertEqual(result, expected)
+
+    @patch('richarsi.beehive.subsequencer.get_first_words_starting_with')
+    def test_one_call_per_level(self, mock_batch):
+        mock_batch.side_effect = mock_get_first_words_starting_with
+        letters = ['a', 'b', 'c']
+        list(all_possible_words_breadth_first(letters))
+        # Levels 1, 2 and 3 each make one call, the exhausted level 4 has nothing to check
+        self.assertEqual(mock_batch.call_count, 3)
+
+    def test_lookups_are_chunked(self):
+        dictionary = LocalDictionary(["a", "ab", "b", "bad", "bade", "bead", "dab", "de", "ed"])
+        with patch('richarsi.beehive.subsequencer.local_dictionary', dictionary):
+            expected = sorted(all_possible_words(['b', 'e', 'a', 'd']))
+            with patch('richarsi.beehive.subsequencer.get_first_words_starting_with',
+                       wraps=subsequencer.get_first_words_starting_with) as mock_batch:
+                result = sorted(all_possible_words_breadth_first(['b', 'e', 'a', 'd'], max_frontier=4))
+        self.assertEqual(result, expected)
+        # A chunk stops growing once it holds 'max_frontier' sequences, adding at most one sequence's children
+        self.assertGreater(mock_batch.call_count, 1)
+        for call in mock_batch.call_args_list:
+            self.assertLessEqual(len(call.args[0]), 4 + 4 - 1)
+
+    @patch('richarsi.beehive.subsequencer.get_first_word_starting_with', mock_get_first_word_starting_with)
+    @patch('richarsi.beehive.subsequencer.get_first_words_starting_with', mock_get_first_words_starting_with)
+    def test_frontier_fallback(self):
+        letters = ['a', 'b', 'c']
+        result = list(all_possible_words_breadth_first(letters, max_frontier=0))
+        expected = [ 'cab' ]
+        self.assertEqual(result, expected)
+
+    def test_prefix_from_matches_depth_first(self):
+        dictionary = LocalDictionary(["a", "ab", "b", "bad", "bade", "bead", "dab"])
+        with patch('richarsi.beehive.subsequencer.local_dictionary', dictionary):
+            expected = sorted(all_possible_words(['e', 'a', 'd'], prefix='ba', prefix_from=1))
+            result = sorted(all_possible_words_breadth_first(['e', 'a', 'd'], prefix='ba', prefix_from=1))
+        self.assertEqual(result, expected)
+        self.assertEqual(result, ["b", "bad", "bade"])
+
+    @patch('richarsi.beehive.subsequencer.get_first_words_starting_with', mock_get_first_words_starting_with)
+    def test_max_length_exceeded(self):
+        letters = list('abcdefghijklmnopq')
+        with self.assertRaises(ValueError):
+            list(all_possible_words_breadth_first(letters))
+
+class TestGetFirstWordsStartingWith(unittest.TestCase):
+
+    @patch('richarsi.beehive.subsequencer.requests.post')
+    def test_successful_api_call(self, mock_post):
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'first_words': ['example', '']}
+        mock_post.return_value = mock_response
+
+        result = get_first_words_starting_with([['e', 'x'], ['q', 'z']])
+        self.assertEqual(result, ['example', ''])
+        mock_post.assert_called_once_with(unittest.mock.ANY, json={'prefixes': ['ex', 'qz']})
+
+    @patch('richarsi.beehive.subsequencer.requests.post')
+    def test_empty_batch(self, mock_post):
+        result = get_first_words_starting_with([])
+        self.assertEqual(result, [])
+        mock_post.assert_not_called()
+
+class TestLocalDictionary(unittest.TestCase):
+
+    def setUp(self):
+        self.dictionary = LocalDictionary(["cab", "app", "apple", "banana", "app"])
+
+    def test_first_word_starting_with(self):
+        self.assertEqual(self.dictionary.first_word_starting_with('ap'), 'app')
+        self.assertEqual(self.dictionary.first_word_starting_with('appl'), 'apple')
+        self.assertEqual(self.dictionary.first_word_starting_with('cab'), 'cab')
+
+    def test_no_word_starting_with(self):
+        self.assertEqual(self.dictionary.first_word_starting_with('z'), '')
+        self.assertEqual(self.dictionary.first_word_starting_with('bat'), '')
+
+    def test_count_words_starting_with(self):
+        self.assertEqual(self.dictionary.count_words_starting_with('app'), 2)
+        self.assertEqual(self.dictionary.count_words_starting_with('app', max_length=3), 1)
+        self.assertEqual(self.dictionary.count_words_starting_with('z'), 0)
+        self.assertEqual(self.dictionary.count_words_starting_with(''), 4)
+
+    def test_lookups_use_local_dictionary(self):
+        with patch('richarsi.beehive.subsequencer.local_dictionary', self.dictionary), \
+             patch('richarsi.beehive.subsequencer.requests.get') as mock_get:
+            result = list(all_possible_words(['a', 'b', 'c']))
+        self.assertEqual(result, ['cab'])
+        mock_get.assert_not_called()
+
+class TestSearchProgress(unittest.TestCase):
+
+    def setUp(self):
+        self.dictionary = LocalDictionary(["a", "ab", "b", "bad", "bade", "bead", "dab"])
+
+    def test_depth_first_progress(self):
+        progress = SearchProgress()
+        with patch('richarsi.beehive.subsequencer.local_dictionary', self.dictionary):
+            result = list(all_possible_words(['b', 'e', 'a', 'd'], progress=progress))
+        self.assertEqual(progress.words_found, len(result))
+        self.assertAlmostEqual(progress.fraction_done, 1.0)
+        self.assertGreater(progress.prefixes_explored, len(result))
+
+    def test_breadth_first_progress(self):
+        progress = SearchProgress()
+        with patch('richarsi.beehive.subsequencer.local_dictionary', self.dictionary):
+            result = list(all_possible_words_breadth_first(['b', 'e', 'a', 'd'], progress=progress))
+        self.assertEqual(progress.words_found, len(result))
+        self.assertAlmostEqual(progress.fraction_done, 1.0)
+
+    def test_breadth_first_fallback_progress(self):
+        progress = SearchProgress()
+        with patch('richarsi.beehive.subsequencer.local_dictionary', self.dictionary):
+            list(all_possible_words_breadth_first(['b', 'e', 'a', 'd'], max_frontier=1, progress=progress))
+        self.assertAlmostEqual(progress.snapshot()['fraction_done'], 1.0)
+
+    def test_progress_is_partial_while_searching(self):
+        progress = SearchProgress()
+        with patch('richarsi.beehive.subsequencer.local_dictionary', self.dictionary):
+            search = all_possible_words(['b', 'e', 'a', 'd'], progress=progress)
+            next(search)
+        self.assertLess(progress.fraction_done, 1.0)
+        self.assertEqual(progress.words_found, 1)
+
+class TestResumeFromCursor(unittest.TestCase):
+
+    def setUp(self):
+        self.dictionary = LocalDictionary(["a", "ab", "b", "ba", "bad", "bade", "bead", "dab", "dad", "ed"])
+
+    def test_resume_at_every_word(self):
+        for prefix, prefix_from in [('', None), ('b', 0)]:
+            with patch('richarsi.beehive.subsequencer.local_dictionary', self.dictionary):
+                progress = SearchProgress()
+                words, cursors = [], []
+                for word in all_possible_words(list('eadb' if not prefix else 'ead'), prefix=prefix, prefix_from=prefix_from, progress=progress):
+                    words.append(word)
+                    cursors.append(progress.cursor())
+
+                for n, cursor in enumerate(cursors):
+                    with self.subTest(prefix=prefix, cursor=cursor):
+                        resumed = SearchProgress()
+                        result = list(all_possible_words(list('eadb' if not prefix else 'ead'), prefix=prefix, prefix_from=prefix_from,
+                                                         progress=resumed, cursor=cursor))
+                        # The search resumes at the sequence that found the nth word
+                        self.assertEqual(result, words[n:])
+                        self.assertAlmostEqual(resumed.fraction_done, 1.0)
+
+    def test_cursor_is_relative_to_prefix(self):
+        with patch('richarsi.beehive.subsequencer.local_dictionary', self.dictionary):
+            progress = SearchProgress()
+            search = all_possible_words(['e', 'a', 'd'], prefix='b', progress=progress)
+            self.assertEqual(next(search), 'b')
+            self.assertEqual(progress.cursor(), '')
+            self.assertEqual(next(search), 'bead')
+            self.assertEqual(progress.cursor(), 'ead')
+
+    def test_invalid_cursor(self):
+        with patch('richarsi.beehive.subsequencer.local_dictionary', self.dictionary):
+            with self.assertRaises(ValueError):
+                list(all_possible_words(['e', 'a', 'd'], prefix='b', cursor='x'))
+
+class TestSplitSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.dictionary = LocalDictionary(["a", "ab", "b", "ba", "bad", "bade", "bead", "dab", "dad", "ed"])
+
+    def test_split_at_every_word(self):
+        with patch('richarsi.beehive.subsequencer.local_dictionary', self.dictionary):
+            expected = list(all_possible_words(list('eadb')))
+            for n in range(len(expected)):
+                with self.subTest(split_after=n):
+                    progress = SearchProgress()
+                    search = all_possible_words(list('eadb'), progress=progress)
+                    words = [next(search) for _ in range(n + 1)]
+                    progress.request_split()
+                    words.extend(search)
+                    split_off = progress.take_split(0)
+
+                    # The sequences given up hold exactly the words the search did not find
+                    for current_sequence, remaining_elements in split_off:
+                        words.extend(all_possible_words([element[0] for element in remaining_elements],
+                                                        prefix=''.join(element[0] for element in current_sequence),
+                                                        prefix_from=len(current_sequence)))
+                    self.assertEqual(sorted(words), sorted(expected))
+                    self.assertAlmostEqual(progress.fraction_done, 1.0)
+
+    def test_split_gives_up_the_shortest_sequences(self):
+        with patch('richarsi.beehive.subsequencer.local_dictionary', self.dictionary):
+            progress = SearchProgress()
+            search = all_possible_words(list('eadb'), progress=progress)
+            self.assertEqual(next(search), 'ed')
+            progress.request_split()
+            next(search)
+            # Of 'a', 'd' and 'b' still to start at the top, the later two are given up
+            self.assertEqual([progress.path(sequence) for sequence, _ in progress.take_split(0)], ['d', 'b'])
+
+    def test_split_after_request_timed_out(self):
+        with patch('richarsi.beehive.subsequencer.local_dictionary', self.dictionary):
+            expected = list(all_possible_words(list('eadb')))
+            progress = SearchProgress()
+            search = all_possible_words(list('eadb'), progress=progress)
+            words = [next(search)]
+            # The search sees the request, but the consumer stops waiting before the search answers it
+            progress.request_split()
+            self.assertEqual(progress.take_split(0), [])
+            progress._split()
+            # The withdrawn request gives nothing up, so the search still finds every word
+            words.extend(search)
+            self.assertEqual(sorted(words), sorted(expected))
+            self.assertAlmostEqual(progress.fraction_done, 1.0)
+            self.assertEqual(progress.take_split(0), [])
+
+    def test_split_answered_before_taken(self):
+        with patch('richarsi.beehive.subsequencer.local_dictionary', self.dictionary):
+            progress = SearchProgress()
+            search = all_possible_words(list('eadb'), progress=progress)
+            next(search)
+            progress.request_split()
+            next(search)
+            # Asking again before taking the answer keeps the work already given up
+            progress.request_split()
+            self.assertEqual([progress.path(sequence) for sequence, _ in progress.take_split(0)], ['d', 'b'])
+
+    def test_split_with_nothing_left(self):
+        with patch('richarsi.beehive.subsequencer.local_dictionary', self.dictionary):
+            progress = SearchProgress()
+            list(all_possible_words(list('ab'), progress=progress))
+            progress.request_split()
+            self.assertEqual(progress.take_split(0), [])
+
+    def test_skip(self):
+        with patch('richarsi.beehive.subsequencer.local_dictionary', self.dictionary):
+            for cursor, expected in [(None, ['ed', 'a', 'ab']), ('a', ['a', 'ab'])]:
+                with self.subTest(cursor=cursor):
+                    # The sequences starting 'd' and 'b' were given to other work items
+                    progress = SearchProgress()
+                    progress.skip = {'d', 'b'}
+                    words = list(all_possible_words(['b', 'e', 'a', 'd'], progress=progress, cursor=cursor))
+                    self.assertEqual(words, expected)
+                    self.assertAlmostEqual(progress.fraction_done, 1.0)
+
+class TestArrangementCount(unittest.TestCase):
+
+    def test_distinct_letters(self):
+        # Matches the sum of n! / (n-k)! for k=1 to n
+        self.assertEqual([arrangement_count(list('abcde')[:n]) for n in range(6)], [0, 1, 4, 15, 64, 325])
+
+    def test_repeated_letters(self):
+        # a, b, aa, ab, ba, aab, aba, baa
+        self.assertEqual(arrangement_count(['a', 'a', 'b']), 8)
+
 class TestGetFirstWordStartingWith(unittest.TestCase):
     
     @patch('richarsi.beehive.subsequencer.requests.get')  
@@ -2,27 +2,17 @@ import unittest
 from unittest.mock import patch, Mock, MagicMock
 from datetime import datetime, timezone
 import requests
-from richarsi.beehive.workconsumer import fetch_workitems, update_workitem_status, update_task_status, process_workitem
+import time
+import multiprocessing.dummy
+import queue
+import threading
+import tempfile
+from richarsi.beehive import subsequencer
+from richarsi.beehive.subsequencer import SearchProgress, LocalDictionary, all_possible_words
+from richarsi.beehive.workconsumer import report_progress, update_workitem_status, update_task_status, process_workitem, consume_workitem, consume_next_workitem, claim_workitems, keep_lease, keep_reporting, run_worker, run_daemon, cpu_quota, search_workitem, search_processes, search_pool_context, close_search_pool, _init_search_process, send_words, keep_checkpointing, Checkpoint, split_workitem
 
 class TestWorkitemProcessing(unittest.TestCase):
 
-    @patch('richarsi.beehive.workconsumer.requests.get') 
-    def test_fetch_workitems_404(self, mock_get):
-        mock_get.return_value = Mock(status_code=404)
-        base_url = 'http://blackboard:8000'
-        response = fetch_workitems(base_url)
-        self.assertEqual(response.status_code, 404)
-
-    @patch('richarsi.beehive.workconsumer.requests.get')
-    def test_fetch_workitems_200(self, mock_get):
-        mock_response = Mock(status_code=200)
-        mock_response.json.return_value = [{"_id": "1", "task_id": "100"}]
-        mock_get.return_value = mock_response
-        base_url = 'http://blackboard:8000'
-        response = fetch_workitems(base_url)
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.json()), 1)
-
     @patch('richarsi.beehive.workconsumer.requests.put')
     def test_update_workitem_status(self, mock_put):
         mock_put.return_value = Mock(status_code=200)
@@ -30,6 +20,16 @@ class TestWorkitemProcessing(unittest.TestCase):
         response = update_workitem_status(base_url, "1", "RUNNING")
         self.assertEqual(response.status_code, 200)
 
+    @patch('richarsi.beehive.workconsumer.requests.put')
+    def test_report_progress(self, mock_put):
+        mock_put.return_value = Mock(status_code=200)
+        progress = SearchProgress()
+        progress.prefixes_explored, progress.words_found, progress.fraction_done = 12, 3, 0.5
+        response = report_progress('http://blackboard:8000', "1", progress)
+        self.assertEqual(response.status_code, 200)
+        mock_put.assert_called_once_with('http://blackboard:8000/workitems/1/progress',
+                                         json={'prefixes_explored': 12, 'words_found': 3, 'fraction_done': 0.5})
+
 # class TestUpdateTaskStatus(unittest.TestCase):
 
 #     @patch('richarsi.beehive.workconsumer.requests.put')
@@ -75,6 +75,12 @@ class TestWorkitemProcessing(unittest.TestCase):
 #         self.assertEqual(response.text, 'Not Found')
 
 class TestProcessWorkItem(unittest.TestCase):
+
+    def setUp(self):
+        # Search in this process so that the mocked searches are only called once
+        patcher = patch('richarsi.beehive.workconsumer.search_processes', return_value=1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
     
     @patch('requests.post')
     def test_process_workitem_success(self, mock_post):
@@ -97,9 +103,97 @@ class TestProcessWorkItem(unittest.TestCase):
             final_response = process_workitem(base_url, task_id, current_sequence, remaining_elements)
 
             # Assert
-            self.assertEqual(mock_post.call_count, len(all_words_mock))
+            # The words are sent together in one batch
+            mock_post.assert_called_once_with(f"{base_url}/tasks/{task_id}/words", json={'words': all_words_mock})
             self.assertEqual(final_response.status_code, 200)
 
+    @patch('requests.post')
+    def test_process_workitem_flushes_full_batches(self, mock_post):
+        mock_post.return_value = MagicMock(status_code=200)
+        all_words_mock = ['word1', 'word2', 'word3', 'word4', 'word5']
+
+        with patch('richarsi.beehive.workconsumer.all_possible_words', return_value=all_words_mock), \
+             patch('richarsi.beehive.workconsumer.WORKCONSUMER_BATCH_SIZE', 2):
+            final_response = process_workitem("http://example.com", "12345", "abc", "def")
+
+        self.assertEqual([c.kwargs['json']['words'] for c in mock_post.call_args_list],
+                         [['word1', 'word2'], ['word3', 'word4'], ['word5']])
+        self.assertEqual(final_response.status_code, 200)
+
+    @patch('requests.post')
+    def test_process_workitem_flushes_after_time(self, mock_post):
+        mock_post.return_value = MagicMock(status_code=200)
+
+        def slow_search(**kwargs):
+            yield 'word1'
+            time.sleep(0.2)
+            yield 'word2'
+
+        with patch('richarsi.beehive.workconsumer.all_possible_words', side_effect=slow_search), \
+             patch('richarsi.beehive.workconsumer.WORKCONSUMER_FLUSH_SECONDS', 0.01):
+            process_workitem("http://example.com", "12345", "abc", "def")
+
+        # The first word waited too long for the second to join its batch
+        self.assertEqual([c.kwargs['json']['words'] for c in mock_post.call_args_list], [['word1'], ['word2']])
+
+    @patch('requests.post')
+    def test_process_workitem_back_pressure(self, mock_post):
+        sent = []
+
+        def slow_post(url, json):
+            time.sleep(0.01)
+            sent.extend(json['words'])
+            return MagicMock(status_code=200)
+        mock_post.side_effect = slow_post
+        all_words_mock = [f'word{n}' for n in range(10)]
+
+        # The search can only get one word ahead of a slow blackboard
+        with patch('richarsi.beehive.workconsumer.all_possible_words', return_value=all_words_mock), \
+             patch('richarsi.beehive.workconsumer.WORKCONSUMER_BATCH_SIZE', 2), \
+             patch('richarsi.beehive.workconsumer.WORKCONSUMER_QUEUE_SIZE', 1):
+            final_response = process_workitem("http://example.com", "12345", "abc", "def")
+
+        # Every word was sent, in order, before process_workitem returned
+        self.assertEqual(sent, all_words_mock)
+        self.assertEqual(final_response.status_code, 200)
+
+    @patch('requests.post')
+    def test_process_workitem_stops_when_lease_lost(self, mock_post):
+        mock_post.return_value = MagicMock(status_code=200)
+        lost_event = threading.Event()
+        searched = []
+
+        def search(**kwargs):
+            for n in range(10):
+                searched.append(n)
+                # The heartbeat finds that the workitem was requeued after the second word
+                if n == 2:
+                    lost_event.set()
+                yield f'word{n}'
+
+        with patch('richarsi.beehive.workconsumer.all_possible_words', side_effect=search), \
+             patch('richarsi.beehive.workconsumer.WORKCONSUMER_FLUSH_SECONDS', 60):
+            self.assertIsNone(process_workitem("http://example.com", "12345", "abc", "def", lost_event=lost_event))
+
+        # The search stopped, and the words it had buffered were never sent
+        self.assertEqual(searched, [0, 1, 2])
+        mock_post.assert_not_called()
+
+    @patch('requests.post')
+    def test_process_workitem_request_error(self, mock_post):
+        mock_post.side_effect = requests.exceptions.ConnectionError("blackboard down")
+
+        with patch('richarsi.beehive.workconsumer.all_possible_words', return_value=['word1']):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                process_workitem("http://example.com", "12345", "abc", "def")
+
+    @patch('requests.post')
+    def test_process_workitem_no_words(self, mock_post):
+        with patch('richarsi.beehive.workconsumer.all_possible_words', return_value=[]):
+            self.assertIsNone(process_workitem("http://example.com", "12345", "abc", "def"))
+
+        mock_post.assert_not_called()
+
     @patch('requests.post')
     def test_process_workitem_failure(self, mock_post):
         # Arrange
@@ -124,5 +218,462 @@ class TestProcessWorkItem(unittest.TestCase):
             self.assertEqual(mock_post.call_count, 1)
             self.assertEqual(final_response.status_code, 500)
 
+class TestSearchWorkItem(unittest.TestCase):
+
+    def setUp(self):
+        self.dictionary = LocalDictionary(["a", "ab", "b", "ba", "bad", "bade", "bead", "dab", "dad", "ed"])
+        patchers = [patch('richarsi.beehive.subsequencer.local_dictionary', self.dictionary),
+                    # Search the branches in threads so the patched dictionary is shared
+                    patch('richarsi.beehive.workconsumer.search_pool_context', multiprocessing.dummy)]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # Each test starts its own pool of threads
+        self.addCleanup(close_search_pool)
+
+    def test_branches_find_the_same_words(self):
+        for current_sequence, remaining_elements, prefix_from in [('', 'bead', None), ('b', 'ead', 0), ('ba', 'ed', 1), ('ba', 'ed', None)]:
+            with self.subTest(current_sequence=current_sequence, prefix_from=prefix_from):
+                expected = sorted(all_possible_words(list(remaining_elements), prefix=current_sequence, prefix_from=prefix_from))
+                progress = SearchProgress()
+                result = sorted(search_workitem(current_sequence, remaining_elements, prefix_from, progress, processes=3))
+                self.assertEqual(result, expected)
+                self.assertEqual(progress.words_found, len(expected))
+                self.assertAlmostEqual(progress.fraction_done, 1.0)
+
+    def test_branches_resume_at_cursor(self):
+        progress = SearchProgress()
+        words, cursors = [], []
+        for word in search_workitem('', 'bead', None, progress, processes=3):
+            words.append(word)
+            cursors.append(progress.cursor())
+
+        # Branch cursors are recorded once a branch's words have all been yielded
+        for cursor in set(cursors) - {None}:
+            with self.subTest(cursor=cursor):
+                resumed = SearchProgress()
+                result = list(search_workitem('', 'bead', None, resumed, processes=3, cursor=cursor))
+                self.assertEqual(result, words[len(words) - len(result):])
+                self.assertTrue(result)
+                self.assertAlmostEqual(resumed.fraction_done, 1.0)
+
+        # A depth first cursor part way through a branch resumes inside that branch
+        expected = list(all_possible_words(list('ead'), prefix='b', cursor='ad'))
+        result = list(search_workitem('', 'bead', None, processes=3, cursor='bad'))
+        self.assertEqual(result[:len(expected)], expected)
+
+    @patch('richarsi.beehive.workconsumer.search_pool_context')
+    def test_single_process_searches_in_process(self, mock_context):
+        result = list(search_workitem('', 'bead', processes=1))
+
+        self.assertIn('bead', result)
+        mock_context.Pool.assert_not_called()
+
+    def test_pooled_search_gives_up_branches_not_started(self):
+        progress = SearchProgress()
+        # An idle consumer wants work before the pool has started the later branches
+        progress.request_split()
+
+        words = list(search_workitem('', 'bead', None, progress, processes=2))
+
+        split_off = progress.take_split(0)
+        self.assertEqual([(progress.path(cs_copy), ''.join(element[0] for element in re_copy)) for cs_copy, re_copy in split_off],
+                         [('d', 'bea')])
+        given_up = list(all_possible_words(list('bea'), prefix='d', prefix_from=1))
+        self.assertIn('dab', given_up)
+        self.assertEqual(sorted(words + given_up), sorted(all_possible_words(list('bead'))))
+        self.assertAlmostEqual(progress.fraction_done, 1.0)
+
+    @patch('richarsi.beehive.workconsumer.search_pool_context')
+    def test_search_pool_is_kept_between_workitems(self, mock_context):
+        mock_context.Pool.side_effect = multiprocessing.dummy.Pool
+
+        self.assertIn('bead', list(search_workitem('', 'bead', processes=3)))
+        self.assertIn('bad', list(search_workitem('', 'bad', processes=3)))
+
+        # One pool, whose processes load the dictionary as they start
+        mock_context.Pool.assert_called_once_with(3, initializer=_init_search_process,
+                                                  initargs=(subsequencer.wordchecker_dictionary,))
+
+    @patch('richarsi.beehive.workconsumer.search_pool_context')
+    def test_abandoned_search_stops_the_pool(self, mock_context):
+        pools = []
+        mock_context.Pool.side_effect = lambda *args, **kwargs: pools.append(multiprocessing.dummy.Pool(*args, **kwargs)) or pools[-1]
+
+        search = search_workitem('', 'bead', processes=3)
+        next(search)
+        search.close()
+        self.assertIn('bead', list(search_workitem('', 'bead', processes=3)))
+
+        # The branches of the abandoned search were not left running in the pool the next search used
+        self.assertEqual(mock_context.Pool.call_count, 2)
+        with self.assertRaises(ValueError):
+            pools[0].apply(len, ('',))
+
+    def test_search_process_loads_dictionary(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as file:
+            file.write('bad\nbead\n')
+            file.flush()
+            with patch('richarsi.beehive.subsequencer.local_dictionary', None):
+                _init_search_process(file.name)
+                self.assertEqual(subsequencer.local_dictionary.words, ['bad', 'bead'])
+
+    def test_search_pool_does_not_fork(self):
+        # The consumer's threads are running when the pool starts, which forking is not safe with
+        self.assertEqual(search_pool_context.get_start_method(), 'spawn')
+
+    @patch('richarsi.beehive.workconsumer.cpu_quota', return_value=8)
+    def test_search_processes_share_the_cpus(self, mock_cpu_quota):
+        with patch('richarsi.beehive.workconsumer.WORKCONSUMER_MODE', 'daemon'), \
+             patch('richarsi.beehive.workconsumer.WORKCONSUMER_WORKERS', 2):
+            self.assertEqual(search_processes(), 4)
+        with patch('richarsi.beehive.workconsumer.WORKCONSUMER_MODE', 'once'):
+            self.assertEqual(search_processes(), 8)
+        with patch('richarsi.beehive.workconsumer.WORKCONSUMER_SEARCH_PROCESSES', 3):
+            self.assertEqual(search_processes(), 3)
+
+class TestConsumeWorkItem(unittest.TestCase):
+
+    def setUp(self):
+        self.workitem = {'_id': '1', 'task_id': '100', 'current_sequence': 'a', 'remaining_elements': 'bc', 'prefix_from': 0}
+        patcher = patch('richarsi.beehive.workconsumer.report_progress')
+        self.mock_report = patcher.start()
+        self.mock_report.return_value = Mock(status_code=200)
+        self.addCleanup(patcher.stop)
+
+    @patch('richarsi.beehive.workconsumer.process_workitem')
+    @patch('richarsi.beehive.workconsumer.update_workitem_status')
+    def test_consume_workitem_success(self, mock_update, mock_process):
+        mock_update.return_value = Mock(status_code=200)
+        mock_process.return_value = Mock(status_code=200)
+
+        self.assertTrue(consume_workitem('http://blackboard:8000', self.workitem))
+        mock_process.assert_called_once_with('http://blackboard:8000', '100', 'a', 'bc', 0, progress=unittest.mock.ANY,
+                                             workitem_id='1', owner=unittest.mock.ANY, cursor=None,
+                                             lost_event=unittest.mock.ANY, processes=1)
+        # The final report says the workitem is finished
+        self.assertEqual(self.mock_report.call_args.args[2].snapshot()['fraction_done'], 1.0)
+        # The claim already marked the workitem RUNNING
+        self.assertEqual([c.args[2] for c in mock_update.call_args_list], ['COMPLETED'])
+
+    @patch('richarsi.beehive.workconsumer.search_processes', return_value=4)
+    @patch('richarsi.beehive.workconsumer.process_workitem')
+    @patch('richarsi.beehive.workconsumer.update_workitem_status')
+    def test_consume_workitem_pools_expensive_workitems(self, mock_update, mock_process, mock_search_processes):
+        mock_update.return_value = Mock(status_code=200)
+        mock_process.return_value = None
+
+        for workitem, processes in [(self.workitem, 1),
+                                    ({**self.workitem, 'estimated_cost': 19999}, 1),
+                                    ({**self.workitem, 'estimated_cost': 20000}, 4),
+                                    # Without an estimate, every arrangement of 9 distinct letters is too many
+                                    ({**self.workitem, 'remaining_elements': 'bcdefghij'}, 4)]:
+            with self.subTest(workitem=workitem):
+                self.assertTrue(consume_workitem('http://blackboard:8000', workitem))
+                self.assertEqual(mock_process.call_args.kwargs['processes'], processes)
+
+    @patch('richarsi.beehive.workconsumer.cpu_quota', return_value=4)
+    @patch('richarsi.beehive.workconsumer.keep_lease')
+    @patch('richarsi.beehive.workconsumer.process_workitem')
+    @patch('richarsi.beehive.workconsumer.update_workitem_status')
+    def test_consume_workitem_splits_when_deployed(self, mock_update, mock_process, mock_keep_lease, mock_cpu_quota):
+        mock_update.return_value = Mock(status_code=200)
+        mock_process.return_value = None
+
+        # The settings of docker-compose.yaml and k8s/workconsumer.yaml on a pod with 4 CPUs
+        with patch('richarsi.beehive.workconsumer.WORKCONSUMER_MODE', 'daemon'), \
+             patch('richarsi.beehive.workconsumer.WORKCONSUMER_WORKERS', 1), \
+             patch('richarsi.beehive.workconsumer.WORKCONSUMER_SEARCH_PROCESSES', 0):
+            for search_mode in ['depth', 'breadth']:
+                for workitem, processes in [(self.workitem, 1), ({**self.workitem, 'estimated_cost': 50000}, 4)]:
+                    with self.subTest(search_mode=search_mode, processes=processes), \
+                         patch('richarsi.beehive.workconsumer.WORKCONSUMER_SEARCH_MODE', search_mode):
+                        self.assertTrue(consume_workitem('http://blackboard:8000', workitem))
+                        self.assertEqual(mock_process.call_args.kwargs['processes'], processes)
+                        # Pooled and depth first searches offer to give up work to idle consumers
+                        offered = mock_keep_lease.call_args.kwargs['split'] is not None
+                        self.assertEqual(offered, processes > 1 or search_mode == 'depth')
+
+    @patch('richarsi.beehive.workconsumer.process_workitem')
+    @patch('richarsi.beehive.workconsumer.update_workitem_status')
+    def test_consume_workitem_without_words(self, mock_update, mock_process):
+        mock_update.return_value = Mock(status_code=200)
+        # No words were found so no POST request was made
+        mock_process.return_value = None
+
+        self.assertTrue(consume_workitem('http://blackboard:8000', self.workitem))
+        self.assertEqual(mock_update.call_args_list[-1].args[2], 'COMPLETED')
+
+    @patch('richarsi.beehive.workconsumer.process_workitem')
+    @patch('richarsi.beehive.workconsumer.update_workitem_status')
+    def test_consume_workitem_failure(self, mock_update, mock_process):
+        mock_update.return_value = Mock(status_code=200)
+        mock_process.return_value = Mock(status_code=500)
+
+        self.assertFalse(consume_workitem('http://blackboard:8000', self.workitem))
+        mock_update.assert_not_called()
+
+    @patch('richarsi.beehive.workconsumer.keep_lease')
+    @patch('richarsi.beehive.workconsumer.process_workitem')
+    @patch('richarsi.beehive.workconsumer.update_workitem_status')
+    def test_consume_workitem_lease_lost(self, mock_update, mock_process, mock_keep_lease):
+        # The heartbeat finds that the workitem was requeued
+        mock_keep_lease.side_effect = lambda url, workitem_id, owner, stop_event, lost_event, split=None: lost_event.set()
+        mock_process.return_value = Mock(status_code=200)
+
+        self.assertFalse(consume_workitem('http://blackboard:8000', self.workitem))
+        mock_update.assert_not_called()
+
+    @patch('richarsi.beehive.workconsumer.requests.put')
+    def test_keep_lease_until_lost(self, mock_put):
+        mock_put.side_effect = [Mock(status_code=200), Mock(status_code=409)]
+        stop_event = MagicMock()
+        stop_event.wait.return_value = False
+        lost_event = MagicMock()
+
+        keep_lease('http://blackboard:8000', '1', 'host:1', stop_event, lost_event, interval=20)
+
+        self.assertEqual(mock_put.call_count, 2)
+        mock_put.assert_called_with('http://blackboard:8000/workitems/1/lease', json={'owner': 'host:1', 'lease_seconds': unittest.mock.ANY})
+        stop_event.wait.assert_called_with(20)
+        lost_event.set.assert_called_once()
+
+    @patch('richarsi.beehive.workconsumer.requests.put')
+    def test_keep_lease_splits_on_demand(self, mock_put):
+        mock_put.return_value = Mock(status_code=200)
+        mock_put.return_value.json.return_value = {'message': 'Lease extended.', 'split': True}
+        stop_event = MagicMock()
+        stop_event.wait.side_effect = [False, True]
+        lost_event = MagicMock()
+        split = Mock(return_value=True)
+
+        keep_lease('http://blackboard:8000', '1', 'host:1', stop_event, lost_event, interval=20, split=split)
+
+        self.assertTrue(mock_put.call_args.kwargs['json']['can_split'])
+        split.assert_called_once_with()
+        lost_event.set.assert_not_called()
+
+    @patch('richarsi.beehive.workconsumer.requests.put')
+    def test_keep_lease_abandons_after_failed_split(self, mock_put):
+        mock_put.return_value = Mock(status_code=200)
+        mock_put.return_value.json.return_value = {'message': 'Lease extended.', 'split': True}
+        stop_event = MagicMock()
+        stop_event.wait.return_value = False
+        lost_event = MagicMock()
+
+        keep_lease('http://blackboard:8000', '1', 'host:1', stop_event, lost_event, interval=20, split=Mock(return_value=False))
+
+        # The sequences given up may be lost, so the workitem is left to be requeued
+        lost_event.set.assert_called_once()
+
+    @patch('richarsi.beehive.workconsumer.requests.post')
+    def test_split_workitem(self, mock_post):
+        mock_post.return_value = Mock(status_code=200)
+        progress = SearchProgress()
+        progress.base = 1
+        split_off = [([('r', None), ('e', 0), ('l', 2)], [('a', 1), ('d', 3)])]
+
+        with patch.object(progress, 'take_split', return_value=split_off) as mock_take:
+            self.assertTrue(split_workitem('http://blackboard:8000', '1', 'host:1', progress, timeout=2))
+
+        mock_take.assert_called_once_with(2)
+        mock_post.assert_called_once_with('http://blackboard:8000/workitems/1/split', json={
+            'owner': 'host:1',
+            'workitems': [{'current_sequence': 'rel', 'remaining_elements': 'ad', 'prefix_from': 3}],
+            'donated': ['el']
+        })
+
+    @patch('richarsi.beehive.workconsumer.requests.post')
+    def test_split_workitem_nothing_to_give_up(self, mock_post):
+        progress = SearchProgress()
+
+        with patch.object(progress, 'take_split', return_value=[]):
+            self.assertTrue(split_workitem('http://blackboard:8000', '1', 'host:1', progress, timeout=0))
+
+        mock_post.assert_not_called()
+
+    @patch('richarsi.beehive.workconsumer.requests.post')
+    def test_split_workitem_failure(self, mock_post):
+        mock_post.return_value = Mock(status_code=409, text='Lease lost.')
+        progress = SearchProgress()
+
+        with patch.object(progress, 'take_split', return_value=[([('r', None), ('e', 0)], [('a', 1)])]):
+            self.assertFalse(split_workitem('http://blackboard:8000', '1', 'host:1', progress, timeout=0))
+
+    @patch('richarsi.beehive.workconsumer.process_workitem')
+    @patch('richarsi.beehive.workconsumer.update_workitem_status')
+    def test_consume_workitem_skips_donated(self, mock_update, mock_process):
+        mock_update.return_value = Mock(status_code=200)
+        mock_process.return_value = Mock(status_code=200)
+
+        self.assertTrue(consume_workitem('http://blackboard:8000', {**self.workitem, 'donated': ['c']}))
+        self.assertEqual(mock_process.call_args.kwargs['progress'].skip, {'c'})
+
+    @patch('richarsi.beehive.workconsumer.requests.put')
+    def test_keep_lease_stops(self, mock_put):
+        stop_event = MagicMock()
+        stop_event.wait.side_effect = [False, True]
+        mock_put.side_effect = requests.exceptions.ConnectionError("blackboard down")
+        lost_event = MagicMock()
+
+        keep_lease('http://blackboard:8000', '1', 'host:1', stop_event, lost_event, interval=20)
+
+        self.assertEqual(mock_put.call_count, 1)
+        lost_event.set.assert_not_called()
+
+    def test_consume_workitem_resumes_at_cursor(self):
+        workitem = dict(self.workitem, cursor='c', owner='host:1')
+        with patch('richarsi.beehive.workconsumer.process_workitem') as mock_process, \
+             patch('richarsi.beehive.workconsumer.update_workitem_status') as mock_update:
+            mock_update.return_value = Mock(status_code=200)
+            mock_process.return_value = None
+            self.assertTrue(consume_workitem('http://blackboard:8000', workitem))
+
+        self.assertEqual(mock_process.call_args.kwargs['cursor'], 'c')
+        self.assertEqual(mock_process.call_args.kwargs['owner'], 'host:1')
+
+    @patch('richarsi.beehive.workconsumer.save_checkpoint')
+    @patch('richarsi.beehive.workconsumer.post_words')
+    def test_send_words_saves_checkpoints_after_earlier_words(self, mock_post_words, mock_save_checkpoint):
+        calls = Mock()
+
+        def post_words(url, task_id, words):
+            calls.post(list(words))
+            return Mock(status_code=200)
+
+        def save_checkpoint(url, workitem_id, owner, cursor):
+            calls.checkpoint(cursor)
+            return Mock(status_code=200)
+        mock_post_words.side_effect = post_words
+        mock_save_checkpoint.side_effect = save_checkpoint
+
+        word_queue = queue.Queue()
+        for item in ['bad', 'bade', Checkpoint('ead'), 'bead', None]:
+            word_queue.put(item)
+        result = {'response': None, 'error': None, 'failed': threading.Event()}
+
+        send_words('http://blackboard:8000', '100', word_queue, result, '1', 'host:1')
+
+        self.assertEqual(calls.mock_calls, [unittest.mock.call.post(['bad', 'bade']), unittest.mock.call.checkpoint('ead'),
+                                            unittest.mock.call.post(['bead'])])
+
+    def test_keep_checkpointing_queues_new_cursors(self):
+        progress = SearchProgress()
+        word_queue = queue.Queue()
+        stop_event = MagicMock()
+        cursors = iter([None, '', 'a', 'a', 'ab'])
+
+        def advance(interval):
+            cursor = next(cursors, None)
+            if cursor is None and stop_event.wait.call_count > 1:
+                return True
+            progress.position, progress.base = ([(letter, None) for letter in cursor], 0) if cursor is not None else (None, 0)
+            return False
+        stop_event.wait.side_effect = advance
+
+        keep_checkpointing(word_queue, progress, stop_event, interval=30)
+
+        self.assertEqual([word_queue.get_nowait() for _ in range(word_queue.qsize())], [Checkpoint('a'), Checkpoint('ab')])
+
+    def test_keep_reporting_only_sends_changes(self):
+        progress = SearchProgress()
+        stop_event = MagicMock()
+
+        def advance(interval):
+            # The search finds a word before the first report and nothing before the second
+            if stop_event.wait.call_count == 1:
+                progress.words_found = 1
+            return stop_event.wait.call_count > 3
+        stop_event.wait.side_effect = advance
+
+        keep_reporting('http://blackboard:8000', '1', progress, stop_event, interval=5)
+
+        self.mock_report.assert_called_once_with('http://blackboard:8000', '1', progress)
+
+    @patch('richarsi.beehive.workconsumer.requests.post')
+    def test_claim_workitems(self, mock_post):
+        mock_post.return_value = Mock(status_code=200)
+
+        response = claim_workitems('http://blackboard:8000', 'host:1', limit=2, lease_seconds=30)
+
+        self.assertEqual(response.status_code, 200)
+        mock_post.assert_called_once_with('http://blackboard:8000/workitems/claim',
+                                          json={'owner': 'host:1', 'limit': 2, 'lease_seconds': 30})
+
+    @patch('richarsi.beehive.workconsumer.consume_workitem')
+    @patch('richarsi.beehive.workconsumer.claim_workitems')
+    def test_consume_next_workitem_claims(self, mock_claim, mock_consume):
+        mock_claim.return_value = Mock(status_code=200)
+        mock_claim.return_value.json.return_value = [self.workitem]
+        mock_consume.return_value = True
+
+        self.assertTrue(consume_next_workitem('http://blackboard:8000'))
+        mock_consume.assert_called_once_with('http://blackboard:8000', self.workitem)
+
+    @patch('richarsi.beehive.workconsumer.consume_workitem')
+    @patch('richarsi.beehive.workconsumer.claim_workitems')
+    def test_consume_next_workitem_nothing_to_claim(self, mock_claim, mock_consume):
+        mock_claim.return_value = Mock(status_code=404)
+
+        self.assertFalse(consume_next_workitem('http://blackboard:8000'))
+        mock_consume.assert_not_called()
+
+class TestRunWorker(unittest.TestCase):
+
+    @patch('richarsi.beehive.workconsumer.consume_next_workitem')
+    def test_worker_waits_when_idle_and_stops(self, mock_consume_next):
+        mock_consume_next.side_effect = [True, False]
+        stop_event = MagicMock()
+        stop_event.is_set.side_effect = [False, False, True]
+
+        run_worker('http://blackboard:8000', 5, stop_event)
+
+        self.assertEqual(mock_consume_next.call_count, 2)
+        stop_event.wait.assert_called_once_with(5)
+
+    @patch('richarsi.beehive.workconsumer.consume_next_workitem')
+    def test_worker_survives_request_errors(self, mock_consume_next):
+        mock_consume_next.side_effect = requests.exceptions.ConnectionError("blackboard down")
+        stop_event = MagicMock()
+        stop_event.is_set.side_effect = [False, True]
+
+        run_worker('http://blackboard:8000', 5, stop_event)
+
+        stop_event.wait.assert_called_once_with(5)
+
+    @patch('richarsi.beehive.workconsumer.consume_next_workitem')
+    def test_worker_survives_workitem_failures(self, mock_consume_next):
+        # e.g. the wordchecker answering with an error, then a work item that succeeds
+        mock_consume_next.side_effect = [Exception("API request failed with status code 500"), True]
+        stop_event = MagicMock()
+        stop_event.is_set.side_effect = [False, False, True]
+
+        run_worker('http://blackboard:8000', 5, stop_event)
+
+        self.assertEqual(mock_consume_next.call_count, 2)
+        stop_event.wait.assert_called_once_with(5)
+
+    @patch('richarsi.beehive.workconsumer.signal.signal')
+    @patch('richarsi.beehive.workconsumer.multiprocessing')
+    def test_daemon_restarts_dead_workers(self, mock_multiprocessing, mock_signal):
+        alive, dead, replacement = MagicMock(name='alive'), MagicMock(name='dead'), MagicMock(name='replacement')
+        alive.is_alive.return_value = True
+        dead.is_alive.return_value = False
+        mock_multiprocessing.Process.side_effect = [alive, dead, replacement]
+        stop_event = mock_multiprocessing.Event.return_value
+        stop_event.wait.side_effect = [False, True]
+
+        run_daemon('http://blackboard:8000', 2, 5)
+
+        self.assertEqual(mock_multiprocessing.Process.call_count, 3)
+        self.assertEqual(mock_multiprocessing.Process.call_args.kwargs['name'], 'workconsumer-1')
+        replacement.start.assert_called_once()
+        alive.join.assert_called_once()
+        replacement.join.assert_called_once()
+        dead.join.assert_not_called()
+
+    def test_cpu_quota(self):
+        self.assertGreaterEqual(cpu_quota(), 1)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
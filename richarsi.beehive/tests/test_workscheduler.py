@@ -3,6 +3,7 @@ from unittest.mock import patch, MagicMock
 import unittest.mock
 from datetime import datetime
 from richarsi.beehive.workscheduler import TaskAgent  # Assuming your code is in a file named task_agent.py
+from richarsi.beehive.subsequencer import LocalDictionary, all_possible_words
 
 class TestTaskAgent(unittest.TestCase):
 
@@ -32,8 +33,9 @@ class TestTaskAgent(unittest.TestCase):
 
         self.assertTrue(success)
 
+    @patch('richarsi.beehive.workscheduler.count_words_starting_with', side_effect=Exception("wordchecker unavailable"))
     @patch('richarsi.beehive.workscheduler.requests.Session.post')
-    def test_send_workitems_success(self, mock_post):
+    def test_send_workitems_success(self, mock_post, mock_counts):
         # Mock response for successful post
         mock_response = MagicMock()
         mock_response.status_code = 200
@@ -44,10 +46,11 @@ class TestTaskAgent(unittest.TestCase):
 
         self.assertTrue(success)
 
+    @patch('richarsi.beehive.workscheduler.count_words_starting_with', side_effect=Exception("wordchecker unavailable"))
     @patch('richarsi.beehive.workscheduler.requests.Session.get')
     @patch('richarsi.beehive.workscheduler.requests.Session.put')
     @patch('richarsi.beehive.workscheduler.requests.Session.post')
-    def test_process_tasks(self, mock_post, mock_put, mock_get):
+    def test_process_tasks(self, mock_post, mock_put, mock_get, mock_counts):
         # helper method
         def _is_isoformat_string(value):
             try:
@@ -75,7 +78,7 @@ class TestTaskAgent(unittest.TestCase):
         agent.process_tasks()
 
         mock_get.assert_called_once() 
-        mock_put.assert_called_with(f'{agent.BASE_URL}/1', json={'status': 'SCHEDULED', 'lastUpdated': unittest.mock.ANY, 'scheduled_items_count': 1})
+        mock_put.assert_called_with(f'{agent.BASE_URL}/1', json={'status': 'SCHEDULED', 'lastUpdated': unittest.mock.ANY, 'scheduled_items_count': 3})
         mock_post.assert_called_once()
 
         # Retrieve the actual call arguments
@@ -87,6 +90,71 @@ class TestTaskAgent(unittest.TestCase):
         else:
             raise AssertionError("lastUpdated key not found in json")
 
+    def test_split_task_one_workitem_per_prefix(self):
+        agent = TaskAgent()
+        workitems = agent.split_task("abca", depth=1)
+
+        self.assertEqual([workitem["current_sequence"] for workitem in workitems], ["a", "b", "c"])
+        self.assertEqual(workitems[0], {"current_sequence": "a", "remaining_elements": "bca", "prefix_from": 0})
+        self.assertEqual(workitems[1]["remaining_elements"], "aca")
+
+    def test_split_task_covers_every_word_once(self):
+        dictionary = LocalDictionary(["a", "ab", "aba", "bad", "bead", "bed", "dab", "dad", "dead", "ebb", "ed"])
+        letters = "abeda"
+        agent = TaskAgent()
+
+        with patch('richarsi.beehive.subsequencer.local_dictionary', dictionary):
+            expected = sorted(all_possible_words(letters))
+            for depth in range(0, len(letters) + 2):
+                with self.subTest(depth=depth):
+                    found = []
+                    for workitem in agent.split_task(letters, depth=depth):
+                        found.extend(all_possible_words(workitem["remaining_elements"],
+                                                        prefix=workitem["current_sequence"],
+                                                        prefix_from=workitem["prefix_from"]))
+                    self.assertEqual(sorted(found), expected)
+
+    def test_partition_task_covers_every_word_once(self):
+        dictionary = LocalDictionary(["a", "ab", "aba", "bad", "bead", "bed", "dab", "dad", "dead", "ebb", "ed"])
+        letters = "abeda"
+        agent = TaskAgent()
+
+        with patch('richarsi.beehive.subsequencer.local_dictionary', dictionary):
+            expected = sorted(all_possible_words(letters))
+            for max_item_cost in [1, 5, 20, 100000]:
+                with self.subTest(max_item_cost=max_item_cost), patch.object(TaskAgent, 'MAX_ITEM_COST', max_item_cost):
+                    found = []
+                    for workitem in agent.partition_task(letters):
+                        found.extend(all_possible_words(workitem["remaining_elements"],
+                                                        prefix=workitem["current_sequence"],
+                                                        prefix_from=workitem["prefix_from"]))
+                    self.assertEqual(sorted(found), expected)
+
+    def test_partition_task_splits_expensive_prefixes(self):
+        dictionary = LocalDictionary(["bad", "bade", "bead", "bed", "dab", "ebb"])
+        agent = TaskAgent()
+
+        with patch('richarsi.beehive.subsequencer.local_dictionary', dictionary), \
+             patch.object(TaskAgent, 'MAX_ITEM_COST', 8):
+            workitems = agent.partition_task("abde")
+
+        # No word starts with 'a' so it is dropped, and 'b' is split further than 'd' or 'e'
+        sequences = [workitem["current_sequence"] for workitem in workitems]
+        self.assertNotIn("a", sequences)
+        self.assertIn("d", sequences)
+        self.assertIn("ba", sequences)
+        self.assertTrue(all(workitem["estimated_cost"] <= 8 for workitem in workitems))
+
+    def test_partition_task_respects_max_workitems(self):
+        dictionary = LocalDictionary(["bad", "bade", "bead", "bed", "dab", "ebb"])
+        agent = TaskAgent()
+
+        with patch('richarsi.beehive.subsequencer.local_dictionary', dictionary), \
+             patch.object(TaskAgent, 'MAX_ITEM_COST', 1), patch.object(TaskAgent, 'MAX_WORKITEMS', 3):
+            workitems = agent.partition_task("abde")
+
+        self.assertLessEqual(len(workitems), 3)
+
     def test_singleton_behavior(self):
         instance1 = TaskAgent()
         instance2 = TaskAgent()
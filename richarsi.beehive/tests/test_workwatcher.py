@@ -8,65 +8,92 @@ class TestWorkWatcher(unittest.TestCase):
     @patch('richarsi.beehive.workwatcher.requests.get')
     @patch('richarsi.beehive.workwatcher.requests.put')
     def test_check_scheduled_tasks(self, mock_put, mock_get):
-        # Setup mock response for GET request
+        # One of the task's workitems has been claimed
         mock_get.return_value.status_code = 200
         mock_get.return_value.json.return_value = [
-            {'_id': 'task1', 'status': 'SCHEDULED'}
+            {'_id': 'task1', 'status': 'SCHEDULED', 'workitems': {'NEW': 2, 'RUNNING': 1}}
         ]
 
-        # Setup workitems response
-        mock_workitems_response = MagicMock()
-        mock_workitems_response.status_code = 200
-        mock_workitems_response.json.return_value = [
-            {'status': 'IN_PROGRESS'}
-        ]
-        
-        # Chaining the mock for second GET call
-        mock_get.side_effect = [mock_get.return_value, mock_workitems_response]
-
         # Initialize instance and execute method
         watcher = WorkWatcher.get_instance()
         watcher.check_scheduled_tasks()
 
         # Assertions
-        self.assertTrue(mock_put.called)
+        mock_get.assert_called_once_with(f'{watcher.base_url}/tasks/summary', params={'status': 'SCHEDULED'})
         mock_put.assert_called_with(f'{watcher.base_url}/tasks/task1', json={
             'status': 'RUNNING',
             'lastupdated': unittest.mock.ANY,
             'started': unittest.mock.ANY
         })
 
+    @patch('richarsi.beehive.workwatcher.requests.get')
+    @patch('richarsi.beehive.workwatcher.requests.put')
+    def test_check_scheduled_tasks_not_started(self, mock_put, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = [{'_id': 'task1', 'status': 'SCHEDULED', 'workitems': {'NEW': 3}}]
+
+        watcher = WorkWatcher.get_instance()
+        watcher.check_scheduled_tasks()
+
+        mock_put.assert_not_called()
+
     @patch('richarsi.beehive.workwatcher.requests.get')
     @patch('richarsi.beehive.workwatcher.requests.put')
     def test_check_running_tasks(self, mock_put, mock_get):
-        # Setup mock response for GET request
+        # Every workitem of task2 is completed and task4 is still running
         mock_get.return_value.status_code = 200
         mock_get.return_value.json.return_value = [
-            {'_id': 'task2', 'status': 'RUNNING'}
-        ]
-
-        # Setup workitems response with all completed status
-        mock_workitems_response = MagicMock()
-        mock_workitems_response.status_code = 200
-        mock_workitems_response.json.return_value = [
-            {'status': 'COMPLETED'}, {'status': 'COMPLETED'}
+            {'_id': 'task2', 'status': 'RUNNING', 'workitems': {'COMPLETED': 2}},
+            {'_id': 'task4', 'status': 'RUNNING', 'workitems': {'COMPLETED': 1, 'RUNNING': 1}}
         ]
 
-        # Chaining the mock for second GET call
-        mock_get.side_effect = [mock_get.return_value, mock_workitems_response]
-
         # Initialize instance and execute method
         watcher = WorkWatcher.get_instance()
         watcher.check_running_tasks()
 
-        # Assertions
-        self.assertTrue(mock_put.called)
-        mock_put.assert_called_with(f'{watcher.base_url}/tasks/task2', json={
+        # A single request replaces one per task
+        mock_get.assert_called_once_with(f'{watcher.base_url}/tasks/summary', params={'status': 'RUNNING'})
+        mock_put.assert_called_once_with(f'{watcher.base_url}/tasks/task2', json={
             'status': 'COMPLETED',
             'lastupdated': unittest.mock.ANY,
             'completed': unittest.mock.ANY
         })
 
+    @patch('richarsi.beehive.workwatcher.requests.get')
+    @patch('richarsi.beehive.workwatcher.requests.put')
+    def test_check_running_tasks_with_parked_workitems(self, mock_put, mock_get):
+        # A workitem exceeded its attempts and was parked
+        mock_get.return_value = MagicMock(status_code=200)
+        mock_get.return_value.json.return_value = [{'_id': 'task3', 'status': 'RUNNING', 'workitems': {'COMPLETED': 1, 'PARKED': 1}}]
+
+        watcher = WorkWatcher.get_instance()
+        watcher.check_running_tasks()
+
+        mock_put.assert_called_once_with(f'{watcher.base_url}/tasks/task3', json={
+            'status': 'FAILED',
+            'lastupdated': unittest.mock.ANY
+        })
+
+    @patch('richarsi.beehive.workwatcher.requests.get')
+    @patch('richarsi.beehive.workwatcher.requests.put')
+    def test_check_running_tasks_none_running(self, mock_put, mock_get):
+        mock_get.return_value = MagicMock(status_code=404)
+
+        watcher = WorkWatcher.get_instance()
+        watcher.check_running_tasks()
+
+        mock_put.assert_not_called()
+
+    @patch('richarsi.beehive.workwatcher.requests.post')
+    def test_reap_workitems(self, mock_post):
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = {'requeued': 1, 'parked': 0}
+
+        watcher = WorkWatcher.get_instance()
+        watcher.reap_workitems()
+
+        mock_post.assert_called_once_with(f'{watcher.base_url}/workitems/reap')
+
     def test_singleton(self):
         # Test that only one instance is created
         instance1 = WorkWatcher.get_instance()
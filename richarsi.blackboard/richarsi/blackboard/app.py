@@ -1,9 +1,20 @@
 import os
+import heapq
+import json
+import queue
+import time
+import zlib
+import click
+from contextlib import ExitStack
 from flask import Flask, request, jsonify, Response
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument, IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from bson.binary import Binary
 from bson.objectid import ObjectId
 from http import HTTPStatus
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
+from richarsi.blackboard.wordwriter import WordWriter, only_duplicate_keys
+from richarsi.blackboard.notifier import ChangeNotifier
 
 app = Flask(__name__)
 
@@ -14,6 +25,175 @@ db = client.wordsdb
 tasks_collection = db.tasks
 words_collection = db.words
 workitems_collection = db.work_items
+signals_collection = db.signals
+results_collection = db.results
+cache_collection = db.cache
+
+# Seconds a claimed work item stays leased to its owner unless the request asks otherwise
+DEFAULT_LEASE_SECONDS = int(os.getenv('BLACKBOARD_LEASE_SECONDS', '60'))
+# Claims after which a work item whose lease keeps expiring is parked rather than requeued
+MAX_ATTEMPTS = int(os.getenv('BLACKBOARD_MAX_ATTEMPTS', '3'))
+# Seconds a consumer that found nothing to claim is counted as waiting for work
+DEMAND_SECONDS = int(os.getenv('BLACKBOARD_DEMAND_SECONDS', '30'))
+# The longest a /status request may wait for its task to change
+STATUS_MAX_WAIT_SECONDS = float(os.getenv('BLACKBOARD_STATUS_MAX_WAIT', '30'))
+# Seconds between re-reading a task a /status request is waiting on, 0 to rely on this process's
+# notifications alone.  Set it when several processes serve the blackboard, since a change made
+# by one process does not wake requests waiting in another.
+STATUS_RECHECK_SECONDS = float(os.getenv('BLACKBOARD_STATUS_RECHECK', '0'))
+
+# The most words returned by one request for the words a running task has found so far
+PARTIAL_WORDS_LIMIT = int(os.getenv('BLACKBOARD_PARTIAL_WORDS_LIMIT', '1000'))
+
+# Seconds a completed task's word documents are kept once its results have been built from them
+WORDS_RETENTION_SECONDS = int(os.getenv('BLACKBOARD_WORDS_RETENTION', '3600'))
+# The size in bytes beyond which a completed task's words are stored compressed
+RESULTS_COMPRESS_BYTES = int(os.getenv('BLACKBOARD_RESULTS_COMPRESS_BYTES', '65536'))
+
+# Whether a task for letters whose results are already known completes at once with those results
+RESULT_CACHE = os.getenv('BLACKBOARD_RESULT_CACHE', 'true').lower() in ('1', 'true')
+
+# Whether a task for letters that another task is already searching follows that task rather than searching them again
+COALESCE_TASKS = os.getenv('BLACKBOARD_COALESCE_TASKS', 'true').lower() in ('1', 'true')
+
+# Wakes /status requests waiting for a task to change
+task_notifier = ChangeNotifier()
+
+# Either '' to write words as each request arrives, 'group' to batch the words of concurrent requests
+# and reply once they are written, or 'behind' to batch them and reply as soon as they are queued
+WORD_WRITER_MODE = os.getenv('BLACKBOARD_WORD_WRITER', '').lower()
+word_writer = WordWriter(
+    words_collection,
+    max_queue=int(os.getenv('BLACKBOARD_WORD_WRITER_QUEUE', '10000')),
+    max_batch=int(os.getenv('BLACKBOARD_WORD_WRITER_BATCH', '1000')),
+    flush_interval=float(os.getenv('BLACKBOARD_WORD_WRITER_INTERVAL', '0.05'))
+) if WORD_WRITER_MODE in ('group', 'behind') else None
+
+# The order a completed task's words are read in to build its results
+RESULT_WORD_ORDER = [('length', ASCENDING), ('word', ASCENDING)]
+
+def required_indexes():
+    """
+    Return the indexes the blackboard's queries rely on, as (collection, [IndexModel]) pairs.
+    """
+    return [
+        (tasks_collection, [
+            # GET /tasks?status= pages through tasks in _id order
+            IndexModel([('status', ASCENDING), ('_id', ASCENDING)], name='status_id'),
+            # Only one task at a time searches an anagram of some letters, the rest follow it
+            IndexModel([('letters_key', ASCENDING)], unique=True, partialFilterExpression={'in_flight': True},
+                       name='letters_key_in_flight_unique'),
+            # Results are kept while any task points at them
+            IndexModel([('results_id', ASCENDING)], partialFilterExpression={'results_id': {'$exists': True}},
+                       name='results_id'),
+            # A task that finishes finds the tasks following it
+            IndexModel([('leader_id', ASCENDING)], partialFilterExpression={'leader_id': {'$exists': True}},
+                       name='leader_id')
+        ]),
+        (workitems_collection, [
+            # Claims take the highest priority NEW work item
+            IndexModel([('status', ASCENDING), ('priority', DESCENDING), ('_id', ASCENDING)], name='status_priority_id'),
+            # GET /workitems?status= pages through work items in _id order
+            IndexModel([('status', ASCENDING), ('_id', ASCENDING)], name='status_id'),
+            # The reaper looks for RUNNING work items whose lease has expired
+            IndexModel([('status', ASCENDING), ('leaseExpires', ASCENDING)], name='status_leaseExpires'),
+            # GET /tasks/<id>/workitems and claims restricted to one task
+            IndexModel([('task_id', ASCENDING), ('status', ASCENDING)], name='task_id_status')
+        ]),
+        (words_collection, [
+            # GET /tasks/<id>/words, and stops a word being stored twice for a task
+            IndexModel([('task_id', ASCENDING), ('word', ASCENDING)], unique=True, name='task_id_word_unique'),
+            # Building a completed task's results reads its words by length
+            IndexModel([('task_id', ASCENDING), ('length', ASCENDING), ('word', ASCENDING)], name='task_id_length_word'),
+            # GET /tasks/<id>/words/partial pages through a task's words in _id order
+            IndexModel([('task_id', ASCENDING), ('_id', ASCENDING)], name='task_id_id'),
+            # Removes a completed task's words once its results have been built
+            IndexModel([('expireAt', ASCENDING)], expireAfterSeconds=0, name='expireAt_ttl')
+        ])
+    ]
+
+def route_queries():
+    """
+    Return a representative of each query the routes run, as (description, collection, filter, sort) tuples.
+    """
+    task_id = ObjectId()
+    claim_order = [('priority', DESCENDING), ('_id', ASCENDING)]
+    listing_order = [('_id', ASCENDING)]
+    return [
+        ('GET /tasks?status=', tasks_collection, {'status': 'NEW', '_id': {'$gt': task_id}}, listing_order),
+        ('POST /tasks (leader)', tasks_collection, {'letters_key': 'abc', 'in_flight': True}, None),
+        ('DELETE /tasks/<id>', tasks_collection, {'results_id': task_id}, None),
+        ('Releasing followers', tasks_collection, {'leader_id': task_id, 'status': 'FOLLOWING'}, None),
+        ('Building a completed task\'s results', words_collection, {'task_id': task_id}, RESULT_WORD_ORDER),
+        ('GET /tasks/<id>/words/partial', words_collection, {'task_id': task_id, '_id': {'$gt': task_id}}, listing_order),
+        ('GET /tasks/<id>/workitems', workitems_collection, {'task_id': task_id}, None),
+        ('GET /workitems?status=', workitems_collection, {'status': 'NEW', '_id': {'$gt': task_id}}, listing_order),
+        ('POST /workitems/claim', workitems_collection, {'status': 'NEW'}, claim_order),
+        ('POST /workitems/claim (task_id)', workitems_collection, {'status': 'NEW', 'task_id': task_id}, claim_order),
+        ('PUT /tasks/<id> (SCHEDULED)', workitems_collection, {'task_id': task_id, 'status': {'$in': ['RUNNING', 'COMPLETED', 'PARKED']}}, None),
+        ('POST /workitems/reap', workitems_collection, {'status': 'RUNNING', 'leaseExpires': {'$lt': datetime.now(timezone.utc)}}, None)
+    ]
+
+def _plan_stages(plan):
+    """
+    Yield the name of every stage in an explain plan, however deeply nested.
+    """
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _plan_stages(value)
+
+@app.cli.command('ensure-indexes')
+def ensure_indexes():
+    """
+    Create the indexes the blackboard relies on.  Creating an index that exists does nothing.
+
+    Duplicate words are removed before the unique index on words(task_id, word) is created,
+    and the length of any word stored without one is recorded.
+    """
+    duplicates = words_collection.aggregate([
+        {'$group': {'_id': {'task_id': '$task_id', 'word': '$word'}, 'ids': {'$push': '$_id'}, 'count': {'$sum': 1}}},
+        {'$match': {'count': {'$gt': 1}}}
+    ], allowDiskUse=True)
+    removed = 0
+    for duplicate in duplicates:
+        removed += words_collection.delete_many({'_id': {'$in': duplicate['ids'][1:]}}).deleted_count
+    if removed:
+        print(f"Removed {removed} duplicate words.")
+
+    # Words stored before their length was recorded cannot be sorted by length through an index.
+    # Words that are not strings, e.g. None from a request without a word, have no length
+    backfilled = words_collection.update_many({'length': {'$exists': False}, 'word': {'$type': 'string'}},
+                                              [{'$set': {'length': {'$strLenCP': '$word'}}}]).modified_count
+    if backfilled:
+        print(f"Recorded the length of {backfilled} words.")
+
+    for collection, indexes in required_indexes():
+        collection.create_indexes(indexes)
+    print("Indexes are in place.")
+
+@app.cli.command('explain-queries')
+def explain_queries():
+    """
+    Explain the query each route runs and fail if any of them scans a whole collection.
+    """
+    scans = []
+    for description, collection, query_filter, sort in route_queries():
+        cursor = collection.find(query_filter)
+        if sort:
+            cursor = cursor.sort(sort)
+        stages = list(_plan_stages(cursor.explain().get('queryPlanner', {}).get('winningPlan', {})))
+        print(f"{description}: {' <- '.join(stages)}")
+        if 'COLLSCAN' in stages:
+            scans.append(description)
+
+    if scans:
+        raise click.ClickException(f"{len(scans)} queries scan a whole collection: {', '.join(scans)}")
+    print("Every query uses an index.")
 
 @app.route('/healthcheck', methods=['GET'])
 def healthcheck():
@@ -40,6 +220,16 @@ def create_task():
 
     Expects a JSON body containing "letters".
     Inserts a new document into the tasks collection with status "NEW".
+
+    Every ordering of the letters is searched, so letters that are anagrams of each other
+    find the same words.  When BLACKBOARD_RESULT_CACHE is set and a task for an anagram
+    of the letters has completed, the new task is instead inserted as "COMPLETED" and
+    points at that task's results.
+
+    When BLACKBOARD_COALESCE_TASKS is set and a task for an anagram of the letters is
+    still in flight, the new task is inserted as "FOLLOWING" that task rather than
+    scheduling the same work again.  Its status is then the status of the task it
+    follows, whose results it shares.
     
     Returns:
         - 202 Accepted: On successful creation.
@@ -53,6 +243,13 @@ def create_task():
         if not letters:
             return Response(status=400, response='Invalid input: "letters" required.')
 
+        if RESULT_CACHE:
+            task_id = _create_cached_task(letters)
+            if task_id:
+                response = Response(status=202)
+                response.headers['Location'] = f'/status/{task_id}'
+                return response
+
         # Define task structure
         task = {
             "status": "NEW",
@@ -62,6 +259,12 @@ def create_task():
             "completed": None
         }
 
+        if COALESCE_TASKS:
+            task_id = _create_coalesced_task(task)
+            response = Response(status=202)
+            response.headers['Location'] = f'/status/{task_id}'
+            return response
+
         # Insert the task into the database
         result = tasks_collection.insert_one(task)
         task_id = str(result.inserted_id)
@@ -74,6 +277,263 @@ def create_task():
         # Return 500 error with exception details
         return Response(status=500, response=str(e))
 
+def _letters_key(letters):
+    """
+    Returns the key shared by every ordering of some letters.
+    """
+    return ''.join(sorted(letters))
+
+def _create_cached_task(letters):
+    """
+    Inserts a completed task for 'letters' if the results of an anagram of them are cached,
+    and counts the lookup as a hit or a miss.
+
+    The new task's results point at the cached results rather than copying their words.
+
+    Returns:
+        str: The new task's ID, or None if the results are not cached.
+    """
+    current_time = datetime.now(timezone.utc)
+    key = _letters_key(letters)
+
+    entry = cache_collection.find_one({'_id': key, 'results_id': {'$exists': True}}, {'results_id': 1})
+    cached = entry and results_collection.find_one({'_id': entry['results_id']}, {'word_count': 1, 'lengths': 1})
+    if not cached:
+        if entry:
+            # The cached results are gone, so stop looking for them
+            cache_collection.update_one({'_id': key, 'results_id': entry['results_id']},
+                                        {'$unset': {'results_id': '', 'compute_seconds': ''}})
+        cache_collection.update_one({'_id': key}, {'$inc': {'misses': 1}}, upsert=True)
+        return None
+
+    # Count the hit, and the compute time it saved
+    cache_collection.update_one(
+        {'_id': key},
+        [{'$set': {'hits': {'$add': [{'$ifNull': ['$hits', 0]}, 1]},
+                   'saved_seconds': {'$add': [{'$ifNull': ['$saved_seconds', 0]}, {'$ifNull': ['$compute_seconds', 0]}]},
+                   'lastHit': current_time}}]
+    )
+
+    task = {
+        'status': 'COMPLETED',
+        'letters': letters,
+        'lastUpdated': current_time,
+        'started': current_time,
+        'completed': current_time,
+        'results_id': cached['_id']
+    }
+    task['_id'] = tasks_collection.insert_one(task).inserted_id
+    _point_at_results(task, cached)
+    return str(task['_id'])
+
+def _discard_results(results_id):
+    """
+    Deletes the results stored under 'results_id' once neither the task they belong to nor
+    any task pointing at them remains.
+    """
+    if not tasks_collection.find_one({'$or': [{'_id': results_id}, {'results_id': results_id}]}, {'_id': 1}):
+        results_collection.delete_one({'_id': results_id})
+
+def _point_at_results(task, shared):
+    """
+    Stores results for a completed task that point at the words of another task's results.
+
+    Args:
+        task (dict): The completed task.
+        shared (dict): The results it shares, at least their '_id', 'word_count' and 'lengths'.
+
+    Returns:
+        dict: The task's results, without the words.
+    """
+    results = {
+        '_id': task['_id'],
+        'task': {name: task.get(name) for name in ('status', 'letters', 'lastUpdated', 'started', 'completed')},
+        'word_count': shared['word_count'],
+        'lengths': shared['lengths'],
+        'results_id': shared['_id']
+    }
+    results_collection.replace_one({'_id': task['_id']}, results, upsert=True)
+    return results
+
+def _create_coalesced_task(task):
+    """
+    Inserts a new task as the one task in flight for an anagram of its letters, or as a
+    follower of the task already in flight for them.
+
+    The unique index on the 'letters_key' of tasks in flight decides which of two tasks
+    inserted together leads, and the other follows it.
+
+    Args:
+        task (dict): The new task.
+
+    Returns:
+        str: The ID of the new task.
+    """
+    key = _letters_key(task['letters'])
+    while True:
+        try:
+            return str(tasks_collection.insert_one({**task, 'letters_key': key, 'in_flight': True}).inserted_id)
+        except DuplicateKeyError:
+            pass
+
+        leader = tasks_collection.find_one({'letters_key': key, 'in_flight': True}, {'_id': 1})
+        if not leader:
+            # The task in flight finished in between, so try to lead again
+            continue
+
+        follower_id = tasks_collection.insert_one(
+            {**task, 'status': 'FOLLOWING', 'letters_key': key, 'leader_id': leader['_id']}
+        ).inserted_id
+
+        # A leader that finished or was deleted before the follower was inserted did not release it
+        current = tasks_collection.find_one({'_id': leader['_id']}, {'status': 1, 'in_flight': 1})
+        if not current:
+            _replace_leader(leader['_id'], key, datetime.now(timezone.utc))
+        elif not current.get('in_flight'):
+            _release_followers(leader['_id'], current['status'], datetime.now(timezone.utc))
+        return str(follower_id)
+
+def _release_followers(task_id, status, current_time):
+    """
+    Gives the tasks following a task that has finished the same final status, and has
+    those that completed share its results.
+
+    Args:
+        task_id (ObjectId): The ID of the task that finished.
+        status (str): The task's final status, 'COMPLETED' or 'FAILED'.
+        current_time (datetime): The time the task finished.
+    """
+    update = {'status': status, 'lastUpdated': current_time}
+    if status == 'COMPLETED':
+        update.update(results_id=task_id, started=current_time, completed=current_time)
+    tasks_collection.update_many({'leader_id': task_id, 'status': 'FOLLOWING'}, {'$set': update})
+
+def _replace_leader(task_id, key, current_time):
+    """
+    Hands the search of a task in flight that was deleted to the tasks following it.
+
+    The oldest follower is promoted to a new task in its place, unless another task
+    already leads for the letters, and the rest follow whichever task leads.
+
+    Args:
+        task_id (ObjectId): The ID of the deleted task.
+        key (str): The task's 'letters_key'.
+        current_time (datetime): The time the task was deleted.
+    """
+    while True:
+        try:
+            leader = tasks_collection.find_one_and_update(
+                {'leader_id': task_id, 'status': 'FOLLOWING'},
+                {'$set': {'status': 'NEW', 'in_flight': True, 'lastUpdated': current_time},
+                 '$unset': {'leader_id': ''}},
+                projection={'_id': 1}, sort=[('_id', ASCENDING)]
+            )
+        except DuplicateKeyError:
+            # A new task took the lead in between
+            leader = tasks_collection.find_one({'letters_key': key, 'in_flight': True}, {'_id': 1})
+            if not leader:
+                # ...and has already finished, so try to promote a follower again
+                continue
+        break
+
+    if leader:
+        tasks_collection.update_many({'leader_id': task_id, 'status': 'FOLLOWING'},
+                                     {'$set': {'leader_id': leader['_id']}})
+        task_notifier.notify(str(leader['_id']))
+
+@app.route('/metrics/cache', methods=['GET'])
+def get_cache_metrics():
+    """
+    Report how often new tasks were answered from the results of earlier tasks.
+
+    Returns:
+        - 200 OK: With the number of hits and misses, the hit rate, the number of cached
+          letter keys and the compute time the hits saved, being the time the cached
+          tasks took to run.
+        - 500 Internal Server Error: If there is an exception during execution.
+    """
+    try:
+        totals = next(cache_collection.aggregate([
+            {'$group': {
+                '_id': None,
+                'hits': {'$sum': '$hits'},
+                'misses': {'$sum': '$misses'},
+                'saved_seconds': {'$sum': '$saved_seconds'},
+                'cached_keys': {'$sum': {'$cond': [{'$ifNull': ['$results_id', False]}, 1, 0]}}
+            }}
+        ]), {'hits': 0, 'misses': 0, 'saved_seconds': 0, 'cached_keys': 0})
+        lookups = totals['hits'] + totals['misses']
+
+        return jsonify(enabled=RESULT_CACHE,
+                       hits=totals['hits'],
+                       misses=totals['misses'],
+                       hit_rate=totals['hits'] / lookups if lookups else 0.0,
+                       cached_keys=totals['cached_keys'],
+                       saved_seconds=totals['saved_seconds']), 200
+
+    except Exception as e:
+        # Return 500 error with exception details
+        return Response(status=500, response=str(e))
+
+@app.route('/tasks/summary', methods=['GET'])
+def get_task_summaries():
+    """
+    Summarise the work items of each task by status, using a single aggregation.
+
+    Query Parameters:
+        - status (optional): A comma separated list of the task statuses to summarise, from
+          {"NEW", "SCHEDULING", "SCHEDULED", "RUNNING", "COMPLETED", "FAILED"}. Defaults to every task.
+
+    Returns:
+        - 200 OK: With a list holding each task's '_id', 'status', 'scheduled_items_count' and
+          'workitems', which maps each work item status to the number of the task's work items in it.
+        - 400 Bad Request: If a status is invalid.
+        - 404 Not Found: If no tasks match the criteria.
+        - 500 Internal Server Error: If there is an exception during execution.
+    """
+    try:
+        # Valid statuses
+        valid_statuses = {"NEW", "SCHEDULING", "SCHEDULED", "RUNNING", "COMPLETED", "FAILED"}
+
+        statuses = [status for status in request.args.get('status', '').split(',') if status]
+        invalid_statuses = [status for status in statuses if status not in valid_statuses]
+        if invalid_statuses:
+            return Response(
+                status=400,
+                response=f'Invalid status "{invalid_statuses[0]}". Permissible values are {valid_statuses}.'
+            )
+
+        pipeline = [
+            {"$project": {"status": 1, "scheduled_items_count": 1}},
+            # Count each task's work items by status using the work_items(task_id, status) index
+            {"$lookup": {
+                "from": workitems_collection.name,
+                "localField": "_id",
+                "foreignField": "task_id",
+                "pipeline": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+                "as": "workitems"
+            }},
+            {"$addFields": {"workitems": {"$arrayToObject": {
+                "$map": {"input": "$workitems", "in": {"k": "$$this._id", "v": "$$this.count"}}
+            }}}}
+        ]
+        if statuses:
+            pipeline.insert(0, {"$match": {"status": {"$in": statuses}}})
+
+        summaries = list(tasks_collection.aggregate(pipeline))
+        if not summaries:
+            return Response(status=404, response='Nothing found.')
+
+        for summary in summaries:
+            # Convert the ObjectId to a string for JSON serialisation
+            summary['_id'] = str(summary['_id'])
+
+        return jsonify(summaries), 200
+
+    except Exception as e:
+        # Return 500 error with exception details
+        return Response(status=500, response=str(e))
+
 @app.route('/tasks/<string:task_id>', methods=['GET', 'PUT', 'DELETE'])
 def manage_task(task_id):
     """
@@ -108,7 +568,7 @@ def manage_task(task_id):
         elif request.method == 'PUT':
             data = request.json
             new_status = data.get('status')
-            if new_status not in {'NEW', 'SCHEDULING', 'SCHEDULED', 'RUNNING', 'COMPLETED'}:
+            if new_status not in {'NEW', 'SCHEDULING', 'SCHEDULED', 'RUNNING', 'COMPLETED', 'FAILED'}:
                 return Response(status=400, response='Invalid status value.')
 
             # Find and update the task status
@@ -126,21 +586,45 @@ def manage_task(task_id):
             if new_status == 'COMPLETED':
                 update_data['completed'] = datetime.now(timezone.utc)
 
+            # A task that has finished is no longer in flight for other tasks to follow
+            update = {'$set': update_data}
+            if new_status in ('COMPLETED', 'FAILED'):
+                update['$unset'] = {'in_flight': ''}
+
             result = tasks_collection.update_one(
                 {'_id': ObjectId(task_id)},
-                {'$set': update_data}
+                update
             )
 
             if result.matched_count:
+                if new_status == 'SCHEDULED':
+                    _catch_up_scheduled_task(ObjectId(task_id), update_data['lastUpdated'])
+                if new_status == 'COMPLETED':
+                    _build_results(ObjectId(task_id))
+                if new_status in ('COMPLETED', 'FAILED'):
+                    _release_followers(ObjectId(task_id), new_status, update_data['lastUpdated'])
+                task_notifier.notify(task_id)
                 return Response(status=200, response='Task updated successfully.')
             else:
                 return Response(status=404, response='Task not found.')
 
         elif request.method == 'DELETE':
             # Delete the task by its ID
-            result = tasks_collection.delete_one({'_id': ObjectId(task_id)})
+            task = tasks_collection.find_one_and_delete({'_id': ObjectId(task_id)},
+                                                        projection={'results_id': 1, 'letters_key': 1, 'in_flight': 1})
 
-            if result.deleted_count:
+            if task:
+                if task.get('in_flight'):
+                    # The tasks following it would otherwise wait for it forever
+                    _replace_leader(ObjectId(task_id), task['letters_key'], datetime.now(timezone.utc))
+                # Stop answering new tasks from the deleted task's results
+                cache_collection.update_one({'results_id': ObjectId(task_id)},
+                                            {'$unset': {'results_id': '', 'compute_seconds': ''}})
+                # Results other tasks point at are kept until the last of them is deleted
+                _discard_results(ObjectId(task_id))
+                if task.get('results_id'):
+                    _discard_results(task['results_id'])
+                task_notifier.notify(task_id)
                 return Response(status=200, response='Task deleted successfully.')
             else:
                 return Response(status=404, response='Task not found.')
@@ -149,6 +633,33 @@ def manage_task(task_id):
         # Return 500 error with exception details
         return Response(status=500, response=str(e))
 
+def _word_record(task_id, word):
+    """
+    Returns the document stored for a word found for a task, with its length so the words can be sorted by it.
+    """
+    record = {'task_id': ObjectId(task_id), 'word': word}
+    if isinstance(word, str):
+        record['length'] = len(word)
+    return record
+
+def _task_unchanged(task, since):
+    """
+    Returns True if a task that has not finished still has the 'lastUpdated' time 'since'.
+    """
+    return task['status'] not in ('COMPLETED', 'FAILED') and task['lastUpdated'].isoformat() == since
+
+def _find_task_status(_id):
+    """
+    Returns the task to report the status of for the task '_id', which is the task it
+    follows while that task is in flight.
+    """
+    task = tasks_collection.find_one({"_id": ObjectId(_id)})
+    if task and task['status'] == 'FOLLOWING':
+        leader = tasks_collection.find_one({"_id": task['leader_id']})
+        if leader and leader['status'] not in ('COMPLETED', 'FAILED'):
+            return {**leader, 'leader_id': task['leader_id']}
+    return task
+
 @app.route('/status/<string:_id>', methods=['GET'])
 def get_task_status(_id):
     """
@@ -157,15 +668,54 @@ def get_task_status(_id):
     Args:
         _id (str): The unique identifier of the task.
 
+    While a task runs its progress, as reported by the consumers, is included with its
+    'lastUpdated' time.
+
+    Given 'since', the 'lastUpdated' time of the last status the client received, the
+    request is held for up to 'wait' seconds until the task changes.  Waiting requests are
+    woken by the request that changes the task rather than by querying the database.
+
+    A task following another task in flight reports the status of that task until it is
+    released with the same final status.
+
+    Query Parameters:
+        - wait (optional): The most seconds to wait for a change, capped at BLACKBOARD_STATUS_MAX_WAIT.
+        - since (optional): The 'lastUpdated' time the client already has.
+
     Returns:
-        - 200 OK: If the task status is retrieved successfully.
+        - 200 OK: If the task status is retrieved successfully, which is unchanged if the wait timed out.
         - 303 See Other: If the task is complete and redirects to /tasks/{_id}.
+        - 400 Bad Request: If 'wait' is invalid.
         - 404 Not Found: If the task does not exist.
         - 500 Internal Server Error: If there is an exception during execution.
     """
     try:
-        # Find the task by ID
-        task = tasks_collection.find_one({"_id": ObjectId(_id)})
+        since = request.args.get('since')
+        try:
+            wait = min(float(request.args.get('wait', 0)), STATUS_MAX_WAIT_SECONDS)
+        except ValueError:
+            wait = -1
+        if not wait >= 0:
+            return Response(status=400, response='Invalid input: "wait" should be a non-negative number of seconds.')
+
+        # Listen before reading the task so that a change made in between is not missed
+        with ExitStack() as listening:
+            subscription = listening.enter_context(task_notifier.listen(_id))
+            # Find the task by ID
+            task = _find_task_status(_id)
+            if task and 'leader_id' in task:
+                # A follower changes when the task it follows does
+                subscription = listening.enter_context(task_notifier.listen(str(task['leader_id'])))
+                task = _find_task_status(_id)
+
+            deadline = time.monotonic() + wait
+            while task and since is not None and _task_unchanged(task, since):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                changed = subscription.wait(min(remaining, STATUS_RECHECK_SECONDS) if STATUS_RECHECK_SECONDS else remaining)
+                if changed or STATUS_RECHECK_SECONDS:
+                    task = _find_task_status(_id)
 
         if not task:
             return Response(status=404, response='Task not found.')
@@ -174,31 +724,105 @@ def get_task_status(_id):
             response = Response(status=303)
             response.headers['Location'] = f'/tasks/{_id}/words'
             return response
+        elif task['status'] == 'FAILED':
+            # Some of the work items were parked so the words will never be complete
+            return jsonify(status=task['status'], lastUpdated=task['lastUpdated'].isoformat()), 200
         else:
             last_updated = task['lastUpdated']
-            return jsonify(lastUpdated=last_updated.isoformat()), 200
+            if 'progress' not in task:
+                return jsonify(lastUpdated=last_updated.isoformat()), 200
+
+            # The fraction done is the mean of the work items' fractions
+            progress = task['progress']
+            scheduled_items_count = task.get('scheduled_items_count') or 0
+            fraction_done = progress.get('fraction_sum', 0) / scheduled_items_count if scheduled_items_count else 0.0
+            return jsonify(lastUpdated=last_updated.isoformat(),
+                           prefixes_explored=progress.get('prefixes_explored', 0),
+                           words_found=progress.get('words_found', 0),
+                           fraction_done=min(1.0, max(0.0, fraction_done))), 200
 
     except Exception as e:
         # Return 500 error with exception details
         return Response(status=500, response=str(e))
     
+def _list_documents(collection, query_filter):
+    """
+    Streams the documents matching 'query_filter' as a JSON list, in _id order.
+
+    The request's query parameters select a page of the documents and the fields returned.
+    The documents are serialised one at a time as the cursor returns them rather than
+    being loaded into a list first.  ObjectIds are converted to strings.
+
+    Query Parameters:
+        - limit (optional): The most documents to return. Defaults to every matching document.
+        - after (optional): Only return documents whose _id comes after this one, i.e. the
+          last _id of the previous page.
+        - fields (optional): A comma separated list of the fields to return; _id is always returned.
+        - count_only (optional): If 'true', only return {"count": n} for the matching documents.
+
+    Returns:
+        - 200 OK: With the documents, or their count.
+        - 400 Bad Request: If a query parameter is invalid.
+        - 404 Not Found: If no documents match.
+    """
+    limit = request.args.get('limit')
+    after = request.args.get('after')
+    fields = request.args.get('fields')
+
+    if limit is not None:
+        if not limit.isdigit() or int(limit) < 1:
+            return Response(status=400, response='Invalid input: "limit" should be a positive integer.')
+        limit = int(limit)
+
+    if after is not None:
+        if not ObjectId.is_valid(after):
+            return Response(status=400, response='Invalid input: "after" should be an _id.')
+        query_filter = {**query_filter, '_id': {'$gt': ObjectId(after)}}
+
+    projection = None
+    if fields is not None:
+        names = [name.strip() for name in fields.split(',')]
+        if not all(names) or any(name.startswith('$') for name in names):
+            return Response(status=400, response='Invalid input: "fields" should be a comma separated list of field names.')
+        projection = {name: 1 for name in names}
+
+    if request.args.get('count_only', '').lower() in ('1', 'true'):
+        return jsonify(count=collection.count_documents(query_filter)), 200
+
+    documents = iter(collection.find(query_filter, projection, sort=[('_id', ASCENDING)], limit=limit or 0))
+    first = next(documents, None)
+    if first is None:
+        return Response(status=404, response='Nothing found.')
+
+    def _serialise(document):
+        return app.json.dumps({name: str(value) if isinstance(value, ObjectId) else value for name, value in document.items()})
+
+    def _stream():
+        yield '[' + _serialise(first)
+        for document in documents:
+            yield ',' + _serialise(document)
+        yield ']'
+
+    return Response(_stream(), status=200, mimetype='application/json')
+
 @app.route('/tasks', methods=['GET'])
 def get_tasks_by_status():
     """
     Retrieve tasks based on their status.
 
     Query Parameters:
-        - status (optional): The status of tasks to be retrieved, one of {"NEW", "SCHEDULING", "SCHEDULED", "RUNNING", "COMPLETED"}.
+        - status (optional): The status of tasks to be retrieved, one of {"NEW", "SCHEDULING", "SCHEDULED", "RUNNING", "COMPLETED", "FAILED", "FOLLOWING"}.
+        - limit, after, fields, count_only (optional): Page through the tasks (see _list_documents).
     
     Returns:
-        - 200 OK: With a list of tasks matching the specified status.
-        - 400 Bad Request: If the status query parameter is invalid.
+        - 200 OK: With a list of tasks matching the specified status, in _id order.
+        - 400 Bad Request: If a query parameter is invalid.
         - 404 Not Found: If no tasks match the criteria.
         - 500 Internal Server Error: If there is an exception during execution.
     """
     try:
         # Valid statuses
-        valid_statuses = {"NEW", "SCHEDULING", "SCHEDULED", "RUNNING", "COMPLETED"}
+        valid_statuses = {"NEW", "SCHEDULING", "SCHEDULED", "RUNNING", "COMPLETED", "FAILED", "FOLLOWING"}
 
         # Get status from query parameters
         status = request.args.get('status')
@@ -215,17 +839,8 @@ def get_tasks_by_status():
         if status:
             query_filter['status'] = status
 
-        # Find tasks based on the query filter
-        tasks = list(tasks_collection.find(query_filter))
-
-        if not tasks:
-            return Response(status=404, response='Nothing found.')
-
-        # Convert ObjectId to string for JSON serialization
-        for task in tasks:
-            task['_id'] = str(task['_id'])
-
-        return jsonify(tasks), 200
+        # Stream the tasks matching the query filter
+        return _list_documents(tasks_collection, query_filter)
 
     except Exception as e:
         # Return 500 error with exception details
@@ -234,23 +849,37 @@ def get_tasks_by_status():
 @app.route('/tasks/<string:task_id>/words', methods=['POST'])
 def add_word_to_task(task_id):
     """
-    Add a word record to a task.
+    Add a word record, or a batch of word records, to a task.
+
+    The task is looked up once however many words are sent, and a batch is written with
+    a single unordered insert_many.  A task holds each word once, so words that were
+    already added, e.g. by a retried request, are skipped.  When BLACKBOARD_WORD_WRITER is set the words are
+    instead handed to the word writer, which batches them with other requests' words.
 
     Path Parameters:
-        - task_id: The ID of the task to which the word should be added.
+        - task_id: The ID of the task to which the words should be added.
     
     Request Body:
-        - word: The word to be added to the task.
+        - word: The word to be added to the task, or
+        - words: A list of words to be added to the task.
     
     Returns:
-        - 200 OK: If the word is successfully added to the task.
-        - 403 Forbidden: If the task's status is not "COMPLETED".
+        - 200 OK: If the words are successfully added to the task.
+        - 400 Bad Request: If 'words' is not a list of strings.
+        - 403 Forbidden: If the task's status is "COMPLETED".
         - 404 Not Found: If the task is not found.
         - 500 Internal Server Error: If there is an exception during execution.
+        - 503 Service Unavailable: If the word writer's queue stays full.
     """
     try:
-        # Find the task by its ID
-        task = tasks_collection.find_one({'_id': ObjectId(task_id)})
+        data = request.json
+        words = data.get('words')
+
+        if words is not None and not (isinstance(words, list) and all(isinstance(word, str) for word in words)):
+            return Response(status=400, response='Invalid input: "words" should be a list of strings.')
+
+        # Find the task by its ID, only its status is needed
+        task = tasks_collection.find_one({'_id': ObjectId(task_id)}, {'status': 1})
 
         # Check if the task exists
         if not task:
@@ -263,96 +892,279 @@ def add_word_to_task(task_id):
                 response=f'Task "{task_id}" status is "{task["status"]}" and cannot add any more words to it.'
             )
 
+        if word_writer:
+            batch = [data.get('word')] if words is None else words
+            pending = word_writer.submit([_word_record(task_id, word) for word in batch])
+
+            # A group commit replies once the words are written, write behind replies straight away
+            if WORD_WRITER_MODE == 'group':
+                pending.wait(word_writer.put_timeout)
+
+            return Response(status=200, response='Word added successfully.' if words is None else f'{len(words)} words added successfully.')
+
+        if words is not None:
+            # Insert the whole batch in one round trip, an empty batch needs no write
+            if words:
+                try:
+                    words_collection.insert_many([_word_record(task_id, word) for word in words], ordered=False)
+                except BulkWriteError as e:
+                    # The unordered insert has stored every word that was not already there
+                    if not only_duplicate_keys(e):
+                        raise
+            return Response(status=200, response=f'{len(words)} words added successfully.')
+
         # Get the word from the request body
-        word = request.json.get('word')
+        word = data.get('word')
 
         # Insert the word into the words collection with the foreign key as task_id
-        word_record = {
-            'task_id': ObjectId(task_id),
-            'word': word
-        }
-        
-        result = words_collection.insert_one(word_record)
+        word_record = _word_record(task_id, word)
+
+        try:
+            result = words_collection.insert_one(word_record)
+        except DuplicateKeyError:
+            return Response(status=200, response='Word already added.')
 
         # Check if insertion was successful
         if result.acknowledged:
             return Response(status=200, response='Word added successfully.')
 
+    except queue.Full:
+        return Response(status=503, response='Too many words waiting to be written.')
+
     except Exception as e:
         # Return 500 error with exception details
         return Response(status=500, response=str(e))
 
+@app.route('/metrics/wordwriter', methods=['GET'])
+def get_word_writer_metrics():
+    """
+    Report the batch sizes and flush latencies of the word writer.
+
+    Returns:
+        - 200 OK: With the word writer's metrics.
+        - 404 Not Found: If the word writer is disabled.
+    """
+    if not word_writer:
+        return Response(status=404, response='Word writer is disabled.')
+
+    return jsonify(mode=WORD_WRITER_MODE, **word_writer.metrics()), 200
+
+def _build_results(task_id):
+    """
+    Builds the results of a completed task into a single document in the results collection,
+    and sets its word documents to expire after BLACKBOARD_WORDS_RETENTION seconds.
+
+    The results hold the task's details, and its words sorted and grouped by length with
+    the number of words of each length.  The words are compressed when they take more than
+    BLACKBOARD_RESULTS_COMPRESS_BYTES.  The results are cached for tasks created later for
+    an anagram of the letters.  A failure is logged rather than raised, since the results
+    are built when they are first read if they are missing.
+
+    Args:
+        task_id (ObjectId): The ID of the task.
+
+    Returns:
+        dict: The results, or None if the task is not completed or they could not be built.
+    """
+    try:
+        task = tasks_collection.find_one(
+            {'_id': task_id, 'status': 'COMPLETED'},
+            {'status': 1, 'letters': 1, 'lastUpdated': 1, 'started': 1, 'completed': 1, 'results_id': 1}
+        )
+        if not task:
+            return None
+
+        # A task that followed another shares that task's results
+        if task.get('results_id'):
+            shared = results_collection.find_one({'_id': task['results_id']}, {'word_count': 1, 'lengths': 1}) \
+                or _build_results(task['results_id'])
+            return shared and _point_at_results(task, shared)
+
+        # Words written behind may still be queued, wait until everything queued before now is written
+        if word_writer and WORD_WRITER_MODE == 'behind':
+            word_writer.submit([]).wait(word_writer.put_timeout)
+
+        lengths = []
+        groups = []
+        previous = None
+        for record in words_collection.find({'task_id': task_id}, {'word': 1, '_id': 0}, sort=RESULT_WORD_ORDER):
+            word = record['word']
+            if word == previous:
+                continue
+            previous = word
+            if not lengths or lengths[-1]['length'] != len(word):
+                lengths.append({'length': len(word), 'count': 0})
+                groups.append([])
+            lengths[-1]['count'] += 1
+            groups[-1].append(word)
+
+        words = json.dumps(groups, separators=(',', ':')).encode()
+        del task['_id']
+        results = {
+            '_id': task_id,
+            'task': task,
+            'word_count': sum(length['count'] for length in lengths),
+            'lengths': lengths,
+            'words': Binary(zlib.compress(words)) if len(words) > RESULTS_COMPRESS_BYTES else groups
+        }
+        results_collection.replace_one({'_id': task_id}, results, upsert=True)
+
+        # Later tasks for an anagram of the letters are answered from these results
+        started, completed = task.get('started'), task.get('completed')
+        cache_collection.update_one(
+            {'_id': _letters_key(task['letters'])},
+            {'$set': {'results_id': task_id,
+                      'compute_seconds': (completed - started).total_seconds() if started and completed else 0}},
+            upsert=True
+        )
+
+        # The words are now read from the results, so keep the word documents only a while longer
+        words_collection.update_many(
+            {'task_id': task_id},
+            {'$set': {'expireAt': datetime.now(timezone.utc) + timedelta(seconds=WORDS_RETENTION_SECONDS)}}
+        )
+        return results
+
+    except Exception as e:
+        print(f"Failed to build the results of task {task_id}: {str(e)}")
+        return None
+
+def _result_words(results):
+    """
+    Returns the lists of words, one for each length, from a completed task's results.
+    """
+    words = results['words']
+    if isinstance(words, bytes):
+        return json.loads(zlib.decompress(words))
+    return words
+
 @app.route('/tasks/<string:_id>/words', methods=['GET'])
 def get_words_for_task(_id):
     """
     Retrieve all words for a completed task specified by _id.
 
+    The words are read from the task's results, a single document built when the task
+    completed, or built now if the task completed before its results were kept.  A task
+    answered from the cache reads the words from the results it points at.
+
     Args:
         _id (str): The unique identifier of the task.
 
+    Query Parameters:
+        - sort (optional): 'alpha' for alphabetical order, or 'length' for shortest first and
+          then alphabetical. Defaults to 'alpha'.
+        - format (optional): 'json' for the task details with a 'words' list, or 'ndjson' for
+          newline-delimited JSON whose first line is the task details and each following
+          line a word. Defaults to 'json'.
+
     Returns:
-        - 200 OK: With the task details and words if the task is completed.
+        - 200 OK: With the task details, the number of words of each length and the words
+          if the task is completed.
+        - 400 Bad Request: If 'sort' or 'format' is invalid.
         - 404 Not Found: If no completed task is found with the given ID.
         - 500 Internal Server Error: If there is an exception during execution.
     """
     try:
-        # Aggregate query to lookup words related to the task
-        # pipeline = [
-        #     {"$match": {"_id": ObjectId(_id), "status": "COMPLETED"}},
-        #     {"$lookup": {
-        #         "from": "words",
-        #         "localField": "_id",
-        #         "foreignField": "task_id",
-        #         "as": "task_words"
-        #     }},
-        #     {"$project": {
-        #         "task_details": "$$ROOT",
-        #         "task_words": {
-        #             "$map": {
-        #                 "input": "$task_words",
-        #                 "as": "word_entry",
-        #                 "in": "$$word_entry.word"
-        #             }
-        #         }
-        #     }}
-        # ]
-        pipeline = [
-            {"$match": {"_id": ObjectId(_id), "status": "COMPLETED"}},
-            {"$lookup": {
-                "from": "words",
-                "localField": "_id",
-                "foreignField": "task_id",
-                "as": "task_words"
-            }},
-            {"$project": {
-                "_id": 1,
-                "status": 1,
-                "letters": 1,
-                "lastUpdated": 1,
-                "started": 1,
-                "completed": 1,
-                "words": {
-                    "$map": {
-                    "input": "$task_words",
-                    "in": "$$this.word"
-                    }
-                }
-            }}
-        ]
-        tasks = list(tasks_collection.aggregate(pipeline))
-        print(f"{tasks}")
-        for task in tasks:
-            # Convert the ObjectId to a string for JSON serialisation
-            task['_id'] = str(task['_id'])
-        if not tasks:
+        order = request.args.get('sort', 'alpha')
+        output_format = request.args.get('format', 'json')
+
+        if order not in ('alpha', 'length'):
+            return Response(status=400, response=f'Invalid sort "{order}". Permissible values are "alpha" and "length".')
+        if output_format not in ('json', 'ndjson'):
+            return Response(status=400, response=f'Invalid format "{output_format}". Permissible values are "json" and "ndjson".')
+
+        results = results_collection.find_one({'_id': ObjectId(_id)}) or _build_results(ObjectId(_id))
+        if results and 'results_id' in results:
+            # A task answered from the cache reads the words of the task it was answered from
+            cached = results_collection.find_one({'_id': results['results_id']}, {'words': 1})
+            results = cached and {**results, 'words': cached['words']}
+        if not results:
             return Response(status=404, response='No completed task found with the given ID.')
 
-        return jsonify(tasks[0]), 200
+        # Convert the ObjectId to a string for JSON serialisation
+        task = {'_id': str(results['_id']), **results['task'],
+                'counts': {str(length['length']): length['count'] for length in results['lengths']}}
+        groups = _result_words(results)
+        words = heapq.merge(*groups) if order == 'alpha' else (word for group in groups for word in group)
+
+        def _stream_ndjson():
+            yield app.json.dumps(task) + '\n'
+            for word in words:
+                yield app.json.dumps(word) + '\n'
+
+        def _stream_json():
+            # The task details with the closing brace replaced by the words list
+            yield app.json.dumps(task)[:-1] + ', "words": ['
+            separator = ''
+            for word in words:
+                yield separator + app.json.dumps(word)
+                separator = ', '
+            yield ']}'
+
+        if output_format == 'ndjson':
+            return Response(_stream_ndjson(), status=200, mimetype='application/x-ndjson')
+        return Response(_stream_json(), status=200, mimetype='application/json')
 
     except Exception as e:
         # Return 500 error with exception details
         return Response(status=500, response=str(e))
-   
+
+@app.route('/tasks/<string:task_id>/words/partial', methods=['GET'])
+def get_partial_words_for_task(task_id):
+    """
+    Retrieve the words a task has found so far, whatever its status, in _id order.
+
+    A client passes the cursor from each reply as 'after' in the next request, so it only
+    receives the words found since it last asked.  Words are only ordered by _id as they are
+    inserted, so one written concurrently with a request may be passed over; the complete set
+    is returned by GET /tasks/<id>/words once the task is COMPLETED.  A task following
+    another task returns the words that task has found.
+
+    Path Parameters:
+        - task_id: The ID of the task whose words are retrieved.
+
+    Query Parameters:
+        - after (optional): The cursor returned by the previous request.
+        - limit (optional): The most words to return, capped at BLACKBOARD_PARTIAL_WORDS_LIMIT.
+
+    Returns:
+        - 200 OK: With the task's status, the words and the cursor to pass as 'after' next time,
+          which is unchanged if there are no new words.
+        - 400 Bad Request: If 'after' or 'limit' is invalid.
+        - 404 Not Found: If the task does not exist.
+        - 500 Internal Server Error: If there is an exception during execution.
+    """
+    try:
+        after = request.args.get('after')
+        limit = request.args.get('limit', str(PARTIAL_WORDS_LIMIT))
+
+        if not limit.isdigit() or int(limit) < 1:
+            return Response(status=400, response='Invalid input: "limit" should be a positive integer.')
+        if after is not None and not ObjectId.is_valid(after):
+            return Response(status=400, response='Invalid input: "after" should be a cursor returned by this endpoint.')
+
+        # Find the task by its ID, only its status and any task it follows are needed
+        task = tasks_collection.find_one({'_id': ObjectId(task_id)}, {'status': 1, 'leader_id': 1})
+        if not task:
+            return Response(status=404, response='Task not found.')
+
+        query_filter = {'task_id': task['leader_id'] if task['status'] == 'FOLLOWING' else ObjectId(task_id)}
+        if after is not None:
+            query_filter['_id'] = {'$gt': ObjectId(after)}
+
+        words = []
+        cursor = after
+        for word in words_collection.find(query_filter, {'word': 1}, sort=[('_id', ASCENDING)],
+                                          limit=min(int(limit), PARTIAL_WORDS_LIMIT)):
+            words.append(word['word'])
+            cursor = str(word['_id'])
+
+        return jsonify(status=task['status'], words=words, cursor=cursor), 200
+
+    except Exception as e:
+        # Return 500 error with exception details
+        return Response(status=500, response=str(e))
+
 @app.route('/tasks/<string:task_id>/workitems', methods=['POST'])
 def add_workitems(task_id):
     """
@@ -403,6 +1215,7 @@ def add_workitems(task_id):
         # Set default values for optional fields
         workitem.setdefault('current_sequence', '')
         workitem.setdefault('remaining_elements', '')
+        workitem.setdefault('prefix_from', len(workitem['current_sequence']))
 
         # Prepare the work item record with additional required fields
         workitem_record = {
@@ -410,6 +1223,9 @@ def add_workitems(task_id):
             'status': 'NEW',
             'current_sequence': workitem['current_sequence'],
             'remaining_elements': workitem['remaining_elements'],
+            'prefix_from': workitem['prefix_from'],
+            'estimated_cost': workitem.get('estimated_cost'),
+            'priority': workitem.get('priority', 0),
             'lastUpdated': datetime.now(timezone.utc)
         }
 
@@ -453,6 +1269,8 @@ def get_workitems(task_id):
         formatted_workitems = [{"id": str(item["_id"]), "task_id": str(item["task_id"]), "status": item["status"],
                                 "current_sequence": item.get("current_sequence", ""),
                                 "remaining_elements": item.get("remaining_elements", ""),
+                                "prefix_from": item.get("prefix_from"),
+                                "estimated_cost": item.get("estimated_cost"),
                                 "lastUpdated": item["lastUpdated"]} for item in workitems]
 
         return jsonify(formatted_workitems), HTTPStatus.OK
@@ -470,17 +1288,18 @@ def get_workitems_by_status():
     Retrieve workitems based on their status.
 
     Query Parameters:
-        - status (optional): The status of workitems to be retrieved, one of {"NEW", "RUNNING", "COMPLETED"}.
+        - status (optional): The status of workitems to be retrieved, one of {"NEW", "RUNNING", "COMPLETED", "PARKED"}.
+        - limit, after, fields, count_only (optional): Page through the work items (see _list_documents).
     
     Returns:
-        - 200 OK: With a list of work items matching the specified status.
-        - 400 Bad Request: If the status query parameter is invalid.
+        - 200 OK: With a list of work items matching the specified status, in _id order.
+        - 400 Bad Request: If a query parameter is invalid.
         - 404 Not Found: If no work items match the criteria.
         - 500 Internal Server Error: If there is an exception during execution.
     """
     try:
         # Valid statuses
-        valid_statuses = {"NEW", "RUNNING", "COMPLETED"}
+        valid_statuses = {"NEW", "RUNNING", "COMPLETED", "PARKED"}
 
         # Get status from query parameters
         status = request.args.get('status')
@@ -497,33 +1316,460 @@ def get_workitems_by_status():
         if status:
             query_filter['status'] = status
         
-        # Find tasks based on the query filter
-        workitems = list(workitems_collection.find(query_filter))
-        
-        if not workitems:
-            return Response(status=404, response='Nothing found.')
-        
-        # Convert ObjectId to string for JSON serialization
-        for workitem in workitems:
-            print(f"{workitem}")
+        # Stream the work items matching the query filter
+        return _list_documents(workitems_collection, query_filter)
+
+    except Exception as e:
+        # Return 500 error with exception details
+        return Response(status=500, response=str(e))
+
+@app.route('/workitems/claim', methods=['POST'])
+def claim_workitems():
+    """
+    Atomically claim up to 'limit' NEW work items for a consumer.
+
+    Each work item is moved to RUNNING by its own find_one_and_update, so two consumers
+    can never claim the same work item.  Higher priority work items are claimed first,
+    and every claim counts as one of the work item's 'attempts'.  The first claim on a
+    SCHEDULED task moves it to RUNNING.
+
+    Request Body:
+        - owner: Identifies the consumer claiming the work items.
+        - limit (optional): The maximum number of work items to claim. Defaults to 1.
+        - lease_seconds (optional): How long the claim lasts. Defaults to BLACKBOARD_LEASE_SECONDS.
+        - task_id (optional): Only claim work items belonging to this task.
+        - min_priority (optional): Only claim work items with at least this priority.
+
+    Returns:
+        - 200 OK: With a list of the claimed work items.
+        - 400 Bad Request: If the owner is missing or a parameter is invalid.
+        - 404 Not Found: If there are no work items to claim.
+        - 500 Internal Server Error: If there is an exception during execution.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        owner = data.get('owner')
+        limit = data.get('limit', 1)
+        lease_seconds = data.get('lease_seconds', DEFAULT_LEASE_SECONDS)
+
+        if not owner:
+            return Response(status=400, response='Invalid input: "owner" required.')
+
+        if not isinstance(limit, int) or limit < 1 or not isinstance(lease_seconds, (int, float)) or lease_seconds <= 0:
+            return Response(status=400, response='Invalid input: "limit" and "lease_seconds" should be positive numbers.')
+
+        # Create query filter for claimable work items
+        query_filter = {'status': 'NEW'}
+        if data.get('task_id'):
+            query_filter['task_id'] = ObjectId(data['task_id'])
+        if data.get('min_priority') is not None:
+            query_filter['priority'] = {'$gte': data['min_priority']}
+
+        claimed = []
+        for _ in range(limit):
+            current_time = datetime.now(timezone.utc)
+            workitem = workitems_collection.find_one_and_update(
+                query_filter,
+                {'$set': {
+                    'status': 'RUNNING',
+                    'owner': owner,
+                    'leaseExpires': current_time + timedelta(seconds=lease_seconds),
+                    'started': current_time,
+                    'lastUpdated': current_time
+                }, '$inc': {'attempts': 1}},
+                sort=[('priority', DESCENDING), ('_id', ASCENDING)],
+                return_document=ReturnDocument.AFTER
+            )
+
+            # Stop as soon as there is nothing left to claim
+            if not workitem:
+                break
+
+            _record_workitem_transition({'task_id': workitem['task_id'], 'status': 'NEW'}, 'RUNNING', current_time)
+
+            # Convert ObjectId to string for JSON serialization
             workitem['_id'] = str(workitem['_id'])
             workitem['task_id'] = str(workitem['task_id'])
-        return jsonify(workitems), 200
+            if 'parent_id' in workitem:
+                workitem['parent_id'] = str(workitem['parent_id'])
+            claimed.append(workitem)
+
+        if not claimed:
+            # Let a busy consumer know that another one is waiting for work
+            signals_collection.update_one({'_id': 'demand'}, {'$set': {'requested': current_time}}, upsert=True)
+            return Response(status=404, response='Nothing to claim.')
+
+        return jsonify(claimed), 200
+
+    except Exception as e:
+        # Return 500 error with exception details
+        return Response(status=500, response=str(e))
+
+@app.route('/workitems/<workitem_id>/lease', methods=['PUT'])
+def extend_workitem_lease(workitem_id):
+    """
+    Extends the lease on a RUNNING work item for the consumer that claimed it.
+
+    If the consumer can split its work item and another consumer has found nothing to
+    claim in the last BLACKBOARD_DEMAND_SECONDS, the reply asks it to split the work item.
+    The demand is cleared so that only one busy consumer is asked.
+
+    Request Body:
+        - owner: The consumer that claimed the work item.
+        - lease_seconds (optional): How long from now the lease lasts. Defaults to BLACKBOARD_LEASE_SECONDS.
+        - can_split (optional): True if the consumer can split the work item. Defaults to False.
+
+    Returns:
+        - 200 OK: If the lease was extended, with 'split' set when the work item should be split.
+        - 400 Bad Request: If the owner is missing or the lease is invalid.
+        - 409 Conflict: If the work item is no longer RUNNING for this owner, e.g. it was requeued.
+        - 500 Internal Server Error: If there is an exception during execution.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        owner = data.get('owner')
+        lease_seconds = data.get('lease_seconds', DEFAULT_LEASE_SECONDS)
+
+        if not owner:
+            return Response(status=400, response='Invalid input: "owner" required.')
+
+        if not isinstance(lease_seconds, (int, float)) or lease_seconds <= 0:
+            return Response(status=400, response='Invalid input: "lease_seconds" should be a positive number.')
+
+        current_time = datetime.now(timezone.utc)
+        result = workitems_collection.update_one(
+            {'_id': ObjectId(workitem_id), 'status': 'RUNNING', 'owner': owner},
+            {'$set': {'leaseExpires': current_time + timedelta(seconds=lease_seconds), 'lastUpdated': current_time}}
+        )
+
+        if not result.matched_count:
+            return Response(status=409, response='Lease lost.')
+
+        # Take any recent demand so that no other consumer splits its work item for it
+        demand = None
+        if data.get('can_split'):
+            demand = signals_collection.find_one_and_update(
+                {'_id': 'demand', 'requested': {'$gte': current_time - timedelta(seconds=DEMAND_SECONDS)}},
+                {'$unset': {'requested': ''}}
+            )
+
+        return jsonify({'message': 'Lease extended.', 'split': demand is not None}), 200
 
     except Exception as e:
         # Return 500 error with exception details
         return Response(status=500, response=str(e))
 
+@app.route('/workitems/<workitem_id>/split', methods=['POST'])
+def split_workitem(workitem_id):
+    """
+    Adds part of a RUNNING work item's search to its task as new work items.
+
+    The consumer that claimed the work item gives up sequences it has not searched yet.
+    The task's 'scheduled_items_count' is incremented, they are added as NEW work items of
+    the same task, and their letters after the work item's 'current_sequence' are added to
+    its 'donated' list so that the work item skips them if it is resumed.
+
+    The count is incremented before the new work items exist, so that the task cannot be
+    completed by them while the work item is still running, and is taken back for any that
+    could not be added.  The work item's 'donated' list is only updated while it is still
+    RUNNING for the owner: if the split fails part way the worst outcome is that the same
+    sequences are searched twice.
+
+    Request Body:
+        - owner: The consumer that claimed the work item.
+        - workitems: The new work items, each with 'current_sequence', 'remaining_elements'
+          and optionally 'prefix_from'.
+        - donated: The letters of each new work item's 'current_sequence' after the work item's own.
+
+    Returns:
+        - 200 OK: With the IDs of the new work items.
+        - 400 Bad Request: If the owner is missing or the work items are invalid.
+        - 409 Conflict: If the work item is no longer RUNNING for this owner, in which case any
+          new work items are still searched.
+        - 500 Internal Server Error: If there is an exception during execution.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        owner = data.get('owner')
+        workitems_data = data.get('workitems')
+        donated = data.get('donated')
+
+        if not owner:
+            return Response(status=400, response='Invalid input: "owner" required.')
+
+        if not isinstance(workitems_data, list) or not workitems_data or not isinstance(donated, list) \
+                or len(donated) != len(workitems_data) \
+                or not all(isinstance(workitem, dict) and isinstance(workitem.get('current_sequence'), str)
+                           and isinstance(workitem.get('remaining_elements'), str) for workitem in workitems_data) \
+                or not all(isinstance(path, str) and path for path in donated):
+            return Response(status=400, response='Invalid input: "workitems" and "donated" should be matching non-empty lists.')
+
+        query_filter = {'_id': ObjectId(workitem_id), 'status': 'RUNNING', 'owner': owner}
+        parent = workitems_collection.find_one(query_filter, {'task_id': 1, 'priority': 1})
+        if not parent:
+            return Response(status=409, response='Lease lost.')
+
+        current_time = datetime.now(timezone.utc)
+        tasks_collection.update_one(
+            {'_id': parent['task_id']},
+            {'$inc': {'scheduled_items_count': len(workitems_data)}, '$set': {'lastUpdated': current_time}}
+        )
+        try:
+            result = workitems_collection.insert_many([{
+                'task_id': parent['task_id'],
+                'status': 'NEW',
+                'current_sequence': workitem['current_sequence'],
+                'remaining_elements': workitem['remaining_elements'],
+                'prefix_from': workitem.get('prefix_from', len(workitem['current_sequence'])),
+                'estimated_cost': None,
+                'priority': parent.get('priority', 0),
+                'parent_id': parent['_id'],
+                'lastUpdated': current_time
+            } for workitem in workitems_data])
+        except Exception as e:
+            # Stop the task waiting for work items that were never added
+            inserted = e.details.get('nInserted', 0) if isinstance(e, BulkWriteError) else 0
+            tasks_collection.update_one({'_id': parent['task_id']},
+                                        {'$inc': {'scheduled_items_count': inserted - len(workitems_data)}})
+            raise
+        finally:
+            task_notifier.notify(str(parent['task_id']))
+
+        donated_result = workitems_collection.update_one(
+            query_filter,
+            {'$push': {'donated': {'$each': donated}}, '$set': {'lastUpdated': current_time}}
+        )
+        if not donated_result.matched_count:
+            return Response(status=409, response='Lease lost.')
+
+        return jsonify({'workitem_ids': [str(inserted_id) for inserted_id in result.inserted_ids]}), 200
+
+    except Exception as e:
+        # Return 500 error with exception details
+        return Response(status=500, response=str(e))
+
+@app.route('/workitems/<workitem_id>/checkpoint', methods=['PUT'])
+def checkpoint_workitem(workitem_id):
+    """
+    Records how far the consumer that claimed a RUNNING work item has searched it.
+
+    The cursor is kept when the work item is requeued, so the next consumer to claim it
+    resumes the search from the cursor instead of starting again.
+
+    Request Body:
+        - owner: The consumer that claimed the work item.
+        - cursor: The letters after the work item's 'current_sequence' to resume the search at.
+
+    Returns:
+        - 200 OK: If the checkpoint was recorded.
+        - 400 Bad Request: If the owner or cursor is missing or invalid.
+        - 409 Conflict: If the work item is no longer RUNNING for this owner.
+        - 500 Internal Server Error: If there is an exception during execution.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        owner = data.get('owner')
+        cursor = data.get('cursor')
+
+        if not owner or not isinstance(cursor, str):
+            return Response(status=400, response='Invalid input: "owner" and "cursor" required.')
+
+        result = workitems_collection.update_one(
+            {'_id': ObjectId(workitem_id), 'status': 'RUNNING', 'owner': owner},
+            {'$set': {'cursor': cursor, 'checkpointed': datetime.now(timezone.utc)}}
+        )
+
+        if not result.matched_count:
+            return Response(status=409, response='Lease lost.')
+
+        return Response(status=200, response='Checkpoint recorded.')
+
+    except Exception as e:
+        # Return 500 error with exception details
+        return Response(status=500, response=str(e))
+
+@app.route('/workitems/<workitem_id>/progress', methods=['PUT'])
+def report_workitem_progress(workitem_id):
+    """
+    Records the progress of a work item and adds the change to its task's progress.
+
+    The consumer reports running totals, so the work item's counters are replaced and its
+    task's counters are incremented by the difference from the previous report.  A work
+    item that is requeued and starts again therefore takes back what it had reported.
+
+    Request Body:
+        - prefixes_explored: The number of sequences checked so far.
+        - words_found: The number of words found so far.
+        - fraction_done: The estimated fraction of the work item that is finished.
+
+    Returns:
+        - 200 OK: If the progress was recorded.
+        - 400 Bad Request: If a counter is missing or invalid.
+        - 404 Not Found: If the work item is not found.
+        - 500 Internal Server Error: If there is an exception during execution.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        counters = {name: data.get(name) for name in ('prefixes_explored', 'words_found', 'fraction_done')}
+
+        if not all(isinstance(value, (int, float)) and value >= 0 for value in counters.values()):
+            return Response(status=400, response='Invalid input: "prefixes_explored", "words_found" and "fraction_done" should be non-negative numbers.')
+
+        counters['fraction_done'] = min(1.0, counters['fraction_done'])
+        current_time = datetime.now(timezone.utc)
+
+        # Replace the work item's progress and keep the previous report to work out the change
+        workitem = workitems_collection.find_one_and_update(
+            {'_id': ObjectId(workitem_id)},
+            {'$set': {**{f'progress.{name}': value for name, value in counters.items()}, 'lastUpdated': current_time}},
+            projection={'task_id': 1, 'progress': 1},
+            return_document=ReturnDocument.BEFORE
+        )
+
+        if not workitem:
+            return Response(status=404, response='Workitem not found.')
+
+        previous = workitem.get('progress', {})
+        tasks_collection.update_one(
+            {'_id': workitem['task_id']},
+            {'$inc': {
+                'progress.prefixes_explored': counters['prefixes_explored'] - previous.get('prefixes_explored', 0),
+                'progress.words_found': counters['words_found'] - previous.get('words_found', 0),
+                'progress.fraction_sum': counters['fraction_done'] - previous.get('fraction_done', 0)
+            }, '$set': {'lastUpdated': current_time}}
+        )
+        task_notifier.notify(str(workitem['task_id']))
+
+        return Response(status=200, response='Progress recorded.')
+
+    except Exception as e:
+        # Return 500 error with exception details
+        return Response(status=500, response=str(e))
+
+@app.route('/workitems/reap', methods=['POST'])
+def reap_workitems():
+    """
+    Recovers RUNNING work items whose lease has expired, e.g. because their consumer died.
+
+    Work items that have been claimed fewer than 'max_attempts' times are requeued as NEW
+    so another consumer can claim them.  The rest are PARKED and are not claimed again.
+
+    Request Body (optional):
+        - max_attempts: Claims allowed before a work item is parked. Defaults to BLACKBOARD_MAX_ATTEMPTS.
+
+    Returns:
+        - 200 OK: With the number of work items requeued and parked.
+        - 400 Bad Request: If 'max_attempts' is invalid.
+        - 500 Internal Server Error: If there is an exception during execution.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        max_attempts = data.get('max_attempts', MAX_ATTEMPTS)
+
+        if not isinstance(max_attempts, int) or max_attempts < 1:
+            return Response(status=400, response='Invalid input: "max_attempts" should be a positive integer.')
+
+        current_time = datetime.now(timezone.utc)
+        expired = {'status': 'RUNNING', 'leaseExpires': {'$lt': current_time}}
+
+        parked = workitems_collection.update_many(
+            {**expired, 'attempts': {'$gte': max_attempts}},
+            {'$set': {'status': 'PARKED', 'lastUpdated': current_time}, '$unset': {'leaseExpires': ''}}
+        )
+
+        # Work items claimed before attempts were counted have no 'attempts' and are requeued.
+        # Any checkpointed 'cursor' is kept so that the next claim resumes the search.
+        requeued = workitems_collection.update_many(
+            {**expired, 'attempts': {'$not': {'$gte': max_attempts}}},
+            {'$set': {'status': 'NEW', 'lastUpdated': current_time}, '$unset': {'owner': '', 'leaseExpires': ''}}
+        )
+
+        return jsonify({'requeued': requeued.modified_count, 'parked': parked.modified_count}), 200
+
+    except Exception as e:
+        # Return 500 error with exception details
+        return Response(status=500, response=str(e))
+
+def _record_workitem_transition(workitem, new_status, current_time):
+    """
+    Keeps a task's 'completed_items_count' in step with a change of status of one of its
+    work items, and advances the task without waiting for the watcher to poll.
+
+    The task moves from SCHEDULED to RUNNING when one of its work items starts, and to
+    COMPLETED when 'completed_items_count' reaches 'scheduled_items_count'.  Both moves
+    are conditional updates, so whichever request gets there first makes the move and
+    the rest change nothing.  The request that completes the task builds its results and
+    completes the tasks following it.
+
+    Args:
+        workitem (dict): The work item's 'task_id' and 'status' before the change.
+        new_status (str): The work item's status after the change.
+        current_time (datetime): The time of the change.
+    """
+    previous_status = workitem.get('status')
+    if previous_status == new_status:
+        return
+    task_id = workitem['task_id']
+
+    if new_status == 'RUNNING':
+        tasks_collection.update_one(
+            {'_id': task_id, 'status': 'SCHEDULED'},
+            {'$set': {'status': 'RUNNING', 'started': current_time, 'lastUpdated': current_time}}
+        )
+
+    if 'COMPLETED' in (previous_status, new_status):
+        tasks_collection.update_one(
+            {'_id': task_id},
+            {'$inc': {'completed_items_count': 1 if new_status == 'COMPLETED' else -1}}
+        )
+
+    if new_status == 'COMPLETED':
+        _complete_task_if_done(task_id, current_time)
+
+    task_notifier.notify(str(task_id))
+
+def _complete_task_if_done(task_id, current_time):
+    """
+    Moves a task to COMPLETED if every one of its scheduled work items has completed,
+    then builds its results and completes the tasks following it.
+    """
+    result = tasks_collection.update_one(
+        {'_id': task_id, 'status': {'$in': ['SCHEDULED', 'RUNNING']}, 'scheduled_items_count': {'$gt': 0},
+         '$expr': {'$gte': ['$completed_items_count', '$scheduled_items_count']}},
+        {'$set': {'status': 'COMPLETED', 'completed': current_time, 'lastUpdated': current_time},
+         '$unset': {'in_flight': ''}}
+    )
+    if result.modified_count:
+        _build_results(task_id)
+        _release_followers(task_id, 'COMPLETED', current_time)
+
+def _catch_up_scheduled_task(task_id, current_time):
+    """
+    Applies the moves its work items' transitions would have made to a task that has just
+    been SCHEDULED, since work items can start, and even all complete, while the task is
+    still SCHEDULING and so not yet able to move.
+    """
+    started = workitems_collection.find_one(
+        {'task_id': task_id, 'status': {'$in': ['RUNNING', 'COMPLETED', 'PARKED']}}, {'_id': 1}
+    )
+    if started:
+        tasks_collection.update_one(
+            {'_id': task_id, 'status': 'SCHEDULED'},
+            {'$set': {'status': 'RUNNING', 'started': current_time, 'lastUpdated': current_time}}
+        )
+        _complete_task_if_done(task_id, current_time)
+
 @app.route('/workitems/<workitem_id>', methods=['PUT'])
 def update_workitem(workitem_id):
     """
-    Update the status of a work item in the MongoDB collection.
+    Update the status of a work item in the MongoDB collection, and advance its task
+    when the work item is the first to start or the last to complete.
 
     Args:
         workitem_id (str): The ID of the work item to update.
 
     Request Body:
-        JSON with a key 'status' having value 'NEW', 'RUNNING', or 'COMPLETED'.
+        JSON with a key 'status' having value 'NEW', 'RUNNING', 'COMPLETED' or 'PARKED'.
 
     Returns:
         Response: JSON response with appropriate HTTP status code.
@@ -538,7 +1784,7 @@ def update_workitem(workitem_id):
         new_status = data.get('status')
 
         # Validate the status
-        if new_status not in ['NEW', 'RUNNING', 'COMPLETED']:
+        if new_status not in ['NEW', 'RUNNING', 'COMPLETED', 'PARKED']:
             return jsonify({"error": "Invalid status value"}), 400
 
         # Get the current date-time in ISO format
@@ -552,15 +1798,19 @@ def update_workitem(workitem_id):
         elif new_status == 'COMPLETED':
             update_fields['completed'] = current_time
 
-        # Update the work item in the collection
-        result = workitems_collection.update_one(
+        # Update the work item in the collection, keeping its previous status
+        workitem = workitems_collection.find_one_and_update(
             {'_id': ObjectId(workitem_id)},
-            {'$set': {'status': new_status, **update_fields}}
+            {'$set': {'status': new_status, **update_fields}},
+            projection={'task_id': 1, 'status': 1},
+            return_document=ReturnDocument.BEFORE
         )
 
         # Check if any document was modified
-        if result.matched_count == 0:
+        if not workitem:
             return jsonify({"error": "Work item not found"}), 404
+
+        _record_workitem_transition(workitem, new_status, current_time)
         
         return jsonify({"message": "Work item updated successfully"}), 200
     
@@ -0,0 +1,80 @@
+import threading
+from contextlib import contextmanager
+
+
+class Subscription:
+    """
+    A request's interest in changes to one key, handed out by ChangeNotifier.listen.
+    """
+
+    def __init__(self, condition, entry):
+        self._condition = condition
+        self._entry = entry
+        self._seen = entry['version']
+
+    def wait(self, timeout=None):
+        """
+        Waits until the key changes, counting changes since the subscription was made or last waited on.
+
+        Args:
+            timeout (float, optional): Seconds to wait before giving up.
+
+        Returns:
+            bool: True if the key changed, False if the wait timed out.
+        """
+        with self._condition:
+            changed = self._condition.wait_for(lambda: self._entry['version'] != self._seen, timeout)
+            self._seen = self._entry['version']
+        return changed
+
+
+class ChangeNotifier:
+    """
+    Wakes requests waiting for a key, e.g. a task ID, to change within this process.
+
+    Only keys that a request is listening to are tracked, so nothing is held for keys
+    nobody is waiting on.  A request subscribes before it reads the current state, so a
+    change made between the read and the wait is not missed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    @contextmanager
+    def listen(self, key):
+        """
+        Subscribes to changes to 'key' for the duration of a with block.
+
+        Yields:
+            Subscription: Call 'wait' on it to block until the key changes.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {'condition': threading.Condition(self._lock), 'version': 0, 'listeners': 0}
+            entry['listeners'] += 1
+        try:
+            yield Subscription(entry['condition'], entry)
+        finally:
+            with self._lock:
+                entry['listeners'] -= 1
+                if not entry['listeners']:
+                    del self._entries[key]
+
+    def notify(self, key):
+        """
+        Wakes every request waiting for 'key' to change.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry['version'] += 1
+                entry['condition'].notify_all()
+
+    def listeners(self):
+        """
+        Returns the number of requests currently listening for changes.
+        """
+        with self._lock:
+            return sum(entry['listeners'] for entry in self._entries.values())
@@ -0,0 +1,197 @@
+import atexit
+import queue
+import threading
+import time
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError
+
+# The error code MongoDB reports when an insert breaks a unique index
+DUPLICATE_KEY_ERROR = 11000
+
+
+def only_duplicate_keys(error):
+    """
+    Returns True if a BulkWriteError was caused only by records that were already stored.
+
+    Args:
+        error (pymongo.errors.BulkWriteError): The error raised by an unordered bulk write.
+    """
+    details = error.details or {}
+    return not details.get('writeConcernErrors') and \
+        all(write_error.get('code') == DUPLICATE_KEY_ERROR for write_error in details.get('writeErrors', []))
+
+
+class PendingWrite:
+    """
+    A batch of records handed to a WordWriter, which signals once they have been written.
+    """
+
+    def __init__(self, records):
+        self.records = records
+        self.error = None
+        self._written = threading.Event()
+
+    def done(self, error=None):
+        self.error = error
+        self._written.set()
+
+    def wait(self, timeout=None):
+        """
+        Waits until the records have been written.
+
+        Args:
+            timeout (float, optional): Seconds to wait before giving up.
+
+        Raises:
+            TimeoutError: If the records were not written within 'timeout' seconds.
+            Exception: The error raised while writing the records, if any.
+        """
+        if not self._written.wait(timeout):
+            raise TimeoutError('Timed out waiting for the words to be written.')
+        if self.error is not None:
+            raise self.error
+
+
+class WordWriter:
+    """
+    Coalesces word inserts from concurrent requests into periodic unordered bulk_write batches.
+
+    Records are queued by 'submit' and written by a background thread once 'max_batch'
+    records are waiting or 'flush_interval' seconds have passed since the first of them
+    was queued.  The queue is bounded so that 'submit' blocks when the database falls
+    behind, and anything still queued is written when the process exits.  Records that
+    are already stored are skipped rather than treated as errors.
+    """
+
+    def __init__(self, collection, max_queue=10000, max_batch=1000, flush_interval=0.05, put_timeout=30):
+        """
+        Args:
+            collection (pymongo.collection.Collection): The collection the records are written to.
+            max_queue (int): The most submissions that may wait to be written.
+            max_batch (int): The most records written by one bulk_write.
+            flush_interval (float): The longest a submission waits for others to join its batch.
+            put_timeout (float): The longest 'submit' blocks while the queue is full.
+        """
+        self.collection = collection
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._metrics = {
+            'batches': 0,
+            'words': 0,
+            'errors': 0,
+            'last_batch_size': 0,
+            'max_batch_size': 0,
+            'last_flush_seconds': 0.0,
+            'max_flush_seconds': 0.0,
+            'total_flush_seconds': 0.0
+        }
+
+    def start(self):
+        """
+        Starts the background writer thread if it is not already running.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='wordwriter', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def submit(self, records):
+        """
+        Queues records to be written in the next batch.
+
+        Args:
+            records (list of dict): The word records to insert.
+
+        Returns:
+            PendingWrite: Call 'wait' on it to block until the records are written.
+
+        Raises:
+            queue.Full: If the queue stayed full for 'put_timeout' seconds.
+        """
+        self.start()
+        pending = PendingWrite(records)
+        self._queue.put(pending, timeout=self.put_timeout)
+        return pending
+
+    def close(self):
+        """
+        Writes everything still queued and stops the background writer thread.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def metrics(self):
+        """
+        Returns the batch size and flush latency of the batches written so far.
+
+        Returns:
+            dict: Counters and the mean, last and largest batch size and flush latency.
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+        batches = metrics['batches']
+        metrics['mean_batch_size'] = metrics['words'] / batches if batches else 0.0
+        metrics['mean_flush_seconds'] = metrics.pop('total_flush_seconds') / batches if batches else 0.0
+        metrics['queued'] = self._queue.qsize()
+        return metrics
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            # Gather whatever else arrives before the batch is full or the interval ends
+            batch = [first]
+            size = len(first.records)
+            deadline = time.monotonic() + self.flush_interval
+            while size < self.max_batch:
+                try:
+                    pending = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if pending is None:
+                    stopping = True
+                    break
+                batch.append(pending)
+                size += len(pending.records)
+
+            self._write(batch, size)
+
+    def _write(self, batch, size):
+        started = time.monotonic()
+        error = None
+        try:
+            if size:
+                self.collection.bulk_write([InsertOne(record) for pending in batch for record in pending.records],
+                                           ordered=False)
+        except BulkWriteError as e:
+            if not only_duplicate_keys(e):
+                print(f"Failed to write {size} words: {str(e)}")
+                error = e
+        except Exception as e:
+            print(f"Failed to write {size} words: {str(e)}")
+            error = e
+        elapsed = time.monotonic() - started
+
+        with self._lock:
+            self._metrics['batches'] += 1
+            self._metrics['words'] += size
+            self._metrics['errors'] += error is not None
+            self._metrics['last_batch_size'] = size
+            self._metrics['max_batch_size'] = max(self._metrics['max_batch_size'], size)
+            self._metrics['last_flush_seconds'] = elapsed
+            self._metrics['max_flush_seconds'] = max(self._metrics['max_flush_seconds'], elapsed)
+            self._metrics['total_flush_seconds'] += elapsed
+
+        for pending in batch:
+            pending.done(error)
@@ -1,13 +1,19 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, call
 from flask import Flask, jsonify
 from bson.objectid import ObjectId
 from pymongo.collection import Collection
 from bson.objectid import ObjectId
+from bson.binary import Binary
 from http import HTTPStatus
-from richarsi.blackboard.app import app  # Import your Flask app
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo import ASCENDING
+from richarsi.blackboard.app import app, ensure_indexes, explain_queries, task_notifier, _build_results  # Import your Flask app
 import datetime
 import json
+import threading
+import time
+import zlib
 
 class TestFlaskApp(unittest.TestCase):
 
@@ -24,18 +30,301 @@ class TestFlaskApp(unittest.TestCase):
             self.assertEqual(response.data.decode('utf-8'), 'Database is operational.')
             mock_db_command.assert_called_once_with("ping")
 
+    @patch('richarsi.blackboard.app.cache_collection')
     @patch('richarsi.blackboard.app.tasks_collection.insert_one')
-    def test_create_task_success(self, mock_insert_one):
+    def test_create_task_success(self, mock_insert_one, mock_cache):
         """Test successful task creation."""
         new_task_id = '60bb4b001f3850f5c7b48c2a'
         
         mock_result = MagicMock()
         mock_result.inserted_id = ObjectId(new_task_id)
         mock_insert_one.return_value = mock_result
+        mock_cache.find_one.return_value = None
         
-        response = self.app.post('/tasks', json={'letters': 'abcd'})
+        response = self.app.post('/tasks', json={'letters': 'dcba'})
         self.assertEqual(response.status_code, 202)
         self.assertIn('/status/60bb4b001f3850f5c7b48c2a', response.headers['Location'])
+        self.assertEqual(mock_insert_one.call_args.args[0]['status'], 'NEW')
+        # The lookup is counted as a miss for the sorted letters
+        self.assertEqual(mock_cache.find_one.call_args.args[0], {'_id': 'abcd', 'results_id': {'$exists': True}})
+        mock_cache.update_one.assert_called_once_with({'_id': 'abcd'}, {'$inc': {'misses': 1}}, upsert=True)
+
+    @patch('richarsi.blackboard.app.results_collection')
+    @patch('richarsi.blackboard.app.cache_collection')
+    @patch('richarsi.blackboard.app.tasks_collection.insert_one')
+    def test_create_task_from_cache(self, mock_insert_one, mock_cache, mock_results):
+        """Test a task for an anagram of completed letters completing at once."""
+        cached_id = ObjectId('60bb4b001f3850f5c7b48c29')
+        mock_insert_one.return_value.inserted_id = ObjectId('60bb4b001f3850f5c7b48c2a')
+        mock_cache.find_one.return_value = {'_id': 'eilnst', 'results_id': cached_id}
+        mock_results.find_one.return_value = {'_id': cached_id, 'word_count': 2, 'lengths': [{'length': 6, 'count': 2}]}
+
+        response = self.app.post('/tasks', json={'letters': 'silent'})
+
+        self.assertEqual(response.status_code, 202)
+        self.assertIn('/status/60bb4b001f3850f5c7b48c2a', response.headers['Location'])
+        task = mock_insert_one.call_args.args[0]
+        self.assertEqual(task['status'], 'COMPLETED')
+        self.assertEqual(task['letters'], 'silent')
+        self.assertEqual(task['results_id'], cached_id)
+        # The new task's results point at the cached words rather than copying them
+        results = mock_results.replace_one.call_args.args[1]
+        self.assertEqual(results['_id'], ObjectId('60bb4b001f3850f5c7b48c2a'))
+        self.assertEqual(results['results_id'], cached_id)
+        self.assertNotIn('words', results)
+        # Only the hit is counted
+        mock_cache.update_one.assert_called_once()
+        self.assertEqual(mock_cache.update_one.call_args.args[0], {'_id': 'eilnst'})
+        self.assertEqual(mock_cache.update_one.call_args.args[1][0]['$set']['hits'], {'$add': [{'$ifNull': ['$hits', 0]}, 1]})
+
+    @patch('richarsi.blackboard.app.results_collection')
+    @patch('richarsi.blackboard.app.cache_collection')
+    @patch('richarsi.blackboard.app.tasks_collection.insert_one')
+    def test_create_task_with_stale_cache_entry(self, mock_insert_one, mock_cache, mock_results):
+        """Test a cache entry whose results were deleted counting only as a miss."""
+        cached_id = ObjectId('60bb4b001f3850f5c7b48c29')
+        mock_insert_one.return_value.inserted_id = ObjectId('60bb4b001f3850f5c7b48c2a')
+        mock_cache.find_one.return_value = {'_id': 'eilnst', 'results_id': cached_id}
+        mock_results.find_one.return_value = None
+
+        response = self.app.post('/tasks', json={'letters': 'silent'})
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(mock_insert_one.call_args.args[0]['status'], 'NEW')
+        self.assertEqual(mock_cache.update_one.call_args_list, [
+            call({'_id': 'eilnst', 'results_id': cached_id}, {'$unset': {'results_id': '', 'compute_seconds': ''}}),
+            call({'_id': 'eilnst'}, {'$inc': {'misses': 1}}, upsert=True),
+        ])
+
+    @patch('richarsi.blackboard.app.cache_collection.aggregate')
+    def test_cache_metrics(self, mock_aggregate):
+        mock_aggregate.return_value = iter([{'_id': None, 'hits': 3, 'misses': 1, 'saved_seconds': 12.5, 'cached_keys': 1}])
+
+        response = self.app.get('/metrics/cache')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'enabled': True, 'hits': 3, 'misses': 1, 'hit_rate': 0.75,
+                                               'cached_keys': 1, 'saved_seconds': 12.5})
+
+    @patch('richarsi.blackboard.app.cache_collection.aggregate')
+    def test_cache_metrics_without_lookups(self, mock_aggregate):
+        mock_aggregate.return_value = iter([])
+
+        response = self.app.get('/metrics/cache')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['hit_rate'], 0.0)
+
+
+class TestCoalesceTasks(unittest.TestCase):
+
+    def setUp(self):
+        self.app = app.test_client()
+        self.app.testing = True
+        patchers = [patch('richarsi.blackboard.app.tasks_collection'), patch('richarsi.blackboard.app.cache_collection')]
+        self.mock_tasks, self.mock_cache = [patcher.start() for patcher in patchers]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+        # Nothing cached for the letters
+        self.mock_cache.find_one.return_value = None
+        self.leader_id = ObjectId('60bb4b001f3850f5c7b48c29')
+        self.follower_id = ObjectId('60bb4b001f3850f5c7b48c2a')
+
+    def test_first_task_leads(self):
+        self.mock_tasks.insert_one.return_value.inserted_id = self.leader_id
+
+        response = self.app.post('/tasks', json={'letters': 'listen'})
+
+        self.assertEqual(response.status_code, 202)
+        self.assertIn(f'/status/{self.leader_id}', response.headers['Location'])
+        task = self.mock_tasks.insert_one.call_args.args[0]
+        self.assertEqual((task['status'], task['letters_key'], task['in_flight']), ('NEW', 'eilnst', True))
+
+    def test_later_task_follows(self):
+        self.mock_tasks.insert_one.side_effect = [DuplicateKeyError('letters_key_in_flight_unique'),
+                                                  MagicMock(inserted_id=self.follower_id)]
+        # The leader is in flight, and still is once the follower has been inserted
+        self.mock_tasks.find_one.side_effect = [{'_id': self.leader_id},
+                                                {'_id': self.leader_id, 'status': 'RUNNING', 'in_flight': True}]
+
+        response = self.app.post('/tasks', json={'letters': 'silent'})
+
+        self.assertEqual(response.status_code, 202)
+        self.assertIn(f'/status/{self.follower_id}', response.headers['Location'])
+        follower = self.mock_tasks.insert_one.call_args.args[0]
+        self.assertEqual(follower['status'], 'FOLLOWING')
+        self.assertEqual(follower['leader_id'], self.leader_id)
+        self.assertNotIn('in_flight', follower)
+        self.mock_tasks.update_many.assert_not_called()
+
+    def test_follower_of_leader_that_just_finished(self):
+        self.mock_tasks.insert_one.side_effect = [DuplicateKeyError('letters_key_in_flight_unique'),
+                                                  MagicMock(inserted_id=self.follower_id)]
+        self.mock_tasks.find_one.side_effect = [{'_id': self.leader_id}, {'_id': self.leader_id, 'status': 'COMPLETED'}]
+
+        response = self.app.post('/tasks', json={'letters': 'silent'})
+
+        self.assertEqual(response.status_code, 202)
+        # The leader finished before it could release the follower, so the follower is released now
+        query_filter, update = self.mock_tasks.update_many.call_args.args
+        self.assertEqual(query_filter, {'leader_id': self.leader_id, 'status': 'FOLLOWING'})
+        self.assertEqual(update['$set']['status'], 'COMPLETED')
+
+    def test_follower_of_leader_that_was_deleted(self):
+        self.mock_tasks.insert_one.side_effect = [DuplicateKeyError('letters_key_in_flight_unique'),
+                                                  MagicMock(inserted_id=self.follower_id)]
+        self.mock_tasks.find_one.side_effect = [{'_id': self.leader_id}, None]
+        self.mock_tasks.find_one_and_update.return_value = {'_id': self.follower_id}
+
+        response = self.app.post('/tasks', json={'letters': 'silent'})
+
+        self.assertEqual(response.status_code, 202)
+        self.assertIn(f'/status/{self.follower_id}', response.headers['Location'])
+        # The leader was deleted before it could hand over to the follower, so the follower takes over now
+        query_filter, update = self.mock_tasks.find_one_and_update.call_args.args
+        self.assertEqual(query_filter, {'leader_id': self.leader_id, 'status': 'FOLLOWING'})
+        self.assertEqual(update['$set']['status'], 'NEW')
+
+    @patch('richarsi.blackboard.app.results_collection')
+    def test_deleting_leader_in_flight_promotes_follower(self, mock_results):
+        other_follower_id = ObjectId('60bb4b001f3850f5c7b48c2b')
+        earlier = datetime.datetime(2023, 10, 1, tzinfo=datetime.timezone.utc)
+        tasks = {
+            self.leader_id: {'_id': self.leader_id, 'status': 'RUNNING', 'letters_key': 'eilnst', 'in_flight': True,
+                             'lastUpdated': earlier},
+            other_follower_id: {'_id': other_follower_id, 'status': 'FOLLOWING', 'letters_key': 'eilnst',
+                                'leader_id': self.leader_id, 'lastUpdated': earlier},
+            self.follower_id: {'_id': self.follower_id, 'status': 'FOLLOWING', 'letters_key': 'eilnst',
+                               'leader_id': self.leader_id, 'lastUpdated': earlier},
+        }
+
+        def matching(query_filter):
+            return sorted((task for task in tasks.values()
+                           if all(task.get(field) == value for field, value in query_filter.items())),
+                          key=lambda task: task['_id'])
+
+        def find_one_and_update(query_filter, update, projection=None, sort=None):
+            task = next(iter(matching(query_filter)), None)
+            if task:
+                task.update(update['$set'])
+                for field in update['$unset']:
+                    del task[field]
+            return task and {'_id': task['_id']}
+
+        def update_many(query_filter, update):
+            for task in matching(query_filter):
+                task.update(update['$set'])
+
+        self.mock_tasks.find_one_and_delete.side_effect = lambda query_filter, projection: tasks.pop(query_filter['_id'])
+        self.mock_tasks.find_one_and_update.side_effect = find_one_and_update
+        self.mock_tasks.update_many.side_effect = update_many
+        # No task shares the deleted leader's results
+        self.mock_tasks.find_one.side_effect = lambda query_filter, projection=None: \
+            None if '$or' in query_filter else tasks.get(query_filter['_id'])
+
+        with task_notifier.listen(str(self.follower_id)) as subscription:
+            response = self.app.delete(f'/tasks/{self.leader_id}')
+            self.assertTrue(subscription.wait(0))
+
+        self.assertEqual(response.status_code, 200)
+        # The oldest follower searches in the deleted leader's place
+        promoted = tasks[self.follower_id]
+        self.assertEqual(promoted['status'], 'NEW')
+        self.assertTrue(promoted['in_flight'])
+        self.assertNotIn('leader_id', promoted)
+        self.assertEqual(self.mock_tasks.find_one_and_update.call_args.kwargs['sort'], [('_id', ASCENDING)])
+        # ...and the other follower follows it instead
+        self.assertEqual(tasks[other_follower_id]['status'], 'FOLLOWING')
+        self.assertEqual(tasks[other_follower_id]['leader_id'], self.follower_id)
+
+        # So the other follower now reports the status of the promoted follower
+        response = self.app.get(f'/status/{other_follower_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'lastUpdated': promoted['lastUpdated'].isoformat()})
+        self.assertNotEqual(promoted['lastUpdated'], earlier)
+
+    @patch('richarsi.blackboard.app.results_collection')
+    def test_deleting_leader_in_flight_when_another_leads(self, mock_results):
+        new_leader_id = ObjectId('60bb4b001f3850f5c7b48c2c')
+        self.mock_tasks.find_one_and_delete.return_value = {'_id': self.leader_id, 'letters_key': 'eilnst', 'in_flight': True}
+        self.mock_tasks.find_one_and_update.side_effect = DuplicateKeyError('letters_key_in_flight_unique')
+        self.mock_tasks.find_one.side_effect = [{'_id': new_leader_id}, None]
+
+        response = self.app.delete(f'/tasks/{self.leader_id}')
+
+        self.assertEqual(response.status_code, 200)
+        # The followers follow the task that already leads
+        self.mock_tasks.update_many.assert_called_once_with({'leader_id': self.leader_id, 'status': 'FOLLOWING'},
+                                                            {'$set': {'leader_id': new_leader_id}})
+
+    @patch('richarsi.blackboard.app.results_collection')
+    def test_deleting_completed_leader_keeps_released_followers_words(self, mock_results):
+        self.mock_tasks.find_one_and_delete.return_value = {'_id': self.leader_id}
+        # The released follower still points at the leader's results
+        self.mock_tasks.find_one.return_value = {'_id': self.follower_id}
+
+        response = self.app.delete(f'/tasks/{self.leader_id}')
+
+        self.assertEqual(response.status_code, 200)
+        self.mock_tasks.find_one_and_update.assert_not_called()
+        self.assertEqual(self.mock_tasks.find_one.call_args.args[0],
+                         {'$or': [{'_id': self.leader_id}, {'results_id': self.leader_id}]})
+        mock_results.delete_one.assert_not_called()
+
+    def test_follower_reports_leader_status(self):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        follower = {'_id': self.follower_id, 'status': 'FOLLOWING', 'leader_id': self.leader_id, 'lastUpdated': now}
+        leader = {'_id': self.leader_id, 'status': 'RUNNING', 'lastUpdated': now, 'scheduled_items_count': 2,
+                  'progress': {'fraction_sum': 1.0, 'prefixes_explored': 10, 'words_found': 3}}
+        self.mock_tasks.find_one.side_effect = lambda query_filter: {self.follower_id: follower,
+                                                                     self.leader_id: leader}[query_filter['_id']]
+
+        response = self.app.get(f'/status/{self.follower_id}')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['fraction_done'], 0.5)
+        self.assertEqual(response.get_json()['words_found'], 3)
+
+        # Once released the follower redirects to its own words
+        follower['status'] = 'COMPLETED'
+        response = self.app.get(f'/status/{self.follower_id}')
+        self.assertEqual(response.status_code, 303)
+        self.assertEqual(response.headers['Location'], f'/tasks/{self.follower_id}/words')
+
+    @patch('richarsi.blackboard.app.words_collection.find')
+    def test_follower_reads_leader_partial_words(self, mock_find):
+        self.mock_tasks.find_one.return_value = {'_id': self.follower_id, 'status': 'FOLLOWING', 'leader_id': self.leader_id}
+        mock_find.return_value = [{'_id': ObjectId('60bb4b001f3850f5c7b48c30'), 'word': 'listen'}]
+
+        response = self.app.get(f'/tasks/{self.follower_id}/words/partial')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['words'], ['listen'])
+        self.assertEqual(mock_find.call_args.args[0], {'task_id': self.leader_id})
+
+    def test_leader_finished_before_lookup(self):
+        self.mock_tasks.insert_one.side_effect = [DuplicateKeyError('letters_key_in_flight_unique'),
+                                                  MagicMock(inserted_id=self.follower_id)]
+        self.mock_tasks.find_one.return_value = None
+
+        response = self.app.post('/tasks', json={'letters': 'silent'})
+
+        # With no task in flight the new task leads
+        self.assertIn(f'/status/{self.follower_id}', response.headers['Location'])
+        self.assertTrue(self.mock_tasks.insert_one.call_args.args[0]['in_flight'])
+
+    @patch('richarsi.blackboard.app.results_collection')
+    def test_follower_shares_results(self, mock_results):
+        self.mock_tasks.find_one.return_value = {'_id': self.follower_id, 'status': 'COMPLETED', 'letters': 'silent',
+                                                 'results_id': self.leader_id}
+        mock_results.find_one.return_value = {'_id': self.leader_id, 'word_count': 2, 'lengths': [{'length': 6, 'count': 2}]}
+
+        results = _build_results(self.follower_id)
+
+        self.assertEqual(results['_id'], self.follower_id)
+        self.assertEqual(results['results_id'], self.leader_id)
+        self.assertEqual(results['task']['letters'], 'silent')
+        mock_results.replace_one.assert_called_once_with({'_id': self.follower_id}, results, upsert=True)
 
     def test_create_task_failure(self):
         """Test task creation failure due to missing letters."""
@@ -76,8 +365,10 @@ class TestManageTask(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.data.decode(), 'Task not found.')
 
+    @patch('richarsi.blackboard.app._build_results')
+    @patch('richarsi.blackboard.app.tasks_collection.update_many')
     @patch('richarsi.blackboard.app.tasks_collection.update_one')
-    def test_put_task_update_successful(self, mock_update_one):
+    def test_put_task_update_successful(self, mock_update_one, mock_update_many, mock_build_results):
         # Mock successful update
         mock_update_one.return_value.matched_count = 1
         
@@ -87,6 +378,71 @@ class TestManageTask(unittest.TestCase):
         )
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data.decode(), 'Task updated successfully.')
+        # Completing the task builds its results, and it is no longer in flight
+        mock_build_results.assert_called_once_with(ObjectId('6564bff6985caa24ef000001'))
+        self.assertEqual(mock_update_one.call_args.args[1]['$unset'], {'in_flight': ''})
+        # The tasks following it complete with it
+        query_filter, update = mock_update_many.call_args.args
+        self.assertEqual(query_filter, {'leader_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'FOLLOWING'})
+        self.assertEqual(update['$set']['status'], 'COMPLETED')
+        self.assertEqual(update['$set']['results_id'], ObjectId('6564bff6985caa24ef000001'))
+
+    @patch('richarsi.blackboard.app._build_results')
+    @patch('richarsi.blackboard.app.workitems_collection')
+    @patch('richarsi.blackboard.app.tasks_collection')
+    def test_put_task_scheduled_after_workitems_completed(self, mock_tasks, mock_workitems, mock_build_results):
+        # Every work item was claimed and completed while the task was still SCHEDULING
+        mock_tasks.update_one.return_value.matched_count = 1
+        mock_tasks.update_one.return_value.modified_count = 1
+        mock_workitems.find_one.return_value = {'_id': ObjectId('617e443bfc13ae4c668c3fda')}
+
+        response = self.app.put('/tasks/6564bff6985caa24ef000001', json={'status': 'SCHEDULED', 'scheduled_items_count': 2})
+
+        self.assertEqual(response.status_code, 200)
+        scheduled_call, running_call, complete_call = mock_tasks.update_one.call_args_list
+        self.assertEqual(scheduled_call.args[1]['$set']['scheduled_items_count'], 2)
+        self.assertEqual(running_call.args[0], {'_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'SCHEDULED'})
+        self.assertEqual(running_call.args[1]['$set']['status'], 'RUNNING')
+        # The task completes straight away rather than waiting for the watcher
+        self.assertEqual(complete_call.args[0]['$expr'], {'$gte': ['$completed_items_count', '$scheduled_items_count']})
+        self.assertEqual(complete_call.args[1]['$set']['status'], 'COMPLETED')
+        mock_build_results.assert_called_once_with(ObjectId('6564bff6985caa24ef000001'))
+
+    @patch('richarsi.blackboard.app.workitems_collection')
+    @patch('richarsi.blackboard.app.tasks_collection')
+    def test_put_task_scheduled_before_workitems_start(self, mock_tasks, mock_workitems):
+        mock_tasks.update_one.return_value.matched_count = 1
+        mock_workitems.find_one.return_value = None
+
+        response = self.app.put('/tasks/6564bff6985caa24ef000001', json={'status': 'SCHEDULED', 'scheduled_items_count': 2})
+
+        self.assertEqual(response.status_code, 200)
+        # Nothing has started, so the work items' transitions will move the task
+        mock_tasks.update_one.assert_called_once()
+
+    @patch('richarsi.blackboard.app.tasks_collection.update_many')
+    @patch('richarsi.blackboard.app.tasks_collection.update_one')
+    def test_put_task_failed_fails_followers(self, mock_update_one, mock_update_many):
+        mock_update_one.return_value.matched_count = 1
+
+        response = self.app.put('/tasks/6564bff6985caa24ef000001', json={'status': 'FAILED'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_update_one.call_args.args[1]['$unset'], {'in_flight': ''})
+        update = mock_update_many.call_args.args[1]
+        self.assertEqual(update['$set']['status'], 'FAILED')
+        self.assertNotIn('results_id', update['$set'])
+
+    @patch('richarsi.blackboard.app.tasks_collection.update_many')
+    @patch('richarsi.blackboard.app.tasks_collection.update_one')
+    def test_put_task_running_stays_in_flight(self, mock_update_one, mock_update_many):
+        mock_update_one.return_value.matched_count = 1
+
+        response = self.app.put('/tasks/6564bff6985caa24ef000001', json={'status': 'RUNNING'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('$unset', mock_update_one.call_args.args[1])
+        mock_update_many.assert_not_called()
 
     @patch('richarsi.blackboard.app.tasks_collection.update_one')
     def test_put_task_not_found(self, mock_update_one):
@@ -100,19 +456,62 @@ class TestManageTask(unittest.TestCase):
         self.assertEqual(response.status_code, 404)
         self.assertEqual(response.data.decode(), 'Task not found.')
 
-    @patch('richarsi.blackboard.app.tasks_collection.delete_one')
-    def test_delete_task_successful(self, mock_delete_one):
-        # Mock successful delete
-        mock_delete_one.return_value.deleted_count = 1
+    @patch('richarsi.blackboard.app.cache_collection.update_one')
+    @patch('richarsi.blackboard.app.results_collection.delete_one')
+    @patch('richarsi.blackboard.app.tasks_collection')
+    def test_delete_task_successful(self, mock_tasks, mock_delete_results, mock_update_cache):
+        # Mock successful delete of a task nothing points at
+        mock_tasks.find_one_and_delete.return_value = {'_id': ObjectId('6564bff6985caa24ef000001')}
+        mock_tasks.find_one.return_value = None
         
         response = self.app.delete('/tasks/6564bff6985caa24ef000001')
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data.decode(), 'Task deleted successfully.')
+        mock_delete_results.assert_called_once_with({'_id': ObjectId('6564bff6985caa24ef000001')})
+        self.assertEqual(mock_update_cache.call_args.args[0], {'results_id': ObjectId('6564bff6985caa24ef000001')})
+
+    @patch('richarsi.blackboard.app.cache_collection.update_one')
+    @patch('richarsi.blackboard.app.results_collection')
+    @patch('richarsi.blackboard.app.tasks_collection')
+    def test_delete_task_keeps_results_of_cache_hits(self, mock_tasks, mock_results, mock_update_cache):
+        source_id = ObjectId('6564bff6985caa24ef000001')
+        hit_id = ObjectId('6564bff6985caa24ef000002')
+        tasks = {source_id: {'_id': source_id},
+                 hit_id: {'_id': hit_id, 'results_id': source_id}}
+        results = {
+            source_id: {'_id': source_id, 'word_count': 2, 'lengths': [{'length': 3, 'count': 2}],
+                        'task': {'status': 'COMPLETED', 'letters': 'tign'}, 'words': [['gin', 'tin']]},
+            hit_id: {'_id': hit_id, 'word_count': 2, 'lengths': [{'length': 3, 'count': 2}],
+                     'task': {'status': 'COMPLETED', 'letters': 'ting'}, 'results_id': source_id},
+        }
+
+        def find_task(query_filter, projection=None):
+            return next((task for task in tasks.values()
+                         if any(task.get(field) == value for clause in query_filter['$or'] for field, value in clause.items())),
+                        None)
+
+        mock_tasks.find_one_and_delete.side_effect = lambda query_filter, projection: tasks.pop(query_filter['_id'], None)
+        mock_tasks.find_one.side_effect = find_task
+        mock_results.find_one.side_effect = lambda query_filter, projection=None: results.get(query_filter['_id'])
+        mock_results.delete_one.side_effect = lambda query_filter: results.pop(query_filter['_id'], None)
 
-    @patch('richarsi.blackboard.app.tasks_collection.delete_one')
+        response = self.app.delete(f'/tasks/{source_id}')
+        self.assertEqual(response.status_code, 200)
+
+        # The cache hit still reads the words it was answered with
+        response = self.app.get(f'/tasks/{hit_id}/words')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data.decode())['words'], ['gin', 'tin'])
+
+        # Deleting the last task pointing at the words deletes them too
+        response = self.app.delete(f'/tasks/{hit_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(results, {})
+
+    @patch('richarsi.blackboard.app.tasks_collection.find_one_and_delete')
     def test_delete_task_not_found(self, mock_delete_one):
         # Mock delete failed, task not found
-        mock_delete_one.return_value.deleted_count = 0
+        mock_delete_one.return_value = None
         
         response = self.app.delete('/tasks/6564bff6985caa24ef000002')
         self.assertEqual(response.status_code, 404)
@@ -162,6 +561,95 @@ class TestGetTaskStatus(unittest.TestCase):
         expected_data = {"lastUpdated": "2023-10-01T00:00:00"}
         self.assertEqual(response.json, expected_data)
 
+    @patch('richarsi.blackboard.app.tasks_collection.find_one')
+    def test_get_task_status_with_progress(self, mock_find_one):
+        mock_find_one.return_value = {
+            '_id': ObjectId('6564bff6985caa24ef000002'),
+            'status': 'RUNNING',
+            'scheduled_items_count': 4,
+            'progress': {'prefixes_explored': 120, 'words_found': 7, 'fraction_sum': 1.5},
+            'lastUpdated': datetime.datetime(2023, 10, 1, 0, 0, 0)
+        }
+
+        response = self.app.get('/status/6564bff6985caa24ef000002')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {"lastUpdated": "2023-10-01T00:00:00", "prefixes_explored": 120,
+                                         "words_found": 7, "fraction_done": 0.375})
+
+    @patch('richarsi.blackboard.app.tasks_collection.find_one')
+    def test_get_task_status_changed_since(self, mock_find_one):
+        # The client's copy is out of date so the request does not wait
+        mock_find_one.return_value = {'_id': ObjectId('6564bff6985caa24ef000002'), 'status': 'RUNNING',
+                                      'lastUpdated': datetime.datetime(2023, 10, 1, 0, 0, 5)}
+
+        started = time.monotonic()
+        response = self.app.get('/status/6564bff6985caa24ef000002?wait=10&since=2023-10-01T00:00:00')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {"lastUpdated": "2023-10-01T00:00:05"})
+        self.assertLess(time.monotonic() - started, 5)
+        mock_find_one.assert_called_once()
+
+    @patch('richarsi.blackboard.app.tasks_collection.find_one')
+    def test_get_task_status_waits_for_change(self, mock_find_one):
+        mock_find_one.side_effect = [
+            {'_id': ObjectId('6564bff6985caa24ef000002'), 'status': 'RUNNING', 'lastUpdated': datetime.datetime(2023, 10, 1, 0, 0, 0)},
+            {'_id': ObjectId('6564bff6985caa24ef000002'), 'status': 'RUNNING', 'lastUpdated': datetime.datetime(2023, 10, 1, 0, 0, 5)}
+        ]
+
+        # Another request changes the task while this one waits
+        def _change():
+            while not task_notifier.listeners():
+                time.sleep(0.01)
+            task_notifier.notify('6564bff6985caa24ef000002')
+        changer = threading.Thread(target=_change)
+        changer.start()
+
+        started = time.monotonic()
+        response = self.app.get('/status/6564bff6985caa24ef000002?wait=10&since=2023-10-01T00:00:00')
+        changer.join()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {"lastUpdated": "2023-10-01T00:00:05"})
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(mock_find_one.call_count, 2)
+        self.assertEqual(task_notifier.listeners(), 0)
+
+    @patch('richarsi.blackboard.app.tasks_collection.find_one')
+    def test_get_task_status_wait_times_out(self, mock_find_one):
+        mock_find_one.return_value = {'_id': ObjectId('6564bff6985caa24ef000002'), 'status': 'RUNNING',
+                                      'lastUpdated': datetime.datetime(2023, 10, 1, 0, 0, 0)}
+
+        response = self.app.get('/status/6564bff6985caa24ef000002?wait=0.1&since=2023-10-01T00:00:00')
+
+        # The unchanged status is returned without querying the database again
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {"lastUpdated": "2023-10-01T00:00:00"})
+        mock_find_one.assert_called_once()
+
+    @patch('richarsi.blackboard.app.tasks_collection.find_one')
+    def test_get_task_status_invalid_wait(self, mock_find_one):
+        for wait in ('-1', 'soon'):
+            with self.subTest(wait=wait):
+                response = self.app.get(f'/status/6564bff6985caa24ef000002?wait={wait}&since=2023-10-01T00:00:00')
+                self.assertEqual(response.status_code, 400)
+        mock_find_one.assert_not_called()
+
+    @patch('richarsi.blackboard.app.tasks_collection.find_one')
+    def test_get_task_status_found_failed(self, mock_find_one):
+        # Mock find_one to return a task whose work items were parked
+        mock_find_one.return_value = {
+            '_id': ObjectId('6564bff6985caa24ef000002'),
+            'status': 'FAILED',
+            'lastUpdated': datetime.datetime(2023, 10, 1, 0, 0, 0)
+        }
+
+        response = self.app.get('/status/6564bff6985caa24ef000002')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {"status": "FAILED", "lastUpdated": "2023-10-01T00:00:00"})
+
     @patch('richarsi.blackboard.app.tasks_collection.find_one')
     def test_get_task_status_not_found(self, mock_find_one):
         # Mock find_one to return None
@@ -233,6 +721,42 @@ class TestGetTasksByStatus(unittest.TestCase):
         self.assertEqual(response.status_code, 404)
         self.assertIn('Nothing found.', response.data.decode())
 
+    @patch('richarsi.blackboard.app.tasks_collection.find')
+    def test_get_tasks_page(self, mock_find):
+        mock_find.return_value = [
+            {'_id': ObjectId('6564bff6985caa24ef000003'), 'letters': 'abc'},
+            {'_id': ObjectId('6564bff6985caa24ef000004'), 'letters': 'def'}
+        ]
+
+        response = self.app.get('/tasks?status=NEW&limit=2&after=6564bff6985caa24ef000002&fields=letters')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, [{'_id': '6564bff6985caa24ef000003', 'letters': 'abc'},
+                                         {'_id': '6564bff6985caa24ef000004', 'letters': 'def'}])
+        query_filter, projection = mock_find.call_args.args
+        self.assertEqual(query_filter, {'status': 'NEW', '_id': {'$gt': ObjectId('6564bff6985caa24ef000002')}})
+        self.assertEqual(projection, {'letters': 1})
+        self.assertEqual(mock_find.call_args.kwargs, {'sort': [('_id', 1)], 'limit': 2})
+
+    @patch('richarsi.blackboard.app.tasks_collection')
+    def test_get_tasks_count_only(self, mock_collection):
+        mock_collection.count_documents.return_value = 7
+
+        response = self.app.get('/tasks?status=RUNNING&count_only=true')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {'count': 7})
+        mock_collection.count_documents.assert_called_once_with({'status': 'RUNNING'})
+        mock_collection.find.assert_not_called()
+
+    @patch('richarsi.blackboard.app.tasks_collection.find')
+    def test_get_tasks_invalid_page(self, mock_find):
+        for query in ('limit=0', 'limit=ten', 'after=not-an-id', 'fields=,letters', 'fields=$where'):
+            with self.subTest(query=query):
+                response = self.app.get(f'/tasks?{query}')
+                self.assertEqual(response.status_code, 400)
+        mock_find.assert_not_called()
+
     @patch('richarsi.blackboard.app.tasks_collection.find')
     def test_get_tasks_exception(self, mock_find):
         # Mock find to raise an exception
@@ -243,6 +767,56 @@ class TestGetTasksByStatus(unittest.TestCase):
         self.assertEqual(response.status_code, 500)
         self.assertIn('Database error', response.data.decode())
 
+class TestGetTaskSummaries(unittest.TestCase):
+
+    def setUp(self):
+        self.app = app.test_client()
+        self.app.testing = True
+
+    @patch('richarsi.blackboard.app.tasks_collection.aggregate')
+    def test_get_task_summaries(self, mock_aggregate):
+        mock_aggregate.return_value = [
+            {'_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'RUNNING', 'scheduled_items_count': 3,
+             'workitems': {'COMPLETED': 2, 'RUNNING': 1}}
+        ]
+
+        response = self.app.get('/tasks/summary?status=SCHEDULED,RUNNING')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, [{'_id': '6564bff6985caa24ef000001', 'status': 'RUNNING', 'scheduled_items_count': 3,
+                                          'workitems': {'COMPLETED': 2, 'RUNNING': 1}}])
+
+        # One aggregation matches the tasks and counts their work items
+        pipeline = mock_aggregate.call_args.args[0]
+        self.assertEqual(pipeline[0], {'$match': {'status': {'$in': ['SCHEDULED', 'RUNNING']}}})
+        lookup = next(stage['$lookup'] for stage in pipeline if '$lookup' in stage)
+        self.assertEqual((lookup['localField'], lookup['foreignField']), ('_id', 'task_id'))
+
+    @patch('richarsi.blackboard.app.tasks_collection.aggregate')
+    def test_get_task_summaries_of_every_task(self, mock_aggregate):
+        mock_aggregate.return_value = [{'_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'NEW', 'workitems': {}}]
+
+        response = self.app.get('/tasks/summary')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('$match', mock_aggregate.call_args.args[0][0])
+
+    @patch('richarsi.blackboard.app.tasks_collection.aggregate')
+    def test_get_task_summaries_not_found(self, mock_aggregate):
+        mock_aggregate.return_value = []
+
+        response = self.app.get('/tasks/summary?status=RUNNING')
+
+        self.assertEqual(response.status_code, 404)
+
+    @patch('richarsi.blackboard.app.tasks_collection.aggregate')
+    def test_get_task_summaries_invalid_status(self, mock_aggregate):
+        response = self.app.get('/tasks/summary?status=RUNNING,BOGUS')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Invalid status "BOGUS"', response.data.decode())
+        mock_aggregate.assert_not_called()
+
 class TestAddWordToTask(unittest.TestCase):
 
     def setUp(self):
@@ -266,6 +840,74 @@ class TestAddWordToTask(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn('Word added successfully', response.data.decode())
 
+    @patch('richarsi.blackboard.app.tasks_collection.find_one')
+    @patch('richarsi.blackboard.app.words_collection.insert_many')
+    def test_add_words_to_task_success(self, mock_insert_many, mock_find_one):
+        mock_find_one.return_value = {'_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'RUNNING'}
+
+        response = self.app.post(
+            '/tasks/6564bff6985caa24ef000001/words',
+            json={'words': ['bad', 'bade']}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('2 words added successfully', response.data.decode())
+        # The task is looked up once and the words are written in one unordered batch
+        mock_find_one.assert_called_once()
+        mock_insert_many.assert_called_once_with([
+            {'task_id': ObjectId('6564bff6985caa24ef000001'), 'word': 'bad', 'length': 3},
+            {'task_id': ObjectId('6564bff6985caa24ef000001'), 'word': 'bade', 'length': 4}
+        ], ordered=False)
+
+    @patch('richarsi.blackboard.app.tasks_collection.find_one')
+    @patch('richarsi.blackboard.app.words_collection.insert_many')
+    def test_add_empty_words_to_task(self, mock_insert_many, mock_find_one):
+        mock_find_one.return_value = {'_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'RUNNING'}
+
+        response = self.app.post('/tasks/6564bff6985caa24ef000001/words', json={'words': []})
+
+        self.assertEqual(response.status_code, 200)
+        mock_insert_many.assert_not_called()
+
+    @patch('richarsi.blackboard.app.tasks_collection.find_one')
+    def test_add_words_invalid(self, mock_find_one):
+        response = self.app.post('/tasks/6564bff6985caa24ef000001/words', json={'words': 'bad'})
+
+        self.assertEqual(response.status_code, 400)
+        mock_find_one.assert_not_called()
+
+    @patch('richarsi.blackboard.app.tasks_collection.find_one')
+    @patch('richarsi.blackboard.app.words_collection.insert_many')
+    def test_add_words_skips_duplicates(self, mock_insert_many, mock_find_one):
+        mock_find_one.return_value = {'_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'RUNNING'}
+        # 'bad' was added by an earlier attempt at the same workitem
+        mock_insert_many.side_effect = BulkWriteError({'writeErrors': [{'index': 0, 'code': 11000}], 'nInserted': 1})
+
+        response = self.app.post('/tasks/6564bff6985caa24ef000001/words', json={'words': ['bad', 'bade']})
+
+        self.assertEqual(response.status_code, 200)
+
+    @patch('richarsi.blackboard.app.tasks_collection.find_one')
+    @patch('richarsi.blackboard.app.words_collection.insert_many')
+    def test_add_words_other_write_errors(self, mock_insert_many, mock_find_one):
+        mock_find_one.return_value = {'_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'RUNNING'}
+        mock_insert_many.side_effect = BulkWriteError({'writeErrors': [{'index': 0, 'code': 121}], 'nInserted': 1})
+
+        response = self.app.post('/tasks/6564bff6985caa24ef000001/words', json={'words': ['bad', 'bade']})
+
+        self.assertEqual(response.status_code, 500)
+
+    @patch('richarsi.blackboard.app.tasks_collection.find_one')
+    @patch('richarsi.blackboard.app.words_collection.insert_one')
+    def test_add_duplicate_word(self, mock_insert_one, mock_find_one):
+        mock_find_one.return_value = {'_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'RUNNING'}
+        mock_insert_one.side_effect = DuplicateKeyError('E11000 duplicate key error')
+
+        response = self.app.post('/tasks/6564bff6985caa24ef000001/words', json={'word': 'bad'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Word already added.', response.data.decode())
+
     @patch('richarsi.blackboard.app.tasks_collection.find_one')
     def test_add_word_to_non_existent_task(self, mock_find_one):
         # Mock not finding the task
@@ -328,48 +970,218 @@ class TestGetWordsForTask(unittest.TestCase):
         # Setup the Flask test client for testing
         self.app = app.test_client()
         self.app.testing = True
-
-    @patch('richarsi.blackboard.app.tasks_collection.aggregate')
-    def test_get_words_for_completed_task_success(self, mock_aggregate):
-        # Mock a successful task retrieval with words
-        mock_aggregate.return_value = [{
+        self.results = {
             "_id": ObjectId('6564bff6985caa24ef000001'),
-            "status": 'COMPLETED',
-            "letters": 'testing',
-            "lastUpdated": datetime.datetime(2023, 10, 1, 0, 0, 0), # Example timestamp
-            "started": datetime.datetime(2023, 10, 1, 0, 0, 0), # Example timestamp
-            "completed": datetime.datetime(2023, 10, 1, 0, 0, 0), # Example timestamp
-            "words": [ 'word1', 'word2' ]
-        }]
+            "task": {
+                "status": 'COMPLETED',
+                "letters": 'testing',
+                "lastUpdated": datetime.datetime(2023, 10, 1, 0, 0, 0), # Example timestamp
+                "started": datetime.datetime(2023, 10, 1, 0, 0, 0), # Example timestamp
+                "completed": datetime.datetime(2023, 10, 1, 0, 0, 0) # Example timestamp
+            },
+            "word_count": 4,
+            "lengths": [{'length': 3, 'count': 2}, {'length': 5, 'count': 2}],
+            "words": [['gin', 'tin'], ['sting', 'tings']]
+        }
+
+    @patch('richarsi.blackboard.app.results_collection.find_one')
+    def test_get_words_for_completed_task_success(self, mock_find_one):
+        # Mock a successful read of the task's results
+        mock_find_one.return_value = self.results
+
         response = self.app.get('/tasks/6564bff6985caa24ef000001/words')
 
         self.assertEqual(response.status_code, 200)
         
         data = json.loads(response.data.decode())
+        self.assertEqual(data['_id'], '6564bff6985caa24ef000001')
         self.assertEqual(data['status'], 'COMPLETED')
-        self.assertIn('word1', data['words'])
-        self.assertIn('word2', data['words'])
+        self.assertEqual(data['counts'], {'3': 2, '5': 2})
+        # Alphabetical order by default
+        self.assertEqual(data['words'], ['gin', 'sting', 'tin', 'tings'])
+        mock_find_one.assert_called_once_with({'_id': ObjectId('6564bff6985caa24ef000001')})
 
-    @patch('richarsi.blackboard.app.tasks_collection.aggregate')
-    def test_get_words_for_non_existent_task(self, mock_aggregate):
-        # Mock no tasks found
-        mock_aggregate.return_value = []
+    @patch('richarsi.blackboard.app.results_collection.find_one')
+    def test_get_compressed_words_as_ndjson_by_length(self, mock_find_one):
+        self.results['words'] = Binary(zlib.compress(json.dumps(self.results['words']).encode()))
+        mock_find_one.return_value = self.results
+
+        response = self.app.get('/tasks/6564bff6985caa24ef000001/words?format=ndjson&sort=length')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual(lines[0]['letters'], 'testing')
+        self.assertEqual(lines[1:], ['gin', 'tin', 'sting', 'tings'])
+
+    @patch('richarsi.blackboard.app._build_results')
+    @patch('richarsi.blackboard.app.results_collection.find_one')
+    def test_get_words_builds_missing_results(self, mock_find_one, mock_build_results):
+        # A task that completed before its results were kept
+        mock_find_one.return_value = None
+        mock_build_results.return_value = self.results
+
+        response = self.app.get('/tasks/6564bff6985caa24ef000001/words')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data.decode())['words'], ['gin', 'sting', 'tin', 'tings'])
+        mock_build_results.assert_called_once_with(ObjectId('6564bff6985caa24ef000001'))
+
+    @patch('richarsi.blackboard.app.results_collection.find_one')
+    def test_get_words_for_task_answered_from_cache(self, mock_find_one):
+        words = self.results.pop('words')
+        self.results['results_id'] = ObjectId('6564bff6985caa24ef000009')
+        mock_find_one.side_effect = [self.results, {'_id': ObjectId('6564bff6985caa24ef000009'), 'words': words}]
+
+        response = self.app.get('/tasks/6564bff6985caa24ef000001/words')
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data.decode())
+        self.assertEqual(data['_id'], '6564bff6985caa24ef000001')
+        self.assertEqual(data['words'], ['gin', 'sting', 'tin', 'tings'])
+        self.assertNotIn('results_id', data)
+        self.assertEqual(mock_find_one.call_args.args, ({'_id': ObjectId('6564bff6985caa24ef000009')}, {'words': 1}))
+
+    def test_get_words_invalid_parameters(self):
+        for query in ('sort=random', 'format=xml'):
+            with self.subTest(query=query):
+                response = self.app.get(f'/tasks/6564bff6985caa24ef000001/words?{query}')
+                self.assertEqual(response.status_code, 400)
+
+    @patch('richarsi.blackboard.app._build_results')
+    @patch('richarsi.blackboard.app.results_collection.find_one')
+    def test_get_words_for_non_existent_task(self, mock_find_one, mock_build_results):
+        # Mock no results and no completed task to build them from
+        mock_find_one.return_value = None
+        mock_build_results.return_value = None
 
         response = self.app.get('/tasks/6564bff6985caa24ef000002/words')
 
         self.assertEqual(response.status_code, 404)
         self.assertIn('No completed task found with the given ID.', response.data.decode())
 
-    @patch('richarsi.blackboard.app.tasks_collection.aggregate')
-    def test_get_words_for_task_exception(self, mock_aggregate):
-        # Mock an exception during aggregation
-        mock_aggregate.side_effect = Exception('Database error')
+    @patch('richarsi.blackboard.app.results_collection.find_one')
+    def test_get_words_for_task_exception(self, mock_find_one):
+        # Mock an exception while reading the results
+        mock_find_one.side_effect = Exception('Database error')
 
         response = self.app.get('/tasks/6564bff6985caa24ef000003/words')
 
         self.assertEqual(response.status_code, 500)
         self.assertIn('Database error', response.data.decode())
 
+
+class TestBuildResults(unittest.TestCase):
+
+    def setUp(self):
+        self.task_id = ObjectId('6564bff6985caa24ef000001')
+        patchers = [patch(f'richarsi.blackboard.app.{name}')
+                    for name in ('tasks_collection', 'words_collection', 'results_collection', 'cache_collection')]
+        self.mock_tasks, self.mock_words, self.mock_results, self.mock_cache = [patcher.start() for patcher in patchers]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+        self.mock_tasks.find_one.return_value = {'_id': self.task_id, 'status': 'COMPLETED', 'letters': 'testing',
+                                                 'started': datetime.datetime(2023, 10, 1, 0, 0, 0),
+                                                 'completed': datetime.datetime(2023, 10, 1, 0, 0, 30)}
+
+    def test_groups_words_by_length(self):
+        self.mock_words.find.return_value = [{'word': 'gin'}, {'word': 'tin'}, {'word': 'tin'}, {'word': 'sting'}]
+
+        results = _build_results(self.task_id)
+
+        # The words are read in length order and any duplicates dropped
+        self.assertEqual(self.mock_words.find.call_args.kwargs['sort'], [('length', 1), ('word', 1)])
+        self.assertEqual(results['task']['letters'], 'testing')
+        self.assertEqual(results['word_count'], 3)
+        self.assertEqual(results['lengths'], [{'length': 3, 'count': 2}, {'length': 5, 'count': 1}])
+        self.assertEqual(results['words'], [['gin', 'tin'], ['sting']])
+        self.mock_results.replace_one.assert_called_once_with({'_id': self.task_id}, results, upsert=True)
+
+        # Later tasks for an anagram of the letters are answered from the results
+        self.mock_cache.update_one.assert_called_once_with(
+            {'_id': 'eginstt'}, {'$set': {'results_id': self.task_id, 'compute_seconds': 30.0}}, upsert=True)
+
+        # The word documents expire now the results are kept
+        query_filter, update = self.mock_words.update_many.call_args.args
+        self.assertEqual(query_filter, {'task_id': self.task_id})
+        self.assertIn('expireAt', update['$set'])
+
+    @patch('richarsi.blackboard.app.RESULTS_COMPRESS_BYTES', 10)
+    def test_compresses_large_results(self):
+        self.mock_words.find.return_value = [{'word': 'gin'}, {'word': 'tin'}, {'word': 'sting'}]
+
+        results = _build_results(self.task_id)
+
+        self.assertIsInstance(results['words'], Binary)
+        self.assertEqual(json.loads(zlib.decompress(results['words'])), [['gin', 'tin'], ['sting']])
+
+    def test_task_not_completed(self):
+        self.mock_tasks.find_one.return_value = None
+
+        self.assertIsNone(_build_results(self.task_id))
+        self.mock_results.replace_one.assert_not_called()
+        self.mock_words.update_many.assert_not_called()
+
+    def test_failure_leaves_the_words(self):
+        self.mock_words.find.return_value = [{'word': 'gin'}]
+        self.mock_results.replace_one.side_effect = Exception('Database error')
+
+        self.assertIsNone(_build_results(self.task_id))
+        self.mock_words.update_many.assert_not_called()
+
+class TestGetPartialWordsForTask(unittest.TestCase):
+
+    def setUp(self):
+        # Setup the Flask test client for testing
+        self.app = app.test_client()
+        self.app.testing = True
+
+    @patch('richarsi.blackboard.app.words_collection.find')
+    @patch('richarsi.blackboard.app.tasks_collection.find_one')
+    def test_first_page(self, mock_find_one, mock_find):
+        mock_find_one.return_value = {'_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'RUNNING'}
+        mock_find.return_value = [
+            {'_id': ObjectId('6564bff6985caa24ef000101'), 'word': 'tin'},
+            {'_id': ObjectId('6564bff6985caa24ef000102'), 'word': 'sting'}
+        ]
+
+        response = self.app.get('/tasks/6564bff6985caa24ef000001/words/partial')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'status': 'RUNNING', 'words': ['tin', 'sting'],
+                                               'cursor': '6564bff6985caa24ef000102'})
+        mock_find.assert_called_once_with({'task_id': ObjectId('6564bff6985caa24ef000001')}, {'word': 1},
+                                          sort=[('_id', 1)], limit=1000)
+
+    @patch('richarsi.blackboard.app.words_collection.find')
+    @patch('richarsi.blackboard.app.tasks_collection.find_one')
+    def test_after_cursor(self, mock_find_one, mock_find):
+        mock_find_one.return_value = {'_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'RUNNING'}
+        mock_find.return_value = []
+
+        response = self.app.get('/tasks/6564bff6985caa24ef000001/words/partial?after=6564bff6985caa24ef000102&limit=5000')
+
+        # No new words leaves the cursor where it was
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'status': 'RUNNING', 'words': [], 'cursor': '6564bff6985caa24ef000102'})
+        mock_find.assert_called_once_with({'task_id': ObjectId('6564bff6985caa24ef000001'),
+                                           '_id': {'$gt': ObjectId('6564bff6985caa24ef000102')}}, {'word': 1},
+                                          sort=[('_id', 1)], limit=1000)
+
+    def test_invalid_parameters(self):
+        for query in ('limit=0', 'limit=ten', 'after=nonsense'):
+            with self.subTest(query=query):
+                response = self.app.get(f'/tasks/6564bff6985caa24ef000001/words/partial?{query}')
+                self.assertEqual(response.status_code, 400)
+
+    @patch('richarsi.blackboard.app.tasks_collection.find_one')
+    def test_non_existent_task(self, mock_find_one):
+        mock_find_one.return_value = None
+
+        response = self.app.get('/tasks/6564bff6985caa24ef000001/words/partial')
+
+        self.assertEqual(response.status_code, 404)
+
 class AddWorkitemsTestCase(unittest.TestCase):
     def setUp(self):
         # Set up a Flask test client
@@ -530,6 +1342,18 @@ class GetWorkItemsByStatusTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 404)
         self.assertIn(b'Nothing found.', response.data)
 
+    @patch('richarsi.blackboard.app.workitems_collection.find')
+    def test_get_workitems_page(self, mock_find):
+        mock_find.return_value = [{'_id': ObjectId('617e443bfc13ae4c668c3fda'), 'task_id': ObjectId('6564bff6985caa24ef000001'),
+                                   'status': 'NEW'}]
+
+        response = self.app.get('/workitems?status=NEW&limit=1&fields=task_id,status')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, [{'_id': '617e443bfc13ae4c668c3fda', 'task_id': '6564bff6985caa24ef000001', 'status': 'NEW'}])
+        self.assertEqual(mock_find.call_args.args, ({'status': 'NEW'}, {'task_id': 1, 'status': 1}))
+        self.assertEqual(mock_find.call_args.kwargs['limit'], 1)
+
     @patch('richarsi.blackboard.app.workitems_collection.find')
     def test_get_workitems_exception_handling(self, mock_find):
         # Force an exception
@@ -540,16 +1364,334 @@ class GetWorkItemsByStatusTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 500)
         self.assertIn(b'Database error', response.data)
 
+class TestClaimWorkitems(unittest.TestCase):
+
+    def setUp(self):
+        self.app = app.test_client()
+        self.app.testing = True
+
+    @patch('richarsi.blackboard.app.tasks_collection')
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_claim_workitems_success(self, mock_collection, mock_tasks):
+        # Two work items are available, so a request for three claims two
+        mock_collection.find_one_and_update.side_effect = [
+            {'_id': ObjectId('617e443bfc13ae4c668c3fda'), 'task_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'RUNNING', 'owner': 'consumer-1'},
+            {'_id': ObjectId('617e443bfc13ae4c668c3fdb'), 'task_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'RUNNING', 'owner': 'consumer-1',
+             'parent_id': ObjectId('617e443bfc13ae4c668c3fd9')},
+            None
+        ]
+
+        response = self.app.post('/workitems/claim', json={'owner': 'consumer-1', 'limit': 3, 'lease_seconds': 30,
+                                                           'task_id': '6564bff6985caa24ef000001', 'min_priority': 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['_id'] for item in response.json], ['617e443bfc13ae4c668c3fda', '617e443bfc13ae4c668c3fdb'])
+        self.assertEqual(mock_collection.find_one_and_update.call_count, 3)
+
+        query_filter, update = mock_collection.find_one_and_update.call_args.args
+        self.assertEqual(query_filter, {'status': 'NEW', 'task_id': ObjectId('6564bff6985caa24ef000001'), 'priority': {'$gte': 2}})
+        self.assertEqual(update['$set']['owner'], 'consumer-1')
+        self.assertEqual(update['$set']['status'], 'RUNNING')
+        self.assertEqual(update['$set']['leaseExpires'] - update['$set']['started'], datetime.timedelta(seconds=30))
+        self.assertEqual(update['$inc'], {'attempts': 1})
+
+        # Claiming a work item starts its task if it has not started yet
+        query_filter, update = mock_tasks.update_one.call_args.args
+        self.assertEqual(query_filter, {'_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'SCHEDULED'})
+        self.assertEqual(update['$set']['status'], 'RUNNING')
+
+    @patch('richarsi.blackboard.app.signals_collection')
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_claim_workitems_nothing_to_claim(self, mock_collection, mock_signals):
+        mock_collection.find_one_and_update.return_value = None
+
+        response = self.app.post('/workitems/claim', json={'owner': 'consumer-1'})
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(mock_collection.find_one_and_update.call_count, 1)
+
+        # The idle consumer is recorded as demand for work
+        query_filter, update = mock_signals.update_one.call_args.args
+        self.assertEqual(query_filter, {'_id': 'demand'})
+        self.assertIn('requested', update['$set'])
+        self.assertTrue(mock_signals.update_one.call_args.kwargs['upsert'])
+
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_claim_workitems_requires_owner(self, mock_collection):
+        response = self.app.post('/workitems/claim', json={'limit': 1})
+
+        self.assertEqual(response.status_code, 400)
+        mock_collection.find_one_and_update.assert_not_called()
+
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_claim_workitems_invalid_limit(self, mock_collection):
+        response = self.app.post('/workitems/claim', json={'owner': 'consumer-1', 'limit': 0})
+
+        self.assertEqual(response.status_code, 400)
+        mock_collection.find_one_and_update.assert_not_called()
+
+class TestWorkitemLeases(unittest.TestCase):
+
+    def setUp(self):
+        self.app = app.test_client()
+        self.app.testing = True
+
+    @patch('richarsi.blackboard.app.signals_collection')
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_extend_lease(self, mock_collection, mock_signals):
+        mock_collection.update_one.return_value.matched_count = 1
+
+        response = self.app.put('/workitems/617e443bfc13ae4c668c3fda/lease', json={'owner': 'consumer-1', 'lease_seconds': 30})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['split'], False)
+        mock_signals.find_one_and_update.assert_not_called()
+        query_filter, update = mock_collection.update_one.call_args.args
+        self.assertEqual(query_filter, {'_id': ObjectId('617e443bfc13ae4c668c3fda'), 'status': 'RUNNING', 'owner': 'consumer-1'})
+        self.assertIn('leaseExpires', update['$set'])
+
+    @patch('richarsi.blackboard.app.signals_collection')
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_extend_lease_asks_for_split_on_demand(self, mock_collection, mock_signals):
+        mock_collection.update_one.return_value.matched_count = 1
+        mock_signals.find_one_and_update.return_value = {'_id': 'demand'}
+
+        response = self.app.put('/workitems/617e443bfc13ae4c668c3fda/lease', json={'owner': 'consumer-1', 'can_split': True})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['split'], True)
+
+        # The demand is taken so that only one consumer splits its work item
+        query_filter, update = mock_signals.find_one_and_update.call_args.args
+        self.assertEqual(query_filter['_id'], 'demand')
+        self.assertIn('$gte', query_filter['requested'])
+        self.assertEqual(update, {'$unset': {'requested': ''}})
+
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_extend_lease_lost(self, mock_collection):
+        # The work item was requeued and claimed by another consumer
+        mock_collection.update_one.return_value.matched_count = 0
+
+        response = self.app.put('/workitems/617e443bfc13ae4c668c3fda/lease', json={'owner': 'consumer-1'})
+
+        self.assertEqual(response.status_code, 409)
+
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_extend_lease_requires_owner(self, mock_collection):
+        response = self.app.put('/workitems/617e443bfc13ae4c668c3fda/lease', json={})
+
+        self.assertEqual(response.status_code, 400)
+        mock_collection.update_one.assert_not_called()
+
+    @patch('richarsi.blackboard.app.tasks_collection')
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_report_progress(self, mock_workitems, mock_tasks):
+        # The previous report had explored 10 prefixes and found 1 word
+        mock_workitems.find_one_and_update.return_value = {
+            '_id': ObjectId('617e443bfc13ae4c668c3fda'), 'task_id': ObjectId('6564bff6985caa24ef000001'),
+            'progress': {'prefixes_explored': 10, 'words_found': 1, 'fraction_done': 0.25}
+        }
+
+        response = self.app.put('/workitems/617e443bfc13ae4c668c3fda/progress',
+                                json={'prefixes_explored': 30, 'words_found': 4, 'fraction_done': 0.75})
+
+        self.assertEqual(response.status_code, 200)
+        update = mock_workitems.find_one_and_update.call_args.args[1]
+        self.assertEqual(update['$set']['progress.prefixes_explored'], 30)
+        self.assertEqual(update['$set']['progress.fraction_done'], 0.75)
+
+        query_filter, task_update = mock_tasks.update_one.call_args.args
+        self.assertEqual(query_filter, {'_id': ObjectId('6564bff6985caa24ef000001')})
+        self.assertEqual(task_update['$inc'], {'progress.prefixes_explored': 20, 'progress.words_found': 3,
+                                               'progress.fraction_sum': 0.5})
+        self.assertIn('lastUpdated', task_update['$set'])
+
+    @patch('richarsi.blackboard.app.tasks_collection')
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_report_progress_workitem_not_found(self, mock_workitems, mock_tasks):
+        mock_workitems.find_one_and_update.return_value = None
+
+        response = self.app.put('/workitems/617e443bfc13ae4c668c3fda/progress',
+                                json={'prefixes_explored': 30, 'words_found': 4, 'fraction_done': 0.75})
+
+        self.assertEqual(response.status_code, 404)
+        mock_tasks.update_one.assert_not_called()
+
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_report_progress_invalid(self, mock_workitems):
+        response = self.app.put('/workitems/617e443bfc13ae4c668c3fda/progress', json={'words_found': 4})
+
+        self.assertEqual(response.status_code, 400)
+        mock_workitems.find_one_and_update.assert_not_called()
+
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_checkpoint_workitem(self, mock_collection):
+        mock_collection.update_one.return_value.matched_count = 1
+
+        response = self.app.put('/workitems/617e443bfc13ae4c668c3fda/checkpoint', json={'owner': 'consumer-1', 'cursor': 'ead'})
+
+        self.assertEqual(response.status_code, 200)
+        query_filter, update = mock_collection.update_one.call_args.args
+        self.assertEqual(query_filter, {'_id': ObjectId('617e443bfc13ae4c668c3fda'), 'status': 'RUNNING', 'owner': 'consumer-1'})
+        self.assertEqual(update['$set']['cursor'], 'ead')
+
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_checkpoint_workitem_lease_lost(self, mock_collection):
+        mock_collection.update_one.return_value.matched_count = 0
+
+        response = self.app.put('/workitems/617e443bfc13ae4c668c3fda/checkpoint', json={'owner': 'consumer-1', 'cursor': 'ead'})
+
+        self.assertEqual(response.status_code, 409)
+
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_checkpoint_workitem_requires_cursor(self, mock_collection):
+        response = self.app.put('/workitems/617e443bfc13ae4c668c3fda/checkpoint', json={'owner': 'consumer-1'})
+
+        self.assertEqual(response.status_code, 400)
+        mock_collection.update_one.assert_not_called()
+
+    @patch('richarsi.blackboard.app.tasks_collection')
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_split_workitem(self, mock_workitems, mock_tasks):
+        mock_workitems.find_one.return_value = {
+            '_id': ObjectId('617e443bfc13ae4c668c3fda'), 'task_id': ObjectId('6564bff6985caa24ef000001'), 'priority': 40
+        }
+        mock_workitems.insert_many.return_value.inserted_ids = [ObjectId('617e443bfc13ae4c668c3fdb'),
+                                                                ObjectId('617e443bfc13ae4c668c3fdc')]
+        calls = []
+        mock_tasks.update_one.side_effect = lambda *args: calls.append('count')
+        mock_workitems.insert_many.side_effect = lambda *args: calls.append('insert') or mock_workitems.insert_many.return_value
+
+        response = self.app.post('/workitems/617e443bfc13ae4c668c3fda/split', json={
+            'owner': 'consumer-1',
+            'workitems': [{'current_sequence': 'rel', 'remaining_elements': 'ad', 'prefix_from': 3},
+                          {'current_sequence': 'red', 'remaining_elements': 'al', 'prefix_from': 3}],
+            'donated': ['l', 'd']
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['workitem_ids'], ['617e443bfc13ae4c668c3fdb', '617e443bfc13ae4c668c3fdc'])
+
+        records = mock_workitems.insert_many.call_args.args[0]
+        self.assertEqual([record['current_sequence'] for record in records], ['rel', 'red'])
+        self.assertTrue(all(record['status'] == 'NEW' for record in records))
+        self.assertTrue(all(record['task_id'] == ObjectId('6564bff6985caa24ef000001') for record in records))
+        self.assertTrue(all(record['priority'] == 40 for record in records))
+
+        # The task expects two more work items before they can be claimed, and the parent skips the donated sequences
+        self.assertEqual(calls, ['count', 'insert'])
+        query_filter, task_update = mock_tasks.update_one.call_args.args
+        self.assertEqual(query_filter, {'_id': ObjectId('6564bff6985caa24ef000001')})
+        self.assertEqual(task_update['$inc'], {'scheduled_items_count': 2})
+        query_filter, update = mock_workitems.update_one.call_args.args
+        self.assertEqual(query_filter, {'_id': ObjectId('617e443bfc13ae4c668c3fda'), 'status': 'RUNNING', 'owner': 'consumer-1'})
+        self.assertEqual(update['$push'], {'donated': {'$each': ['l', 'd']}})
+
+    @patch('richarsi.blackboard.app.tasks_collection')
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_split_workitem_lease_lost(self, mock_workitems, mock_tasks):
+        mock_workitems.find_one.return_value = None
+
+        response = self.app.post('/workitems/617e443bfc13ae4c668c3fda/split', json={
+            'owner': 'consumer-1',
+            'workitems': [{'current_sequence': 'rel', 'remaining_elements': 'ad'}],
+            'donated': ['l']
+        })
+
+        self.assertEqual(response.status_code, 409)
+        mock_workitems.insert_many.assert_not_called()
+        mock_tasks.update_one.assert_not_called()
+
+    @patch('richarsi.blackboard.app.tasks_collection')
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_split_workitem_lease_lost_while_splitting(self, mock_workitems, mock_tasks):
+        mock_workitems.find_one.return_value = {
+            '_id': ObjectId('617e443bfc13ae4c668c3fda'), 'task_id': ObjectId('6564bff6985caa24ef000001'), 'priority': 40
+        }
+        mock_workitems.insert_many.return_value.inserted_ids = [ObjectId('617e443bfc13ae4c668c3fdb')]
+        # The work item was requeued after it was found
+        mock_workitems.update_one.return_value.matched_count = 0
+
+        response = self.app.post('/workitems/617e443bfc13ae4c668c3fda/split', json={
+            'owner': 'consumer-1',
+            'workitems': [{'current_sequence': 'rel', 'remaining_elements': 'ad'}],
+            'donated': ['l']
+        })
+
+        self.assertEqual(response.status_code, 409)
+        query_filter = mock_workitems.update_one.call_args.args[0]
+        self.assertEqual(query_filter, {'_id': ObjectId('617e443bfc13ae4c668c3fda'), 'status': 'RUNNING', 'owner': 'consumer-1'})
+
+    @patch('richarsi.blackboard.app.tasks_collection')
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_split_workitem_insert_failure_takes_back_count(self, mock_workitems, mock_tasks):
+        mock_workitems.find_one.return_value = {
+            '_id': ObjectId('617e443bfc13ae4c668c3fda'), 'task_id': ObjectId('6564bff6985caa24ef000001'), 'priority': 40
+        }
+        mock_workitems.insert_many.side_effect = BulkWriteError({'nInserted': 1, 'writeErrors': []})
+
+        response = self.app.post('/workitems/617e443bfc13ae4c668c3fda/split', json={
+            'owner': 'consumer-1',
+            'workitems': [{'current_sequence': 'rel', 'remaining_elements': 'ad'},
+                          {'current_sequence': 'red', 'remaining_elements': 'al'}],
+            'donated': ['l', 'd']
+        })
+
+        self.assertEqual(response.status_code, 500)
+        # Two were counted, one was added
+        self.assertEqual([c.args[1]['$inc'] for c in mock_tasks.update_one.call_args_list],
+                         [{'scheduled_items_count': 2}, {'scheduled_items_count': -1}])
+        mock_workitems.update_one.assert_not_called()
+
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_split_workitem_invalid(self, mock_workitems):
+        response = self.app.post('/workitems/617e443bfc13ae4c668c3fda/split', json={
+            'owner': 'consumer-1',
+            'workitems': [{'current_sequence': 'rel', 'remaining_elements': 'ad'}],
+            'donated': []
+        })
+
+        self.assertEqual(response.status_code, 400)
+        mock_workitems.find_one.assert_not_called()
+
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_reap_workitems(self, mock_collection):
+        parked, requeued = MagicMock(modified_count=1), MagicMock(modified_count=2)
+        mock_collection.update_many.side_effect = [parked, requeued]
+
+        response = self.app.post('/workitems/reap', json={'max_attempts': 5})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {'requeued': 2, 'parked': 1})
+
+        park_call, requeue_call = mock_collection.update_many.call_args_list
+        self.assertEqual(park_call.args[0]['attempts'], {'$gte': 5})
+        self.assertEqual(park_call.args[1]['$set']['status'], 'PARKED')
+        self.assertEqual(requeue_call.args[0]['attempts'], {'$not': {'$gte': 5}})
+        self.assertEqual(requeue_call.args[1]['$set']['status'], 'NEW')
+        self.assertEqual(requeue_call.args[0]['status'], 'RUNNING')
+
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_reap_workitems_invalid_max_attempts(self, mock_collection):
+        response = self.app.post('/workitems/reap', json={'max_attempts': 0})
+
+        self.assertEqual(response.status_code, 400)
+        mock_collection.update_many.assert_not_called()
+
 class TestUpdateWorkitem(unittest.TestCase):
 
     def setUp(self):
         self.app = app.test_client()
         self.app.testing = True
+        patcher = patch('richarsi.blackboard.app.tasks_collection')
+        self.mock_tasks = patcher.start()
+        self.addCleanup(patcher.stop)
     
     @patch('richarsi.blackboard.app.workitems_collection')
     def test_update_workitem_success(self, mock_collection):
-        # Mocking MongoDB collection's update_one method
-        mock_collection.update_one.return_value.matched_count = 1
+        # Mocking MongoDB collection's find_one_and_update method
+        mock_collection.find_one_and_update.return_value = {'_id': ObjectId('617e443bfc13ae4c668c3fda'),
+                                                            'task_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'NEW'}
 
         workitem_id = '617e443bfc13ae4c668c3fda'  # Example ObjectId
         response = self.app.put(f'/workitems/{workitem_id}',
@@ -559,6 +1701,56 @@ class TestUpdateWorkitem(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json, {"message": "Work item updated successfully"})
 
+        # The first work item to start starts its task
+        query_filter, update = self.mock_tasks.update_one.call_args.args
+        self.assertEqual(query_filter, {'_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'SCHEDULED'})
+        self.assertEqual(update['$set']['status'], 'RUNNING')
+
+    @patch('richarsi.blackboard.app._build_results')
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_update_workitem_completed(self, mock_collection, mock_build_results):
+        mock_collection.find_one_and_update.return_value = {'_id': ObjectId('617e443bfc13ae4c668c3fda'),
+                                                            'task_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'RUNNING'}
+
+        response = self.app.put('/workitems/617e443bfc13ae4c668c3fda', json={'status': 'COMPLETED'})
+
+        self.assertEqual(response.status_code, 200)
+        count_call, complete_call = self.mock_tasks.update_one.call_args_list
+        self.assertEqual(count_call.args, ({'_id': ObjectId('6564bff6985caa24ef000001')}, {'$inc': {'completed_items_count': 1}}))
+
+        # The task completes only once every scheduled work item has completed
+        query_filter, update = complete_call.args
+        self.assertEqual(query_filter['$expr'], {'$gte': ['$completed_items_count', '$scheduled_items_count']})
+        self.assertEqual(query_filter['status'], {'$in': ['SCHEDULED', 'RUNNING']})
+        self.assertEqual(update['$set']['status'], 'COMPLETED')
+        self.assertEqual(update['$unset'], {'in_flight': ''})
+        # The request that completed the task builds its results and completes its followers
+        mock_build_results.assert_called_once_with(ObjectId('6564bff6985caa24ef000001'))
+        self.assertEqual(self.mock_tasks.update_many.call_args.args[0],
+                         {'leader_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'FOLLOWING'})
+
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_update_workitem_completed_twice(self, mock_collection):
+        # The work item was already COMPLETED so it is not counted again
+        mock_collection.find_one_and_update.return_value = {'_id': ObjectId('617e443bfc13ae4c668c3fda'),
+                                                            'task_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'COMPLETED'}
+
+        response = self.app.put('/workitems/617e443bfc13ae4c668c3fda', json={'status': 'COMPLETED'})
+
+        self.assertEqual(response.status_code, 200)
+        self.mock_tasks.update_one.assert_not_called()
+
+    @patch('richarsi.blackboard.app.workitems_collection')
+    def test_update_workitem_no_longer_completed(self, mock_collection):
+        mock_collection.find_one_and_update.return_value = {'_id': ObjectId('617e443bfc13ae4c668c3fda'),
+                                                            'task_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'COMPLETED'}
+
+        response = self.app.put('/workitems/617e443bfc13ae4c668c3fda', json={'status': 'NEW'})
+
+        self.assertEqual(response.status_code, 200)
+        self.mock_tasks.update_one.assert_called_once_with({'_id': ObjectId('6564bff6985caa24ef000001')},
+                                                           {'$inc': {'completed_items_count': -1}})
+
     @patch('richarsi.blackboard.app.workitems_collection')
     def test_update_workitem_invalid_status(self, mock_collection):
         workitem_id = '617e443bfc13ae4c668c3fda'
@@ -572,7 +1764,7 @@ class TestUpdateWorkitem(unittest.TestCase):
     @patch('richarsi.blackboard.app.workitems_collection')
     def test_update_workitem_not_found(self, mock_collection):
         # Simulate no documents matched for update
-        mock_collection.update_one.return_value.matched_count = 0
+        mock_collection.find_one_and_update.return_value = None
 
         workitem_id = '617e443bfc13ae4c668c3fda'
         response = self.app.put(f'/workitems/{workitem_id}',
@@ -581,11 +1773,12 @@ class TestUpdateWorkitem(unittest.TestCase):
         
         self.assertEqual(response.status_code, 404)
         self.assertEqual(response.json, {"error": "Work item not found"})
+        self.mock_tasks.update_one.assert_not_called()
 
     @patch('richarsi.blackboard.app.workitems_collection')
     def test_update_workitem_internal_error(self, mock_collection):
         # Simulating an exception when updating
-        mock_collection.update_one.side_effect = Exception("Database error")
+        mock_collection.find_one_and_update.side_effect = Exception("Database error")
 
         workitem_id = '617e443bfc13ae4c668c3fda'
         response = self.app.put(f'/workitems/{workitem_id}',
@@ -596,5 +1789,77 @@ class TestUpdateWorkitem(unittest.TestCase):
         self.assertEqual(response.json, {"error": "Internal server error"})
 
 # Run the tests
+
+class TestEnsureIndexes(unittest.TestCase):
+
+    @patch('richarsi.blackboard.app.workitems_collection')
+    @patch('richarsi.blackboard.app.tasks_collection')
+    @patch('richarsi.blackboard.app.words_collection')
+    def test_removes_duplicates_and_creates_unique_index(self, mock_words, mock_tasks, mock_workitems):
+        mock_words.aggregate.return_value = [{'_id': {'task_id': 1, 'word': 'bad'}, 'ids': ['a', 'b', 'c'], 'count': 3}]
+        mock_words.delete_many.return_value.deleted_count = 2
+        mock_words.update_many.return_value.modified_count = 5
+
+        result = app.test_cli_runner().invoke(ensure_indexes)
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn('Removed 2 duplicate words.', result.output)
+        self.assertIn('Recorded the length of 5 words.', result.output)
+        # Only words that are strings have a length to record
+        self.assertEqual(mock_words.update_many.call_args.args[0], {'length': {'$exists': False}, 'word': {'$type': 'string'}})
+        # The first copy of each word is kept
+        mock_words.delete_many.assert_called_once_with({'_id': {'$in': ['b', 'c']}})
+        self.assertEqual([index.document['name'] for index in mock_words.create_indexes.call_args.args[0]], ['task_id_word_unique', 'task_id_length_word', 'task_id_id', 'expireAt_ttl'])
+        self.assertTrue(mock_words.create_indexes.call_args.args[0][0].document['unique'])
+
+    @patch('richarsi.blackboard.app.words_collection')
+    @patch('richarsi.blackboard.app.workitems_collection')
+    @patch('richarsi.blackboard.app.tasks_collection')
+    def test_creates_required_indexes(self, mock_tasks, mock_workitems, mock_words):
+        mock_words.aggregate.return_value = []
+
+        result = app.test_cli_runner().invoke(ensure_indexes)
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual([index.document['key'] for index in mock_tasks.create_indexes.call_args.args[0]],
+                         [{'status': 1, '_id': 1}, {'letters_key': 1}, {'results_id': 1}, {'leader_id': 1}])
+        # Only one task in flight for each letters key
+        letters_key_index = mock_tasks.create_indexes.call_args.args[0][1].document
+        self.assertTrue(letters_key_index['unique'])
+        self.assertEqual(letters_key_index['partialFilterExpression'], {'in_flight': True})
+        self.assertEqual([index.document['name'] for index in mock_workitems.create_indexes.call_args.args[0]],
+                         ['status_priority_id', 'status_id', 'status_leaseExpires', 'task_id_status'])
+        mock_words.create_indexes.assert_called_once()
+
+    @patch('richarsi.blackboard.app.words_collection')
+    @patch('richarsi.blackboard.app.workitems_collection')
+    @patch('richarsi.blackboard.app.tasks_collection')
+    def test_explain_queries_use_indexes(self, mock_tasks, mock_workitems, mock_words):
+        plan = {'queryPlanner': {'winningPlan': {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN', 'indexName': 'status'}}}}
+        for mock_collection in (mock_tasks, mock_workitems, mock_words):
+            mock_collection.find.return_value.explain.return_value = plan
+            mock_collection.find.return_value.sort.return_value.explain.return_value = plan
+
+        result = app.test_cli_runner().invoke(explain_queries)
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn('GET /tasks?status=: FETCH <- IXSCAN', result.output)
+        self.assertIn('Every query uses an index.', result.output)
+
+    @patch('richarsi.blackboard.app.words_collection')
+    @patch('richarsi.blackboard.app.workitems_collection')
+    @patch('richarsi.blackboard.app.tasks_collection')
+    def test_explain_queries_fails_on_collection_scan(self, mock_tasks, mock_workitems, mock_words):
+        indexed = {'queryPlanner': {'winningPlan': {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN'}}}}
+        mock_tasks.find.return_value.sort.return_value.explain.return_value = {'queryPlanner': {'winningPlan': {'stage': 'COLLSCAN'}}}
+        for mock_collection in (mock_workitems, mock_words):
+            mock_collection.find.return_value.explain.return_value = indexed
+            mock_collection.find.return_value.sort.return_value.explain.return_value = indexed
+
+        result = app.test_cli_runner().invoke(explain_queries)
+
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn('1 queries scan a whole collection: GET /tasks?status=', result.output)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import threading
+import time
+from richarsi.blackboard.notifier import ChangeNotifier
+
+class TestChangeNotifier(unittest.TestCase):
+
+    def test_notify_wakes_listeners(self):
+        notifier = ChangeNotifier()
+        woken = []
+
+        def _wait():
+            with notifier.listen('task1') as subscription:
+                ready.set()
+                woken.append(subscription.wait(5))
+
+        ready = threading.Event()
+        waiter = threading.Thread(target=_wait)
+        waiter.start()
+        ready.wait(5)
+        notifier.notify('task1')
+        waiter.join(5)
+
+        self.assertEqual(woken, [True])
+
+    def test_change_before_wait_is_not_missed(self):
+        notifier = ChangeNotifier()
+        with notifier.listen('task1') as subscription:
+            # The change lands between subscribing and waiting
+            notifier.notify('task1')
+            self.assertTrue(subscription.wait(0))
+            # Each change is only reported once
+            self.assertFalse(subscription.wait(0))
+
+    def test_other_keys_do_not_wake_listeners(self):
+        notifier = ChangeNotifier()
+        with notifier.listen('task1') as subscription:
+            notifier.notify('task2')
+            started = time.monotonic()
+            self.assertFalse(subscription.wait(0.05))
+            self.assertGreaterEqual(time.monotonic() - started, 0.04)
+
+    def test_keys_are_forgotten_without_listeners(self):
+        notifier = ChangeNotifier()
+        with notifier.listen('task1'):
+            with notifier.listen('task1'):
+                self.assertEqual(notifier.listeners(), 2)
+            self.assertEqual(notifier.listeners(), 1)
+        self.assertEqual(notifier.listeners(), 0)
+        self.assertEqual(notifier._entries, {})
+
+        # Changes to keys nobody listens to are not recorded
+        notifier.notify('task1')
+        self.assertEqual(notifier._entries, {})
+
+if __name__ == '__main__':
+    unittest.main()
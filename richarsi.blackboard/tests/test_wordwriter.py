@@ -0,0 +1,146 @@
+import unittest
+import queue
+from unittest.mock import patch, MagicMock
+from bson.objectid import ObjectId
+from richarsi.blackboard.app import app
+from pymongo.errors import BulkWriteError
+from richarsi.blackboard.wordwriter import WordWriter
+
+class TestWordWriter(unittest.TestCase):
+
+    def test_coalesces_submissions_into_one_batch(self):
+        collection = MagicMock()
+        writer = WordWriter(collection, flush_interval=0.5)
+
+        # Both submissions are queued before the writer starts, so they share a batch
+        with patch.object(writer, 'start'):
+            first = writer.submit([{'word': 'bad'}])
+            second = writer.submit([{'word': 'bade'}, {'word': 'bead'}])
+        writer.start()
+        first.wait(5)
+        second.wait(5)
+        writer.close()
+
+        collection.bulk_write.assert_called_once()
+        self.assertEqual(len(collection.bulk_write.call_args.args[0]), 3)
+        self.assertEqual(collection.bulk_write.call_args.kwargs, {'ordered': False})
+
+        metrics = writer.metrics()
+        self.assertEqual(metrics['batches'], 1)
+        self.assertEqual(metrics['words'], 3)
+        self.assertEqual(metrics['max_batch_size'], 3)
+        self.assertEqual(metrics['mean_batch_size'], 3)
+        self.assertEqual(metrics['queued'], 0)
+
+    def test_splits_batches_at_max_batch(self):
+        collection = MagicMock()
+        writer = WordWriter(collection, max_batch=2, flush_interval=0.5)
+
+        with patch.object(writer, 'start'):
+            pending = [writer.submit([{'word': word}]) for word in ('bad', 'bade', 'bead')]
+        writer.start()
+        for p in pending:
+            p.wait(5)
+        writer.close()
+
+        self.assertEqual([len(c.args[0]) for c in collection.bulk_write.call_args_list], [2, 1])
+
+    def test_close_writes_queued_words(self):
+        collection = MagicMock()
+        writer = WordWriter(collection, flush_interval=60)
+
+        pending = writer.submit([{'word': 'bad'}])
+        writer.close()
+
+        # The long flush interval was cut short by the shutdown
+        pending.wait(0)
+        collection.bulk_write.assert_called_once()
+
+    def test_write_errors_reach_the_caller(self):
+        collection = MagicMock()
+        collection.bulk_write.side_effect = Exception('Database error')
+        writer = WordWriter(collection, flush_interval=0)
+
+        pending = writer.submit([{'word': 'bad'}])
+        with self.assertRaises(Exception):
+            pending.wait(5)
+        writer.close()
+
+        self.assertEqual(writer.metrics()['errors'], 1)
+
+    def test_duplicate_words_are_not_errors(self):
+        collection = MagicMock()
+        collection.bulk_write.side_effect = BulkWriteError({'writeErrors': [{'index': 0, 'code': 11000}]})
+        writer = WordWriter(collection, flush_interval=0)
+
+        pending = writer.submit([{'word': 'bad'}])
+        pending.wait(5)
+        writer.close()
+
+        self.assertEqual(writer.metrics()['errors'], 0)
+
+    def test_submit_blocks_when_full(self):
+        writer = WordWriter(MagicMock(), max_queue=1, put_timeout=0.01)
+
+        with patch.object(writer, 'start'):
+            writer.submit([{'word': 'bad'}])
+            with self.assertRaises(queue.Full):
+                writer.submit([{'word': 'bade'}])
+
+class TestAddWordsWithWordWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.app = app.test_client()
+        self.app.testing = True
+
+    @patch('richarsi.blackboard.app.WORD_WRITER_MODE', 'group')
+    @patch('richarsi.blackboard.app.word_writer')
+    @patch('richarsi.blackboard.app.tasks_collection.find_one')
+    def test_group_commit_waits_for_the_batch(self, mock_find_one, mock_writer):
+        mock_find_one.return_value = {'_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'RUNNING'}
+
+        response = self.app.post('/tasks/6564bff6985caa24ef000001/words', json={'word': 'bad'})
+
+        self.assertEqual(response.status_code, 200)
+        mock_writer.submit.assert_called_once_with([{'task_id': ObjectId('6564bff6985caa24ef000001'), 'word': 'bad', 'length': 3}])
+        mock_writer.submit.return_value.wait.assert_called_once()
+
+    @patch('richarsi.blackboard.app.WORD_WRITER_MODE', 'behind')
+    @patch('richarsi.blackboard.app.word_writer')
+    @patch('richarsi.blackboard.app.tasks_collection.find_one')
+    def test_write_behind_does_not_wait(self, mock_find_one, mock_writer):
+        mock_find_one.return_value = {'_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'RUNNING'}
+
+        response = self.app.post('/tasks/6564bff6985caa24ef000001/words', json={'words': ['bad', 'bade']})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mock_writer.submit.call_args.args[0]), 2)
+        mock_writer.submit.return_value.wait.assert_not_called()
+
+    @patch('richarsi.blackboard.app.word_writer')
+    @patch('richarsi.blackboard.app.tasks_collection.find_one')
+    def test_full_queue(self, mock_find_one, mock_writer):
+        mock_find_one.return_value = {'_id': ObjectId('6564bff6985caa24ef000001'), 'status': 'RUNNING'}
+        mock_writer.submit.side_effect = queue.Full
+
+        response = self.app.post('/tasks/6564bff6985caa24ef000001/words', json={'word': 'bad'})
+
+        self.assertEqual(response.status_code, 503)
+
+    def test_metrics_disabled(self):
+        response = self.app.get('/metrics/wordwriter')
+
+        self.assertEqual(response.status_code, 404)
+
+    @patch('richarsi.blackboard.app.WORD_WRITER_MODE', 'group')
+    @patch('richarsi.blackboard.app.word_writer')
+    def test_metrics(self, mock_writer):
+        mock_writer.metrics.return_value = {'batches': 2, 'words': 10}
+
+        response = self.app.get('/metrics/wordwriter')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {'mode': 'group', 'batches': 2, 'words': 10})
+
+if __name__ == '__main__':
+    unittest.main()
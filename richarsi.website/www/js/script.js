@@ -1,6 +1,5 @@
 const submitBtn = document.getElementById('submit-btn');
 let pendingRequest = false;
-let pollInterval = null;
 
 const protocol = window.location.protocol; // e.g., 'http:' or 'https:'
 const host = window.location.hostname;     // e.g., 'localhost' or any domain
@@ -38,7 +37,8 @@ submitBtn.addEventListener('click', async () => {
         if (response.status === 202) {
             pendingRequest = true;
             const location = response.headers.get('Location');
-            pollStatus(`${base_url}${location}`);
+            const taskId = location.split('/').pop();
+            pollStatus(`${base_url}${location}`, `${tasks_url}/${taskId}/words/partial`);
         } else {
             handleErrorResponse(response);
         }
@@ -47,12 +47,23 @@ submitBtn.addEventListener('click', async () => {
     }
 });
 
-function pollStatus(statusUrl) {
-    const pollInterval = setInterval(async () => {
-        console.log(`Polling status at: ${statusUrl}`);
+// Seconds the blackboard may hold a status request open waiting for the task to change
+const statusWaitSeconds = 25;
+
+async function pollStatus(statusUrl, partialWordsUrl) {
+    let since = null;
+    // The words shown while the task runs, and where to continue reading them from
+    const partialWords = [];
+    let partialCursor = null;
+
+    while (true) {
+        // After the first request, wait for the task to change rather than polling on an interval
+        const url = since === null ? statusUrl : `${statusUrl}?wait=${statusWaitSeconds}&since=${encodeURIComponent(since)}`;
+        console.log(`Polling status at: ${url}`);
 
         try {
-            const response = await fetch(statusUrl);
+            const started = Date.now();
+            const response = await fetch(url);
 
             // Check if the response is successful
             if (response.ok) {
@@ -60,19 +71,38 @@ function pollStatus(statusUrl) {
                 
                 // First check if the status property exists
                 if ('status' in data && data.status === "COMPLETED") {
-                    clearInterval(pollInterval);
                     console.log("Operation completed. Stopping polling.");
                     
                     // Display the results from the redirect payload
                     displayResults(data);
                     // Allow another request to be submitted 
                     pendingRequest = false;
+                    return;
                 } 
+                // Some of the work could not be done so the task will never complete
+                else if ('status' in data && data.status === "FAILED") {
+                    showError("The task failed. Please try again.");
+                    pendingRequest = false;
+                    return;
+                }
                 // Then check if the lastUpdated property exists
                 else if ('lastUpdated' in data) {
-                    // Handle status payload with lastUpdated time
-                    document.getElementById('last-updated').innerText = `Last Updated: ${data.lastUpdated}`;
+                    // Handle status payload with lastUpdated time, and progress once the consumers report it
+                    let status = `Last Updated: ${data.lastUpdated}`;
+                    if ('fraction_done' in data) {
+                        status += ` - ${Math.round(data.fraction_done * 100)}% done, ${data.words_found} words found`;
+                    }
+                    document.getElementById('last-updated').innerText = status;
                     console.log("Status updated:", data.lastUpdated);
+
+                    // Show the words found so far rather than waiting for the task to complete
+                    partialCursor = await fetchPartialWords(partialWordsUrl, partialCursor, partialWords);
+
+                    // A blackboard that does not hold requests answers an unchanged status at once, so back off
+                    if (data.lastUpdated === since && Date.now() - started < 1000) {
+                        await new Promise(resolve => setTimeout(resolve, 5000));
+                    }
+                    since = data.lastUpdated;
                 }
                 // If neither status nor lastUpdated are present
                 else {
@@ -84,9 +114,41 @@ function pollStatus(statusUrl) {
         } catch (error) {
             console.error("Error during polling:", error);
             showError("Polling failed due to a connection error.");
-            clearInterval(pollInterval);
+            pendingRequest = false;
+            return;
+        }
+    }
+}
+
+async function fetchPartialWords(partialWordsUrl, cursor, words) {
+    try {
+        const response = await fetch(cursor === null ? partialWordsUrl : `${partialWordsUrl}?after=${cursor}`);
+        if (!response.ok) {
+            return cursor;
         }
-    }, 5000);
+
+        const data = await response.json();
+        if (data.words.length > 0) {
+            words.push(...data.words);
+            displayPartialResults(words);
+        }
+        return data.cursor;
+    } catch (error) {
+        // The complete results are shown once the task completes, so carry on polling
+        console.error("Error fetching partial words:", error);
+        return cursor;
+    }
+}
+
+function displayPartialResults(words) {
+    const tableBody = document.getElementById('results-body');
+    const row = `<tr>
+                    <td>${words.length}</td>
+                    <td>running</td>
+                    <td>${words.join(', ')}</td>
+                 </tr>`;
+    tableBody.innerHTML = row;
+    document.getElementById('results-table').style.display = '';
 }
 
 function displayResults(data) {
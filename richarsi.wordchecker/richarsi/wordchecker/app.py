@@ -116,6 +116,64 @@ def firstword(prefix: str):
     # The response includes a key-value pair where 'first_word' is the key
     return jsonify({'first_word': result})
 
+# The route '/firstwords' handles POST requests containing a batch of prefixes
+# so that a caller can check a whole level of its search in one round trip
+@app.route('/firstwords', methods=['POST'])
+def firstwords():
+    """
+    Find and return the first word for each prefix in a batch.
+
+    Expects a JSON body of the form {'prefixes': [<prefix>, ...]}.
+
+    Returns:
+        flask.Response: A JSON response structured as {'first_words': [<result>, ...]}
+        where each result is aligned with the prefix at the same position, or a
+        400 response if 'prefixes' is missing or is not a list.
+    """
+    data = request.get_json(silent=True) or {}
+    prefixes = data.get('prefixes')
+
+    if not isinstance(prefixes, list):
+        return jsonify({'error': "Invalid input: 'prefixes' should be a list"}), 400
+
+    start_time = time.time()  # Start timing
+    result = [trie.find_first_with_prefix(prefix) for prefix in prefixes]
+    end_time = time.time()  # End timing
+    elapsed_time = end_time - start_time  # Calculate duration in seconds
+    logging.info(f"Time taken to find the first word for {len(prefixes)} prefixes: {elapsed_time:.6f} seconds")  # Log the time taken
+
+    return jsonify({'first_words': result})
+
+# The route '/prefixcounts' handles POST requests containing a batch of prefixes
+# so that a caller can size the part of the dictionary beneath each of them
+@app.route('/prefixcounts', methods=['POST'])
+def prefixcounts():
+    """
+    Count the words starting with each prefix in a batch.
+
+    Expects a JSON body of the form {'prefixes': [<prefix>, ...], 'max_length': <int>}
+    where 'max_length' is optional and limits the count to words no longer than it.
+
+    Returns:
+        flask.Response: A JSON response structured as {'counts': [<count>, ...]}
+        where each count is aligned with the prefix at the same position, or a
+        400 response if 'prefixes' is missing or is not a list.
+    """
+    data = request.get_json(silent=True) or {}
+    prefixes = data.get('prefixes')
+    max_length = data.get('max_length')
+
+    if not isinstance(prefixes, list):
+        return jsonify({'error': "Invalid input: 'prefixes' should be a list"}), 400
+
+    start_time = time.time()  # Start timing
+    result = [trie.count_words_with_prefix(prefix, max_length) for prefix in prefixes]
+    end_time = time.time()  # End timing
+    elapsed_time = end_time - start_time  # Calculate duration in seconds
+    logging.info(f"Time taken to count the words for {len(prefixes)} prefixes: {elapsed_time:.6f} seconds")  # Log the time taken
+
+    return jsonify({'counts': result})
+
 if __name__ == '__main__':
     # Start the Flask development server
     # Set debug=True for automatic reloading during development
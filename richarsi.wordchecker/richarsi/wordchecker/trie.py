@@ -105,6 +105,35 @@ class Trie:
         # Use DFS starting from the node where the prefix ends
         return dfs(node, prefix)
 
+    def count_words_with_prefix(self, prefix: str, max_length: int = None) -> int:
+        """
+        Count the words in the trie that start with the given prefix.
+
+        Parameters:
+        prefix (str): The prefix to search for in the trie.
+        max_length (int, optional): Only count words no longer than this.
+
+        Returns:
+        int: The number of words starting with the prefix.
+        """
+        # Find the node that corresponds to the last character of the prefix
+        node = self.root
+        for char in prefix:
+            if char not in node.children:
+                return 0  # If the prefix is not present, no words start with it
+            node = node.children[char]
+
+        def count_recursive(current_node, length):
+            # Stop descending once words would be longer than max_length
+            if max_length is not None and length > max_length:
+                return 0
+            count = 1 if current_node.is_end_of_word else 0
+            for child in current_node.children.values():
+                count += count_recursive(child, length + 1)
+            return count
+
+        return count_recursive(node, len(prefix))
+
     def contains(self, word: str) -> bool:
         # Start from the root node of the trie structure
         current = self.root
@@ -40,6 +40,41 @@ class TestFirstWordFunction(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIsNone(data['first_word'])
     
+    @patch('richarsi.wordchecker.trie.Trie.find_first_with_prefix')
+    def test_firstwords_batch_response(self, mock_find_first_with_prefix):
+        """
+        Test that a batch of prefixes returns one result per prefix, in order.
+        """
+        mock_find_first_with_prefix.side_effect = ['prefix', '']
+
+        response = self.app.post('/firstwords', json={'prefixes': ['pre', 'xyz']})
+        data = response.get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['first_words'], ['prefix', ''])
+
+    def test_firstwords_invalid_input(self):
+        """
+        Test that a missing or malformed 'prefixes' list is rejected.
+        """
+        response = self.app.post('/firstwords', json={'prefixes': 'pre'})
+
+        self.assertEqual(response.status_code, 400)
+
+    @patch('richarsi.wordchecker.trie.Trie.count_words_with_prefix')
+    def test_prefixcounts_batch_response(self, mock_count_words_with_prefix):
+        """
+        Test that a batch of prefixes returns one count per prefix, in order.
+        """
+        mock_count_words_with_prefix.side_effect = [12, 0]
+
+        response = self.app.post('/prefixcounts', json={'prefixes': ['pre', 'xyz'], 'max_length': 6})
+        data = response.get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['counts'], [12, 0])
+        mock_count_words_with_prefix.assert_called_with('xyz', 6)
+
     # TODO: get this to work!!!
     # # @patch('richarsi.wordchecker.trie.Trie.find_first_with_prefix')
     # def test_performance_logging(self, mock_find_first):
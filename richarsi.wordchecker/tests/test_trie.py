@@ -104,6 +104,26 @@ class TestTrieFindWordsWithPrefix(unittest.TestCase):
                 result = self.trie.find_words_with_prefix(prefix)
                 self.assertCountEqual(result, expected, f"Failed for prefix: {prefix}")
 
+class TestTrieCountWordsWithPrefix(unittest.TestCase):
+    def setUp(self):
+        self.trie = Trie()
+        for word in ["hello", "world", "help", "helicopter", "hire", "he"]:
+            self.trie.insert(word)
+
+    def test_count_words_with_prefix(self):
+        test_cases = [
+            ("hel", None, 3),
+            ("he", None, 4),
+            ("h", 4, 3),
+            ("hel", 5, 2),
+            ("xyz", None, 0),
+            ("", None, 6),
+        ]
+
+        for prefix, max_length, expected in test_cases:
+            with self.subTest(prefix=prefix, max_length=max_length):
+                self.assertEqual(self.trie.count_words_with_prefix(prefix, max_length), expected)
+
 class TestTrieStatisticsMethods(unittest.TestCase):
     
     def setUp(self):